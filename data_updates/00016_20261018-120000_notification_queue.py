@@ -0,0 +1,46 @@
+# -*- coding: utf-8; -*-
+# This file is part of Superdesk.
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+#
+# Creation: 2026-10-18 12:00
+
+from superdesk.commands.data_updates import DataUpdate as _DataUpdate
+
+
+class DataUpdate(_DataUpdate):
+    resource = "notification_queue"
+
+    def forwards(self, mongodb_collection, mongodb_database):
+        # merge the duplicate queues of a user, so the unique ``user_id`` index can be created
+        duplicates = mongodb_collection.aggregate(
+            [
+                {"$group": {"_id": "$user", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ]
+        )
+
+        for duplicate in duplicates:
+            queues = list(mongodb_collection.find({"_id": {"$in": duplicate["ids"]}}, sort=[("_created", 1)]))
+            topics = {}
+            for queue in queues:
+                for topic in queue.get("topics") or []:
+                    merged = topics.setdefault(topic["topic_id"], dict(topic, items=[]))
+                    merged["items"].extend(item for item in topic.get("items") or [] if item not in merged["items"])
+                    last_item_arrived = topic.get("last_item_arrived")
+                    if last_item_arrived and (
+                        not merged.get("last_item_arrived") or last_item_arrived > merged["last_item_arrived"]
+                    ):
+                        merged["last_item_arrived"] = last_item_arrived
+
+            print("Merging notification queues of user", duplicate["_id"])
+            mongodb_collection.update_one({"_id": queues[0]["_id"]}, {"$set": {"topics": list(topics.values())}})
+            mongodb_collection.delete_many({"_id": {"$in": [queue["_id"] for queue in queues[1:]]}})
+
+        if "user_id" in mongodb_collection.index_information():
+            mongodb_collection.drop_index("user_id")
+        mongodb_collection.create_index([("user", 1)], name="user_id", unique=True)
+
+    def backwards(self, mongodb_collection, mongodb_database):
+        pass
@@ -160,6 +160,70 @@ Feature: News API News Feed
         }
         """
 
+  Scenario: Response provides a cursor to the next page
+    Given "items"
+        """
+        [
+            {
+                "_id": "urn:test1", "guid": "urn:test1", "body_html": "Once upon a time there was a single fish who could swim",
+                "versioncreated": "2015-06-01T03:48:39.000Z"
+            }, {
+                "_id": "urn:test2", "guid": "urn:test2", "body_html": "Once upon a time there were 2 fish who could swim",
+                "versioncreated": "2015-06-02T03:48:39.000Z"
+            }, {
+                "_id": "urn:test3", "guid": "urn:test3", "body_html": "Once upon a time there were 3 fish who could swim",
+                "versioncreated": "2015-06-02T03:48:39.000Z"
+            }, {
+                "_id": "urn:test4", "guid": "urn:test4", "body_html": "Once upon a time there were 4 fish who could swim",
+                "versioncreated": "2015-06-03T03:48:39.000Z"
+            }, {
+                "_id": "urn:test5", "guid": "urn:test5", "body_html": "Once upon a time there were 5 fish who could swim",
+                "versioncreated": "2015-06-04T03:48:39.000Z"
+            }
+        ]
+        """
+    When we get "news/feed?cursor=*&include_fields=body_html&max_results=2&products=#products._id#"
+    Then we get list with 5 items
+        """
+        {
+            "_items": [
+                {"_id": "urn:test1"},
+                {"_id": "urn:test2"}
+            ]
+        }
+        """
+    Then we store NEXT_PAGE from HATEOAS
+    When we get "#NEXT_PAGE#"
+    Then we get list with 5 items
+        """
+        {
+            "_items": [
+                {"_id": "urn:test3"},
+                {"_id": "urn:test4"}
+            ]
+        }
+        """
+    Then we store NEXT_PAGE from HATEOAS
+    When we get "#NEXT_PAGE#"
+    Then we get list with 5 items
+        """
+        {
+            "_items": [
+                {"_id": "urn:test5"}
+            ]
+        }
+        """
+    Then we store NEXT_PAGE from HATEOAS
+    When we get "#NEXT_PAGE#"
+    Then we get list with 5 items
+        """
+        {
+            "_items": []
+        }
+        """
+    When we get "news/feed?cursor=foo&products=#products._id#"
+    Then we get error 400
+
   Scenario: Href is generated for each item
     Given "items"
         """
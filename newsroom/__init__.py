@@ -6,9 +6,12 @@ Superdesk Newsroom
 """
 
 import logging
+import pymongo.errors
 import superdesk
 from superdesk import register_resource  # noqa
 from typing import Dict, List, Tuple
+from eve.utils import document_etag
+from flask import current_app as app
 
 from newsroom.user_roles import UserRole
 
@@ -25,6 +28,7 @@ SCHEMA_VERSIONS = {
 
 logging.basicConfig()
 logging.getLogger(__name__).setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 MongoIndexes = Dict[str, Tuple[List[Tuple[str, int]], Dict]]
@@ -56,4 +60,35 @@ class Resource(superdesk.Resource):
 
 
 class Service(superdesk.Service):
-    pass
+    def bulk_create(self, docs):
+        """Insert the documents using a single Mongo and a single Elastic request
+
+        Unlike ``create``, no hooks are run. Documents failing to insert (i.e. conflicts)
+        are logged and skipped, without affecting the other documents.
+
+        :param docs: List of documents
+        :return: List of IDs of the inserted documents
+        """
+
+        for doc in docs:
+            self.backend.set_default_dates(doc)
+            doc.setdefault(app.config["ETAG"], document_etag(doc))
+
+        try:
+            app.data.get_mongo_collection(self.datasource).insert_many(docs, ordered=False)
+            inserted = docs
+        except pymongo.errors.BulkWriteError as error:
+            write_errors = error.details.get("writeErrors") or []
+            for write_error in write_errors:
+                logger.warning(
+                    "Failed to insert %s document", self.datasource, extra=dict(error=write_error.get("errmsg"))
+                )
+            failed = {write_error["index"] for write_error in write_errors}
+            inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+
+        if inserted and app.data._search_backend(self.datasource) is not None:
+            _success, errors = app.data.elastic.bulk_insert(self.datasource, inserted, raise_on_error=False)
+            for error in errors:
+                logger.warning("Failed to index %s document", self.datasource, extra=dict(error=error))
+
+        return [doc["_id"] for doc in inserted]
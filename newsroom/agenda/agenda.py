@@ -1346,6 +1346,7 @@ class AgendaService(BaseSearchService):
                     "should": [],
                 }
             },
+            item_id=item_id,
         )
 
     def enhance_coverage_watches(self, item):
@@ -0,0 +1,33 @@
+from superdesk.lock import lock, unlock
+
+from newsroom.search.percolator import rebuild_percolator_index, is_topics_percolator_enabled
+from newsroom.topics.topics import get_topics_with_subscribers
+from .manager import manager
+
+
+@manager.command
+def index_topics_percolator():
+    """Re-create the topics percolator index from all subscribed topics
+
+    Requires ``TOPICS_PERCOLATOR_ENABLED`` to be set.
+
+    Example:
+    ::
+
+        $ python manage.py index_topics_percolator
+
+    """
+
+    if not is_topics_percolator_enabled():
+        print("TOPICS_PERCOLATOR_ENABLED is not set")
+        return
+
+    lock_name = "index_topics_percolator"
+    if not lock(lock_name, expire=1800):
+        return
+
+    try:
+        count = rebuild_percolator_index(get_topics_with_subscribers())
+        print(f"Indexed {count} topics")
+    finally:
+        unlock(lock_name)
@@ -6,6 +6,7 @@ from content_api import MONGO_PREFIX
 from superdesk import get_resource_service
 import newsroom
 from newsroom.companies.utils import get_company_section_names, get_company_product_ids
+from newsroom.news_api.api_tokens.utils import invalidate_token_auth_cache
 from newsroom.products.types import PRODUCT_TYPES
 from newsroom.signals import company_create
 
@@ -119,6 +120,7 @@ class CompaniesService(newsroom.Service):
 
     def on_updated(self, updates, original):
         app.cache.delete(str(original["_id"]))
+        invalidate_token_auth_cache()
 
         updated = original.copy()
         updated.update(updates)
@@ -148,6 +150,7 @@ class CompaniesService(newsroom.Service):
 
     def on_deleted(self, doc):
         app.cache.delete(str(doc["_id"]))
+        invalidate_token_auth_cache()
 
     def validate_auth_provider(self, company):
         supported_provider_ids = [provider["_id"] for provider in app.config["AUTH_PROVIDERS"]]
@@ -1,11 +1,13 @@
 import base64
+import json
 import email.policy as email_policy
 
 from lxml import etree
-from typing import List, Optional, Dict, Any, Union
+from markupsafe import escape
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 from typing_extensions import TypedDict
 
-from superdesk import get_resource_service
+from superdesk import get_resource_service, register_resource
 from flask import current_app, render_template, url_for
 from flask_babel import gettext
 from flask_mail import Attachment, Message
@@ -15,6 +17,13 @@ from newsroom.gettext import get_user_timezone
 from newsroom.types import Company, User, Country, CompanyType
 from newsroom.auth import get_company
 from newsroom.celery_app import celery
+from newsroom.email_attachments import (
+    EMAIL_ATTACHMENTS_RESOURCE,
+    EmailAttachmentsResource,
+    EmailAttachmentsService,
+    get_email_attachment_content,
+)
+from newsroom.mail_connection import get_mail_connection, send_messages
 from newsroom.template_loaders import template_locale
 from newsroom.utils import (
     get_agenda_dates,
@@ -24,6 +33,7 @@ from newsroom.utils import (
 )
 from newsroom.template_filters import is_admin_or_internal
 from newsroom.utils import url_for_agenda
+from newsroom.write_buffer import WriteBuffer
 from superdesk.logging import logger
 
 
@@ -42,6 +52,9 @@ class EmailGroup(TypedDict):
 
 MAX_LINE_LENGTH = 998 - 50  # RFC 5322 - buffer for html indentation
 
+#: Rendered instead of the recipient name in fan-out emails, replaced by the name of each recipient when sent
+RECIPIENT_NAME_PLACEHOLDER = "NEWSROOM_RECIPIENT_NAME_PLACEHOLDER"
+
 
 def handle_long_lines_text(text, limit=MAX_LINE_LENGTH):
     if not text:
@@ -80,8 +93,31 @@ def handle_long_lines_html(html):
     return etree.tostring(parsed, method="html", encoding="unicode")
 
 
-@celery.task(soft_time_limit=120)
-def _send_email(to, subject, text_body, html_body=None, sender=None, sender_name=None, attachments_info=None):
+def _get_attachment_content(attachment: Dict[str, Any], attachments_cache: Optional[Dict[str, bytes]]) -> bytes:
+    if attachment.get("media"):
+        # Stored once by :func:`newsroom.email_attachments.store_email_attachment`, read when sending
+        if attachments_cache is not None and attachment["media"] in attachments_cache:
+            return attachments_cache[attachment["media"]]
+        content = get_email_attachment_content(attachment["media"])
+        if content is None:
+            raise ValueError("Attachment {} not found".format(attachment["media"]))
+        if attachments_cache is not None:
+            attachments_cache[attachment["media"]] = content
+        return content
+
+    return base64.b64decode(attachment["file"])
+
+
+def _get_message(
+    to,
+    subject,
+    text_body,
+    html_body=None,
+    sender=None,
+    sender_name=None,
+    attachments_info=None,
+    attachments_cache=None,
+):
     if attachments_info is None:
         attachments_info = []
 
@@ -94,7 +130,7 @@ def _send_email(to, subject, text_body, html_body=None, sender=None, sender_name
     decoded_attachments = []
     for a in attachments_info:
         try:
-            content = base64.b64decode(a["file"])
+            content = _get_attachment_content(a, attachments_cache)
             decoded_attachments.append(Attachment(a["file_name"], a["content_type"], data=content))
         except Exception as e:
             logger.error("Error attaching {} file to mail. Receipient(s): {}. Error: {}".format(a["file_desc"], to, e))
@@ -102,8 +138,34 @@ def _send_email(to, subject, text_body, html_body=None, sender=None, sender_name
     msg = NewsroomMessage(subject=subject, sender=sender, recipients=to, attachments=decoded_attachments)
     msg.body = text_body
     msg.html = html_body
-    app = current_app._get_current_object()
-    return app.mail.send(msg)
+    return msg
+
+
+@celery.task(soft_time_limit=120)
+def _send_email(to, subject, text_body, html_body=None, sender=None, sender_name=None, attachments_info=None):
+    msg = _get_message(to, subject, text_body, html_body, sender, sender_name, attachments_info)
+    return get_mail_connection().send(msg)
+
+
+@celery.task(soft_time_limit=600)
+def _send_emails(emails):
+    """Sends a batch of emails buffered by :func:`send_email`, using the pooled SMTP connection
+
+    :param emails: List of :func:`send_email` keyword arguments
+    """
+
+    attachments_cache: Dict[str, bytes] = {}
+    send_messages([_get_message(**email, attachments_cache=attachments_cache) for email in emails])
+
+
+def flush_emails_to_celery(emails):
+    _send_emails.delay(emails)
+
+
+def _substitute_recipient_name(text: Optional[str], name: Optional[str], html: bool = False) -> Optional[str]:
+    if not text or not name:
+        return text
+    return text.replace(RECIPIENT_NAME_PLACEHOLDER, str(escape(name)) if html else name)
 
 
 def send_email(to, subject, text_body, html_body=None, sender=None, sender_name=None, attachments_info=None):
@@ -114,6 +176,8 @@ def send_email(to, subject, text_body, html_body=None, sender=None, sender_name=
     :param text_body: Text Body
     :param html_body: Html Body
     :param sender: Sender
+    :param attachments_info: List of attachments, stored using
+        :func:`newsroom.email_attachments.store_email_attachment` or with base64 encoded ``file`` content
     :return:
     """
 
@@ -126,6 +190,17 @@ def send_email(to, subject, text_body, html_body=None, sender=None, sender_name=
         "sender_name": sender_name or current_app.config.get("EMAIL_DEFAULT_SENDER_NAME"),
         "attachments_info": attachments_info,
     }
+
+    _queue_email(kwargs)
+
+
+def _queue_email(kwargs: Dict[str, Any]) -> None:
+    email_buffer = current_app.extensions.get("email_buffer")
+    if email_buffer is not None:
+        # Sent in batches using a single Celery task
+        email_buffer.add(kwargs)
+        return
+
     _send_email.apply_async(kwargs=kwargs)
 
 
@@ -225,20 +300,124 @@ EmailKwargs = Dict[str, Any]
 TemplateKwargs = Dict[str, Any]
 
 
+class FanoutGroup(TypedDict):
+    email: EmailKwargs
+    recipients: List[Dict[str, Any]]
+
+
+class EmailFanout:
+    """Collects the emails of a notification sent to many users, to render each variant of the email only once
+
+    Recipients are grouped by everything used to render the email except their name,
+    the email is rendered once per group, when its first recipient is added, with :data:`RECIPIENT_NAME_PLACEHOLDER`
+    as the name. The placeholder is replaced for each recipient, and the emails are sent the same as
+    with :func:`send_email` (using ``EMAIL_BUFFER`` if enabled).
+
+    Emails are only sent when calling :meth:`send`.
+    """
+
+    def __init__(self):
+        self.groups: Dict[Tuple[Hashable, bool], FanoutGroup] = {}
+
+    def add(self, key: Hashable, to: str, name: Optional[str], render: Callable[[Optional[str]], EmailKwargs]) -> None:
+        """Adds a recipient to the group of ``key``
+
+        :param key: Identifies the rendering context of the email
+        :param to: Email address of the recipient
+        :param name: Name of the recipient
+        :param render: Renders the email with the given name, called for the first recipient of the group
+        """
+
+        # Recipients without a name are rendered separately, templates use ``{% if name %}``
+        group_key = (key, bool(name))
+        if group_key not in self.groups:
+            self.groups[group_key] = FanoutGroup(
+                email=render(RECIPIENT_NAME_PLACEHOLDER if name else None),
+                recipients=[],
+            )
+        self.groups[group_key]["recipients"].append({"to": [to], "name": name or None})
+
+    def add_user_email(
+        self,
+        user: User,
+        template: str,
+        language: str,
+        timezone: str,
+        template_kwargs: TemplateKwargs,
+    ) -> None:
+        context = {key: value for key, value in template_kwargs.items() if key != "name"}
+        key = (template, language, timezone, _get_fanout_context_key(context))
+
+        def render(name: Optional[str]) -> EmailKwargs:
+            return _render_localized_email(template, language, timezone, dict(context, name=name))
+
+        self.add(key, user["email"], template_kwargs.get("name"), render)
+
+    def send(self) -> None:
+        for group in self.groups.values():
+            email_kwargs = group["email"]
+            text_body = email_kwargs.get("text_body")
+            html_body = email_kwargs.get("html_body")
+            subject = email_kwargs["subject"]
+            text_body = handle_long_lines_text(text_body) if text_body else None
+            html_body = handle_long_lines_html(html_body) if html_body else None
+            sender_name = email_kwargs.get("sender_name") or current_app.config.get("EMAIL_DEFAULT_SENDER_NAME")
+            for recipient in group["recipients"]:
+                name = recipient.get("name")
+                _queue_email(
+                    {
+                        "to": recipient["to"],
+                        "subject": _substitute_recipient_name(subject, name, True),
+                        "text_body": _substitute_recipient_name(text_body, name),
+                        "html_body": _substitute_recipient_name(html_body, name, True),
+                        "sender": None,
+                        "sender_name": sender_name,
+                        "attachments_info": None,
+                    }
+                )
+        self.groups = {}
+
+
+def _get_fanout_context_key(context: TemplateKwargs) -> Tuple[Any, ...]:
+    """Returns the part of the fan-out key identifying the notification context
+
+    The item is identified by its id, version and search highlights (which depend on the topic query),
+    other values are serialised, as they are small compared to the item.
+    """
+
+    key: List[Any] = []
+    for name, value in sorted(context.items()):
+        if name == "item":
+            value = tuple(str(value.get(field)) for field in ("_id", "version", "_etag", "versioncreated", "_updated"))
+            value += (json.dumps(context["item"].get("es_highlight"), sort_keys=True, default=str),)
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = json.dumps(value, sort_keys=True, default=str)
+        key.append((name, value))
+    return tuple(key)
+
+
 def send_user_email(
     user: User,
     template: str,
     template_kwargs: Optional[TemplateKwargs] = None,
     ignore_preferences=False,  # ignore user email preferences
+    fanout: Optional[EmailFanout] = None,
     **kwargs: EmailKwargs,
 ) -> None:
-    """Send an email to Newsroom user, respecting user's email preferences."""
+    """Send an email to Newsroom user, respecting user's email preferences.
+
+    If ``fanout`` is provided and there are no extra email arguments,
+    the email is added to it and sent with :meth:`EmailFanout.send`.
+    """
     if not user.get("receive_email") and not ignore_preferences:
         # If this is a user in the system, and has emails disabled
         # then skip this recipient
         return
     language = user.get("locale") or current_app.config["DEFAULT_LANGUAGE"]
     timezone = get_user_timezone(user)
+    if fanout is not None and not kwargs:
+        fanout.add_user_email(user, template, language, timezone, template_kwargs or {})
+        return
     _send_localized_email([user["email"]], template, language, timezone, template_kwargs or {}, kwargs)
 
 
@@ -262,6 +441,14 @@ def _send_localized_email(
     template_kwargs: TemplateKwargs,
     email_kwargs: EmailKwargs,
 ) -> None:
+    send_email(to=to, **_render_localized_email(template, language, timezone, template_kwargs), **email_kwargs)
+
+
+def _render_localized_email(
+    template: str, language: str, timezone: str, template_kwargs: TemplateKwargs
+) -> EmailKwargs:
+    """Returns the subject, bodies and sender name of the email rendered for the language and timezone"""
+
     language = to_email_language(language)
     email_templates = get_resource_service("email_templates")
     html_template = get_language_template_name(template, language, "html")
@@ -270,13 +457,11 @@ def _send_localized_email(
         subject = email_templates.get_translated_subject(template, language, **template_kwargs)
         template_kwargs.setdefault("subject", subject)
         template_kwargs.setdefault("recipient_language", language)
-        send_email(
-            to=to,
+        return dict(
             subject=subject,
             text_body=render_template(text_template, **template_kwargs),
             html_body=render_template(html_template, **template_kwargs),
             sender_name=get_sender_name(language),
-            **email_kwargs,
         )
 
 
@@ -363,19 +548,22 @@ def send_reset_password_email(user: User, token: str) -> None:
     )
 
 
-def send_new_item_notification_email(user, topic_name, item, section="wire"):
+def send_new_item_notification_email(
+    user, topic_name, item, section="wire", fanout: Optional[EmailFanout] = None, topic_id=None
+):
     if item.get("type") == "text":
-        _send_new_wire_notification_email(user, topic_name, item, section)
+        _send_new_wire_notification_email(user, topic_name, item, section, fanout, topic_id)
     else:
-        _send_new_agenda_notification_email(user, topic_name, item)
+        _send_new_agenda_notification_email(user, topic_name, item, fanout, topic_id)
 
 
-def _send_new_wire_notification_email(user, topic_name, item, section):
+def _send_new_wire_notification_email(user, topic_name, item, section, fanout=None, topic_id=None):
     url = url_for("wire.item", _id=item.get("guid") or item["_id"], _external=True)
     template_kwargs = dict(
         app_name=current_app.config["SITE_NAME"],
         is_topic=True,
         topic_name=topic_name,
+        topic_id=str(topic_id) if topic_id else None,
         name=user.get("first_name"),
         item=item,
         url=url,
@@ -386,6 +574,7 @@ def _send_new_wire_notification_email(user, topic_name, item, section):
         user,
         template="new_wire_notification_email",
         template_kwargs=template_kwargs,
+        fanout=fanout,
     )
 
 
@@ -398,13 +587,14 @@ def _remove_restricted_coverage_info(user, item):
         remove_restricted_coverage_info([item])
 
 
-def _send_new_agenda_notification_email(user, topic_name, item):
+def _send_new_agenda_notification_email(user, topic_name, item, fanout=None, topic_id=None):
     _remove_restricted_coverage_info(user, item)
     url = url_for_agenda(item, _external=True)
     template_kwargs = dict(
         app_name=current_app.config["SITE_NAME"],
         is_topic=True,
         topic_name=topic_name,
+        topic_id=str(topic_id) if topic_id else None,
         name=user.get("first_name"),
         item=item,
         url=url,
@@ -420,17 +610,18 @@ def _send_new_agenda_notification_email(user, topic_name, item):
         user=user,
         template="new_agenda_notification_email",
         template_kwargs=template_kwargs,
+        fanout=fanout,
     )
 
 
-def send_history_match_notification_email(user, item, section):
+def send_history_match_notification_email(user, item, section, fanout: Optional[EmailFanout] = None):
     if item.get("type") == "text":
-        _send_history_match_wire_notification_email(user, item, section)
+        _send_history_match_wire_notification_email(user, item, section, fanout)
     else:
-        _send_history_match_agenda_notification_email(user, item)
+        _send_history_match_agenda_notification_email(user, item, fanout)
 
 
-def _send_history_match_wire_notification_email(user, item, section):
+def _send_history_match_wire_notification_email(user, item, section, fanout=None):
     app_name = current_app.config["SITE_NAME"]
     url = url_for("wire.item", _id=item.get("guid") or item["_id"], _external=True)
     template_kwargs = dict(
@@ -446,10 +637,11 @@ def _send_history_match_wire_notification_email(user, item, section):
         user,
         template="updated_wire_notification_email",
         template_kwargs=template_kwargs,
+        fanout=fanout,
     )
 
 
-def _send_history_match_agenda_notification_email(user, item):
+def _send_history_match_agenda_notification_email(user, item, fanout=None):
     _remove_restricted_coverage_info(user, item)
     app_name = current_app.config["SITE_NAME"]
     url = url_for_agenda(item, _external=True)
@@ -471,35 +663,53 @@ def _send_history_match_agenda_notification_email(user, item):
         user,
         template="updated_agenda_notification_email",
         template_kwargs=template_kwargs,
+        fanout=fanout,
     )
 
 
-def send_item_killed_notification_email(user, item):
+def send_item_killed_notification_email(user, item, fanout: Optional[EmailFanout] = None):
     if item.get("type") == "text":
-        _send_wire_killed_notification_email(user, item)
+        render = _render_wire_killed_notification_email
     else:
-        _send_agenda_killed_notification_email(user, item)
+        render = _render_agenda_killed_notification_email
+
+    if fanout is not None:
+        # The notice is the same for all the users
+        fanout.add("{}:{}".format(render.__name__, item.get("_id")), user["email"], None, lambda _name: render(item))
+        return
+
+    send_email(to=[user["email"]], **render(item))
 
 
-def _send_wire_killed_notification_email(user, item):
+def _render_wire_killed_notification_email(item) -> EmailKwargs:
     formatter = current_app.download_formatters["text"]["formatter"]
-    recipients = [user["email"]]
     subject = gettext("Kill/Takedown notice")
     text_body = to_text(formatter.format_item(item))
+    return dict(subject=subject, text_body=text_body)
 
-    send_email(to=recipients, subject=subject, text_body=text_body)
 
-
-def _send_agenda_killed_notification_email(user, item):
+def _render_agenda_killed_notification_email(item) -> EmailKwargs:
     formatter = current_app.download_formatters["text"]["formatter"]
-    recipients = [user["email"]]
     subject = gettext("%(section)s cancelled notice", section=current_app.config["AGENDA_SECTION"])
     text_body = to_text(formatter.format_item(item, item_type="agenda"))
-
-    send_email(to=recipients, subject=subject, text_body=text_body)
+    return dict(subject=subject, text_body=text_body)
 
 
 def to_text(output: Union[str, bytes]) -> str:
     if isinstance(output, bytes):
         return output.decode("utf-8")
     return output
+
+
+def init_app(app):
+    register_resource(EMAIL_ATTACHMENTS_RESOURCE, EmailAttachmentsResource, EmailAttachmentsService, _app=app)
+
+    if app.config.get("EMAIL_BUFFER"):
+        app.extensions["email_buffer"] = WriteBuffer(
+            app,
+            "email",
+            flush_emails_to_celery,
+            batch_size=app.config.get("EMAIL_BUFFER_BATCH_SIZE", 100),
+            flush_interval=app.config.get("EMAIL_BUFFER_FLUSH_INTERVAL", 500),
+            max_size=app.config.get("EMAIL_BUFFER_MAX_SIZE", 10000),
+        )
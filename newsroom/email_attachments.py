@@ -0,0 +1,86 @@
+import io
+import logging
+from datetime import timedelta
+from typing import Dict, Optional
+
+from flask import current_app as app
+from superdesk import get_resource_service
+from superdesk.utc import utcnow
+
+from newsroom import Resource, Service, MongoIndexes
+from newsroom.celery_app import celery
+
+logger = logging.getLogger(__name__)
+
+EMAIL_ATTACHMENTS_RESOURCE = "email_attachments"
+
+
+class EmailAttachmentsResource(Resource):
+    """Email attachments stored in media storage, referenced by id in the email tasks
+
+    Removed by :func:`remove_expired_email_attachments` after ``EMAIL_ATTACHMENTS_EXPIRY_HOURS``.
+    """
+
+    schema = {
+        "media": {"type": "string"},
+        "file_name": {"type": "string"},
+        "content_type": {"type": "string"},
+    }
+
+    mongo_indexes: MongoIndexes = {
+        "created": ([("_created", 1)], {}),
+    }
+
+    internal_resource = True
+
+
+class EmailAttachmentsService(Service):
+    pass
+
+
+def store_email_attachment(content: bytes, file_name: str, content_type: str, file_desc: str) -> Dict[str, str]:
+    """Store the attachment once in media storage, returns the ``attachments_info`` entry referencing it
+
+    The same entry can be used for any number of emails, only the media id is sent to the email tasks.
+    """
+
+    media_id = str(
+        app.media.put(
+            io.BytesIO(content),
+            filename=file_name,
+            content_type=content_type,
+            resource=EMAIL_ATTACHMENTS_RESOURCE,
+        )
+    )
+    get_resource_service(EMAIL_ATTACHMENTS_RESOURCE).post(
+        [{"media": media_id, "file_name": file_name, "content_type": content_type}]
+    )
+    return {
+        "media": media_id,
+        "file_name": file_name,
+        "content_type": content_type,
+        "file_desc": file_desc,
+    }
+
+
+def get_email_attachment_content(media_id: str) -> Optional[bytes]:
+    media_file = app.media.get(media_id, EMAIL_ATTACHMENTS_RESOURCE)
+    return media_file.read() if media_file else None
+
+
+@celery.task(soft_time_limit=600)
+def remove_expired_email_attachments():
+    expired = utcnow() - timedelta(hours=app.config.get("EMAIL_ATTACHMENTS_EXPIRY_HOURS", 24))
+    collection = app.data.get_mongo_collection(EMAIL_ATTACHMENTS_RESOURCE)
+
+    removed = []
+    for attachment in collection.find({"_created": {"$lt": expired}}):
+        try:
+            app.media.delete(attachment["media"], EMAIL_ATTACHMENTS_RESOURCE)
+            removed.append(attachment["_id"])
+        except Exception:
+            logger.exception("Failed to remove email attachment %s", attachment["media"])
+
+    if removed:
+        collection.delete_many({"_id": {"$in": removed}})
+        logger.info("Removed %d expired email attachments", len(removed))
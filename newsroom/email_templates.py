@@ -1,8 +1,11 @@
-from typing import Optional
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
 import logging
 import newsroom
 
-from flask import render_template_string, current_app
+from flask import render_template, current_app
+from jinja2 import Template
 from flask_babel import gettext
 from werkzeug.exceptions import BadRequest, NotFound
 from eve.utils import config
@@ -69,6 +72,12 @@ DEFAULT_SUBJECTS = {
 
 
 class EmailTemplatesService(CacheableService):
+    def __init__(self, datasource=None, backend=None):
+        super().__init__(datasource=datasource, backend=backend)
+        # Compiled subject templates by (template id, language, subject), least recently used first
+        self._compiled_subjects: "OrderedDict[Tuple[str, str, str], Template]" = OrderedDict()
+        self._compiled_subjects_lock = Lock()
+
     def find_one(self, req, **lookup):
         email = super().find_one(req, **lookup)
 
@@ -97,6 +106,51 @@ class EmailTemplatesService(CacheableService):
         self.enhance_items([item])
         return item
 
+    def on_created(self, docs):
+        super().on_created(docs)
+        for doc in docs:
+            self.invalidate_compiled_subjects(doc[config.ID_FIELD])
+
+    def on_updated(self, updates, original):
+        super().on_updated(updates, original)
+        self.invalidate_compiled_subjects(original[config.ID_FIELD])
+
+    def on_replaced(self, document, original):
+        super().on_replaced(document, original)
+        self.invalidate_compiled_subjects(original[config.ID_FIELD])
+
+    def on_deleted(self, doc):
+        super().on_deleted(doc)
+        self.invalidate_compiled_subjects(doc[config.ID_FIELD])
+
+    def invalidate_compiled_subjects(self, email_id: str):
+        with self._compiled_subjects_lock:
+            for key in [key for key in self._compiled_subjects if key[0] == email_id]:
+                del self._compiled_subjects[key]
+
+    def get_compiled_subject(self, email_id: str, language_code: str, subject: str) -> Template:
+        """Returns the compiled subject template, compiling it only once per template id, language and subject
+
+        The subject source is part of the key, so a template edited in another process is compiled again.
+        """
+
+        key = (email_id, language_code, subject)
+        with self._compiled_subjects_lock:
+            template = self._compiled_subjects.get(key)
+            if template is not None:
+                self._compiled_subjects.move_to_end(key)
+                return template
+
+        template = current_app.jinja_env.from_string(subject)
+        with self._compiled_subjects_lock:
+            self._compiled_subjects[key] = template
+            while len(self._compiled_subjects) > current_app.config.get("EMAIL_SUBJECTS_CACHE_SIZE", 500):
+                self._compiled_subjects.popitem(last=False)
+        return template
+
+    def render_subject(self, email_id: str, language_code: str, subject: str, **kwargs) -> str:
+        return render_template(self.get_compiled_subject(email_id, language_code, subject), **kwargs)
+
     def enhance_items(self, docs):
         for email in docs:
             email_id = email["_id"]
@@ -105,18 +159,21 @@ class EmailTemplatesService(CacheableService):
             email["subject"].setdefault("translations", {})
 
     def get_translated_subject(self, email_id: str, language_code: Optional[str] = None, **kwargs) -> str:
-        language_code = language_code or current_app.config["DEFAULT_LANGUAGE"]
-        email = self.get_cached_by_id(email_id)
+        language_code = (language_code or current_app.config["DEFAULT_LANGUAGE"]).lower()
+        # The cached template is used as is, the default subject is taken from ``DEFAULT_SUBJECTS`` if not set
+        email = super().get_cached_by_id(email_id)
+        subjects = email.get("subject") or {}
+        default_subject = subjects["default"] if "default" in subjects else DEFAULT_SUBJECTS[email_id]
 
         try:
-            subject = email["subject"]["translations"][language_code.lower()]
-        except (KeyError, AttributeError):
-            subject = email["subject"]["default"]
+            subject = subjects["translations"][language_code]
+        except (KeyError, AttributeError, TypeError):
+            subject = default_subject
 
         try:
-            return render_template_string(subject, **kwargs)
+            return self.render_subject(email_id, language_code, subject, **kwargs)
         except Exception as ex:
-            if subject == email["subject"]["default"]:
+            if subject == default_subject:
                 logger.error("Failed to render email subject")
                 logger.exception(ex)
                 raise
@@ -125,8 +182,7 @@ class EmailTemplatesService(CacheableService):
             # If the rendering fails, assume it is an error with the translation template
             # and fallback to using the default template
             logger.warning("Failed to render custom email subject, reverting to default instead")
-            subject = email["subject"]["default"]
-            return render_template_string(subject, **kwargs)
+            return self.render_subject(email_id, language_code, default_subject, **kwargs)
         except Exception as ex:
             logger.error("Failed to render email subject using default template")
             logger.exception(ex)
@@ -1,18 +1,24 @@
+import logging
+from typing import Optional
+
 import pymongo.errors
 import werkzeug.exceptions
 
 from superdesk import get_resource_service
 from superdesk.resource import not_analyzed, not_enabled
 from superdesk.utc import utcnow
-from flask import json, abort, Blueprint, jsonify
+from flask import current_app as app, json, abort, Blueprint, jsonify
 from flask_babel import gettext
 from eve.utils import ParsedRequest
 
 import newsroom
 from newsroom.utils import get_json_or_400
 from newsroom.auth import get_user
+from newsroom.celery_app import celery
+from newsroom.write_buffer import WriteBuffer
 
 blueprint = Blueprint("history", __name__)
+logger = logging.getLogger(__name__)
 
 
 class HistoryResource(newsroom.Resource):
@@ -41,6 +47,19 @@ class HistoryResource(newsroom.Resource):
 
 class HistoryService(newsroom.Service):
     def create(self, docs, action, user, section="wire", **kwargs):
+        history_docs = self.get_history_records(docs, action, user, section)
+        if not history_docs:
+            return []
+
+        if len(history_docs) == 1:
+            try:
+                return super().create(history_docs)
+            except (werkzeug.exceptions.Conflict, pymongo.errors.BulkWriteError):
+                return []
+
+        return self.bulk_create(history_docs)
+
+    def get_history_records(self, items, action, user, section="wire"):
         now = utcnow()
 
         def transform(item):
@@ -54,14 +73,16 @@ class HistoryService(newsroom.Service):
                 "section": section,
             }
 
-        for doc in docs:
-            try:
-                super().create([transform(doc)])
-            except (werkzeug.exceptions.Conflict, pymongo.errors.BulkWriteError):
-                continue
+        return [transform(item) for item in items]
 
     def create_history_record(self, items, action, user, section):
-        self.create(items, action, user, section)
+        history_buffer: Optional[WriteBuffer] = app.extensions.get("history_buffer")
+        if history_buffer is None:
+            self.create(items, action, user, section)
+            return
+
+        for record in self.get_history_records(items, action, user, section):
+            history_buffer.add(record)
 
     def query_items(self, query):
         if query["from"] >= 1000:
@@ -83,37 +104,67 @@ class HistoryService(newsroom.Service):
 
         return {"items": docs, "hits": results.hits}
 
+    def fetch_history_users(self, query, page_size=1000):
+        """Returns the unique IDs of the users with history records matching the query
+
+        Uses a composite aggregation on ``user``, so the history records aren't loaded,
+        and the number of requests depends on the number of users rather than the number of records.
+
+        :param query: ES query used to filter the history records
+        :param page_size: Number of users to return per request
+        :return: List of user IDs
+        """
+
+        source = {
+            "query": query,
+            "size": 0,
+            "aggs": {
+                "users": {
+                    "composite": {
+                        "size": page_size,
+                        "sources": [{"user": {"terms": {"field": "user"}}}],
+                    },
+                },
+            },
+        }
+
+        user_ids = []
+        while True:
+            req = ParsedRequest()
+            req.args = {"source": json.dumps(source)}
+            results = super().get(req, None)
+            aggregation = (results.hits.get("aggregations") or {}).get("users") or {}
+            buckets = aggregation.get("buckets") or []
+            user_ids.extend(bucket["key"]["user"] for bucket in buckets)
+
+            if len(buckets) < page_size or not aggregation.get("after_key"):
+                return user_ids
+
+            source["aggs"]["users"]["composite"]["after"] = aggregation["after_key"]
+
 
 def get_history_users(item_ids, active_user_ids, active_company_ids, section, action):
-    source = {
-        "query": {
-            "bool": {
-                "filter": [
-                    {
-                        "bool": {
-                            "should": [
-                                {"terms": {"company": [str(a) for a in active_company_ids]}},
-                                {"bool": {"must_not": [{"exists": {"field": "company"}}]}},
-                            ],
-                            "minimum_should_match": 1,
-                        },
+    query = {
+        "bool": {
+            "filter": [
+                {
+                    "bool": {
+                        "should": [
+                            {"terms": {"company": [str(a) for a in active_company_ids]}},
+                            {"bool": {"must_not": [{"exists": {"field": "company"}}]}},
+                        ],
+                        "minimum_should_match": 1,
                     },
-                    {"terms": {"item": [str(i) for i in item_ids]}},
-                    {"term": {"section": section}},
-                    {"term": {"action": action}},
-                ]
-            }
-        },
-        "size": 25,
-        "from": 0,
+                },
+                {"terms": {"item": [str(i) for i in item_ids]}},
+                {"term": {"section": section}},
+                {"term": {"action": action}},
+                {"terms": {"user": [str(uid) for uid in active_user_ids]}},
+            ]
+        }
     }
 
-    # Get the results
-    histories = get_resource_service("history").fetch_history(source, all=True).get("items") or []
-
-    # Filter out the users
-    user_ids = [str(uid) for uid in active_user_ids]
-    return [str(h["user"]) for h in histories if h.get("user") in user_ids]
+    return get_resource_service("history").fetch_history_users(query)
 
 
 @blueprint.route("/history/new", methods=["POST"])
@@ -128,5 +179,28 @@ def create():
     return jsonify({"success": True}), 201
 
 
+@celery.task
+def bulk_create_history_records(records):
+    get_resource_service("history").bulk_create(records)
+
+
+def flush_history_records(records):
+    get_resource_service("history").bulk_create(records)
+
+
+def flush_history_records_to_celery(records):
+    bulk_create_history_records.delay(records)
+
+
 def init_app(app):
     newsroom.register_resource("history", HistoryResource, HistoryService, _app=app)
+
+    if app.config.get("HISTORY_BUFFER"):
+        app.extensions["history_buffer"] = WriteBuffer(
+            app,
+            "history",
+            flush_history_records_to_celery if app.config["HISTORY_BUFFER"] == "celery" else flush_history_records,
+            batch_size=app.config.get("HISTORY_BUFFER_BATCH_SIZE", 100),
+            flush_interval=app.config.get("HISTORY_BUFFER_FLUSH_INTERVAL", 500),
+            max_size=app.config.get("HISTORY_BUFFER_MAX_SIZE", 10000),
+        )
@@ -0,0 +1,150 @@
+import atexit
+import logging
+import os
+import smtplib
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app
+from flask_mail import Connection, Message
+
+logger = logging.getLogger(__name__)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Returns True if the connection must be discarded, and the message sent again using a new connection
+
+    SMTP errors are also ``OSError``, but only a disconnection means the connection is unusable.
+    """
+
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+class PooledMailConnection:
+    """Persistent SMTP connection of a process, reused by all the emails sent by it
+
+    Avoids the connection, TLS handshake and authentication per email done by ``app.mail.send``.
+    The connection is checked with ``NOOP`` if it wasn't used for ``EMAIL_CONNECTION_MAX_IDLE`` seconds,
+    and opened again if the server closed it. Messages are sent one at a time, from any thread.
+
+    Counters of the emails sent are kept in :attr:`stats`, for monitoring.
+
+    :param app: Flask app, with Flask-Mail configured
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self.lock = threading.Lock()
+        self.connection: Optional[Connection] = None
+        self.pid = os.getpid()
+        self.last_used = 0.0
+        self.stats: Dict[str, float] = {"sent": 0, "failed": 0, "connections": 0, "reconnects": 0, "send_time": 0.0}
+        atexit.register(self.close)
+
+    def send(self, message: Message) -> None:
+        """Send the message, reconnecting once if the connection was lost
+
+        :raises Exception: If the message can't be sent, the connection is kept for the next messages
+        """
+
+        mail = self.app.mail
+        if mail.suppress:
+            # Nothing is sent (i.e. testing), so there is no connection to reuse
+            mail.send(message)
+            return
+
+        start = time.monotonic()
+        with self.lock:
+            try:
+                for attempt in range(2):
+                    try:
+                        self._get_connection().send(message)
+                        self.stats["sent"] += 1
+                        return
+                    except OSError as error:
+                        if not is_connection_error(error):
+                            raise
+                        self._close()
+                        if attempt:
+                            raise
+                        self.stats["reconnects"] += 1
+                        logger.warning("SMTP connection lost, reconnecting")
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self.last_used = time.monotonic()
+                self.stats["send_time"] += self.last_used - start
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _get_connection(self) -> Connection:
+        if self.pid != os.getpid():
+            # Forked process, the parent's connection can't be shared
+            self.connection = None
+            self.pid = os.getpid()
+
+        max_idle = self.app.config.get("EMAIL_CONNECTION_MAX_IDLE", 30)
+        if self.connection is not None and time.monotonic() - self.last_used > max_idle and not self._is_alive():
+            self._close()
+
+        if self.connection is None:
+            self.connection = self.app.mail.connect().__enter__()
+            self.stats["connections"] += 1
+        return self.connection
+
+    def _is_alive(self) -> bool:
+        try:
+            return self.connection.host.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _close(self) -> None:
+        if self.connection is None:
+            return
+        try:
+            self.connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.connection = None
+
+
+def get_mail_connection(app: Optional[Flask] = None) -> PooledMailConnection:
+    """Returns the pooled mail connection of the app, created on first use"""
+
+    app = app or current_app._get_current_object()
+    if "mail_connection" not in app.extensions:
+        app.extensions["mail_connection"] = PooledMailConnection(app)
+    return app.extensions["mail_connection"]
+
+
+def send_messages(messages: List[Message]) -> int:
+    """Send the messages using the pooled connection, a failed message doesn't stop the others
+
+    The throughput of the batch is logged.
+
+    :return: Number of messages sent
+    """
+
+    connection = get_mail_connection()
+    start = time.monotonic()
+    sent = 0
+    for message in messages:
+        try:
+            connection.send(message)
+            sent += 1
+        except Exception:
+            logger.exception("Failed to send email to {}".format(message.recipients))
+
+    elapsed = time.monotonic() - start
+    logger.info(
+        "Sent %d of %d emails in %.2fs (%.1f emails/s)",
+        sent,
+        len(messages),
+        elapsed,
+        sent / elapsed if elapsed else sent,
+    )
+    return sent
@@ -8,9 +8,9 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
-import base64
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from bson import ObjectId
 from urllib.parse import urlparse
 
@@ -23,6 +23,7 @@ from superdesk.lock import lock, unlock
 
 from newsroom.celery_app import celery
 from newsroom.email import send_user_email
+from newsroom.email_attachments import store_email_attachment
 from newsroom.settings import get_settings_collection, GENERAL_SETTINGS_LOOKUP
 from newsroom.utils import parse_date_str, get_items_by_id, get_entity_or_404
 
@@ -226,87 +227,149 @@ class MonitoringEmailAlerts(Command):
                 alert_monitoring["four"]["w_lists"].append(profile)
                 return
 
+    def get_profile_items(self, profiles, created_from, created_from_time):
+        """Search the new items for all the monitoring profiles, using a single multi-search request
+
+        :return: Dictionary of items by profile ID, missing the profiles that failed to search
+        """
+
+        search_service = get_resource_service("monitoring_search")
+        searches = []
+        searched_profiles = []
+
+        for m in profiles:
+            internal_req = ParsedRequest()
+            internal_req.args = {
+                "navigation": str(m["_id"]),
+                "created_from": created_from,
+                "created_from_time": created_from_time,
+                "skip_user_validation": True,
+            }
+
+            try:
+                searches.append(search_service.get_search_from_request(internal_req))
+                searched_profiles.append(m)
+            except Exception:
+                logger.exception(
+                    "{0} Failed to generate search for monitoring profile {1}".format(self.log_msg, m["name"])
+                )
+
+        try:
+            results = search_service.get_items_by_queries(searches)
+        except Exception:
+            # One of the profile queries failed, search them one at a time so the other profiles are still sent
+            logger.exception("{0} Failed to search monitoring profiles, searching each profile".format(self.log_msg))
+            results = []
+            for search in searches:
+                try:
+                    results.extend(search_service.get_items_by_queries([search]))
+                except Exception:
+                    results.append(None)
+
+        return {m["_id"]: list(items) for m, items in zip(searched_profiles, results) if items is not None}
+
     def send_alerts(self, monitoring_list, created_from, created_from_time, now):
         general_settings = get_settings_collection().find_one(GENERAL_SETTINGS_LOOKUP)
         error_recipients = []
         if general_settings and general_settings["values"].get("system_alerts_recipients"):
             error_recipients = general_settings["values"]["system_alerts_recipients"].split(",")
 
+        profiles = [m for m in monitoring_list if m.get("users")]
+        profile_items = self.get_profile_items(profiles, created_from, created_from_time)
+        profile_users = {
+            str(user["_id"]): user
+            for user in get_items_by_id(list({ObjectId(u) for m in profiles for u in m["users"]}), "users")
+        }
+
+        flask_app = app._get_current_object()
+
+        def _send_profile_alerts(m):
+            with flask_app.app_context():
+                self.send_profile_alerts(m, profile_items, profile_users, error_recipients, now)
+
+        max_workers = app.config.get("MONITORING_ALERTS_MAX_WORKERS", 1)
+        if max_workers <= 1:
+            for m in monitoring_list:
+                self.send_profile_alerts(m, profile_items, profile_users, error_recipients, now)
+            return
+
+        # Profiles are rendered and sent concurrently, each in its own app context
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_send_profile_alerts, m) for m in monitoring_list]
+
+        for future in futures:
+            future.result()
+
+    def send_profile_alerts(self, m, profile_items, profile_users, error_recipients, now):
+        """Render and send the emails of the monitoring profile, using the items found by :meth:`get_profile_items`"""
+
         from newsroom.email import send_template_email
 
-        for m in monitoring_list:
-            if m.get("users"):
-                users = get_items_by_id([ObjectId(u) for u in m["users"]], "users")
-                internal_req = ParsedRequest()
-                internal_req.args = {
-                    "navigation": str(m["_id"]),
-                    "created_from": created_from,
-                    "created_from_time": created_from_time,
-                    "skip_user_validation": True,
-                }
-                items = list(get_resource_service("monitoring_search").get(req=internal_req, lookup=None))
-                template_kwargs = {"profile": m}
-                if items:
-                    company = get_entity_or_404(m["company"], "companies")
-                    try:
-                        template_kwargs.update(
-                            {
-                                "items": items,
-                                "section": "wire",
-                            }
-                        )
-                        truncate_article_body(items, m)
-                        _file = get_monitoring_file(m, items)
-                        attachment = base64.b64encode(_file.read())
-                        formatter = app.download_formatters[m["format_type"]]["formatter"]
-
-                        for user in users:
-                            send_user_email(
-                                user,
-                                template="monitoring_email",
-                                template_kwargs=template_kwargs,
-                                attachments_info=[
-                                    {
-                                        "file": attachment,
-                                        "file_name": formatter.format_filename(None),
-                                        "content_type": "application/{}".format(formatter.FILE_EXTENSION),
-                                        "file_desc": "Monitoring Report for Celery monitoring alerts for profile: {}".format(
-                                            m["name"]
-                                        ),
-                                    }
-                                ],
-                            )
-                    except Exception:
-                        logger.exception(
-                            "{0} Error processing monitoring profile {1} for company {2}.".format(
-                                self.log_msg, m["name"], company["name"]
-                            )
-                        )
-                        if error_recipients:
-                            # Send an email to admin
-                            template_kwargs = {
-                                "profile": m,
-                                "name": m["name"],
-                                "company": company["name"],
-                                "run_time": now,
-                            }
-                            send_template_email(
-                                to=error_recipients,
-                                template="monitoring_error",
-                                template_kwargs=template_kwargs,
-                            )
-                elif m["schedule"].get("interval") != "immediate" and m.get("always_send"):
+        if m.get("users"):
+            if m["_id"] not in profile_items:
+                # Failed to search for the profile items, try again on the next run
+                return
+
+            users = [profile_users[str(u)] for u in m["users"] if str(u) in profile_users]
+            items = profile_items[m["_id"]]
+            template_kwargs = {"profile": m}
+            if items:
+                company = get_entity_or_404(m["company"], "companies")
+                try:
+                    template_kwargs.update(
+                        {
+                            "items": items,
+                            "section": "wire",
+                        }
+                    )
+                    truncate_article_body(items, m)
+                    _file = get_monitoring_file(m, items)
+                    formatter = app.download_formatters[m["format_type"]]["formatter"]
+                    attachment = store_email_attachment(
+                        _file.read(),
+                        formatter.format_filename(None),
+                        "application/{}".format(formatter.FILE_EXTENSION),
+                        "Monitoring Report for Celery monitoring alerts for profile: {}".format(m["name"]),
+                    )
+
                     for user in users:
                         send_user_email(
                             user,
-                            template="monitoring_email_no_updates",
+                            template="monitoring_email",
                             template_kwargs=template_kwargs,
+                            attachments_info=[attachment],
                         )
-
-            get_resource_service("monitoring").patch(
-                m["_id"],
-                {"last_run_time": local_to_utc(app.config["DEFAULT_TIMEZONE"], now)},
-            )
+                except Exception:
+                    logger.exception(
+                        "{0} Error processing monitoring profile {1} for company {2}.".format(
+                            self.log_msg, m["name"], company["name"]
+                        )
+                    )
+                    if error_recipients:
+                        # Send an email to admin
+                        template_kwargs = {
+                            "profile": m,
+                            "name": m["name"],
+                            "company": company["name"],
+                            "run_time": now,
+                        }
+                        send_template_email(
+                            to=error_recipients,
+                            template="monitoring_error",
+                            template_kwargs=template_kwargs,
+                        )
+            elif m["schedule"].get("interval") != "immediate" and m.get("always_send"):
+                for user in users:
+                    send_user_email(
+                        user,
+                        template="monitoring_email_no_updates",
+                        template_kwargs=template_kwargs,
+                    )
+
+        get_resource_service("monitoring").patch(
+            m["_id"],
+            {"last_run_time": local_to_utc(app.config["DEFAULT_TIMEZONE"], now)},
+        )
 
 
 @celery.task(soft_time_limit=600)
@@ -18,6 +18,7 @@ from newsroom.utils import (
     set_version_creator,
 )
 from newsroom.upload import get_file
+from newsroom.products.products import invalidate_products_permission_index
 
 
 def get_settings_data():
@@ -118,3 +119,4 @@ def add_remove_products_for_navigation(nav_id: ObjectId, product_ids: List[str])
         else:
             db.update_one({"_id": product["_id"]}, {"$pull": {"navigations": nav_id}})
     cache.clean(["products"])
+    invalidate_products_permission_index()
@@ -1,7 +1,10 @@
-from superdesk import register_resource
+from superdesk import register_resource, get_resource_service
 from superdesk.resource import not_analyzed
 
 from newsroom import Resource, Service
+from newsroom.celery_app import celery
+from newsroom.write_buffer import WriteBuffer
+from .daily import NewsApiAuditDailyResource, NewsApiAuditDailyService, rollup_api_audit  # noqa
 
 
 not_analayzed_mapping = {"type": "string", "mapping": not_analyzed}
@@ -31,6 +34,43 @@ class NewsApiAuditResource(Resource):
     internal_resource = True
 
 
+@celery.task
+def bulk_create_api_audit_records(records):
+    get_resource_service("api_audit").bulk_create(records)
+
+
+def flush_api_audit_records(records):
+    get_resource_service("api_audit").bulk_create(records)
+
+
+def flush_api_audit_records_to_celery(records):
+    bulk_create_api_audit_records.delay(records)
+
+
+def get_audit_buffer_setting(app, name, default):
+    """Returns the ``NEWS_API_AUDIT_BUFFER_`` setting, or the ``HISTORY_BUFFER_`` one if not set"""
+
+    value = app.config.get("NEWS_API_AUDIT_BUFFER_{}".format(name))
+    if value is None:
+        value = app.config.get("HISTORY_BUFFER_{}".format(name), default)
+    return value
+
+
 def init_app(app):
     if app.config.get("NEWS_API_ENABLED"):
         register_resource("api_audit", NewsApiAuditResource, NewsApiAuditService, _app=app)
+        register_resource("api_audit_daily", NewsApiAuditDailyResource, NewsApiAuditDailyService, _app=app)
+
+        if app.config.get("NEWS_API_AUDIT_BUFFER"):
+            app.extensions["api_audit_buffer"] = WriteBuffer(
+                app,
+                "api_audit",
+                (
+                    flush_api_audit_records_to_celery
+                    if app.config["NEWS_API_AUDIT_BUFFER"] == "celery"
+                    else flush_api_audit_records
+                ),
+                batch_size=get_audit_buffer_setting(app, "BATCH_SIZE", 100),
+                flush_interval=get_audit_buffer_setting(app, "FLUSH_INTERVAL", 500),
+                max_size=get_audit_buffer_setting(app, "MAX_SIZE", 10000),
+            )
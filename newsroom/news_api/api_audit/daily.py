@@ -0,0 +1,218 @@
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app as app
+from pymongo import UpdateOne
+from superdesk import get_resource_service
+from superdesk.utc import utcnow, utc
+
+from newsroom import Resource, Service, MongoIndexes
+from newsroom.celery_app import celery
+
+logger = logging.getLogger(__name__)
+
+#: Number of composite aggregation buckets loaded per request
+ROLLUP_BUCKETS_SIZE = 1000
+
+ApiUsage = Dict[str, Dict[str, int]]
+
+
+class NewsApiAuditDailyResource(Resource):
+    """Daily number of News API requests, per company and endpoint
+
+    Maintained by :func:`rollup_api_audit` from the raw ``api_audit`` records.
+    """
+
+    schema = {
+        "date": {"type": "datetime"},
+        "subscriber": {"type": "string"},
+        "endpoint": {"type": "string"},
+        "count": {"type": "integer"},
+    }
+
+    mongo_indexes: MongoIndexes = {
+        "date_subscriber_endpoint": (
+            [("date", 1), ("subscriber", 1), ("endpoint", 1)],
+            {"unique": True},
+        ),
+    }
+
+    internal_resource = True
+
+
+def get_day_start(date: datetime) -> datetime:
+    return datetime.combine(date.date(), time(), tzinfo=utc)
+
+
+def add_usage(usage: ApiUsage, subscriber: str, endpoint: str, count: int):
+    usage.setdefault(subscriber, {})
+    usage[subscriber][endpoint] = usage[subscriber].get(endpoint, 0) + count
+
+
+class NewsApiAuditDailyService(Service):
+    def get_audit_usage(self, date_range: Dict[str, datetime], subscribers: Optional[List[str]] = None) -> ApiUsage:
+        """Returns the number of requests per company and endpoint from the raw ``api_audit`` records
+
+        :param date_range: Elasticsearch range of the ``created`` field
+        :param subscribers: Only count the requests of these companies
+        """
+
+        filters: List[Dict[str, Any]] = [{"range": {"created": date_range}}]
+        if subscribers is not None:
+            filters.append({"terms": {"subscriber": [str(subscriber) for subscriber in subscribers]}})
+
+        source: Dict[str, Any] = {
+            "query": {"bool": {"filter": filters}},
+            "size": 0,
+            "aggs": {
+                "usage": {
+                    "composite": {
+                        "size": ROLLUP_BUCKETS_SIZE,
+                        "sources": [
+                            {"subscriber": {"terms": {"field": "subscriber"}}},
+                            {"endpoint": {"terms": {"field": "endpoint"}}},
+                        ],
+                    },
+                },
+            },
+        }
+
+        es = app.data.elastic.elastic("api_audit")
+        index = app.data.elastic._resource_index("api_audit")
+        usage: ApiUsage = {}
+        while True:
+            aggregation = es.search(index=index, body=source)["aggregations"]["usage"]
+            for bucket in aggregation["buckets"]:
+                add_usage(usage, bucket["key"]["subscriber"], bucket["key"]["endpoint"], bucket["doc_count"])
+
+            if len(aggregation["buckets"]) < ROLLUP_BUCKETS_SIZE or not aggregation.get("after_key"):
+                return usage
+
+            source["aggs"]["usage"]["composite"]["after"] = aggregation["after_key"]
+
+    def get_rolled_up_until(self) -> Optional[datetime]:
+        """Returns the end of the last day with rollups, the raw records must be used after this date"""
+
+        last = app.data.get_mongo_collection(self.datasource).find_one({}, sort=[("date", -1)])
+        return last["date"] + timedelta(days=1) if last else None
+
+    def get_first_audit_date(self) -> Optional[datetime]:
+        es = app.data.elastic.elastic("api_audit")
+        response = es.search(
+            index=app.data.elastic._resource_index("api_audit"),
+            body={"size": 1, "sort": [{"created": "asc"}], "_source": ["created"]},
+        )
+        docs = app.data.elastic._parse_hits(response, "api_audit").docs
+        return docs[0]["created"] if docs else None
+
+    def rollup_day(self, day: datetime):
+        """Creates or updates the rollups of the given day, can be run repeatedly for the same day"""
+
+        usage = self.get_audit_usage({"gte": day, "lt": day + timedelta(days=1)})
+        now = utcnow()
+        requests = [
+            UpdateOne(
+                {"date": day, "subscriber": subscriber, "endpoint": endpoint},
+                {"$set": {"count": count, "_updated": now}, "$setOnInsert": {"_created": now}},
+                upsert=True,
+            )
+            for subscriber, endpoints in usage.items()
+            for endpoint, count in endpoints.items()
+        ]
+
+        if requests:
+            app.data.get_mongo_collection(self.datasource).bulk_write(requests, ordered=False)
+
+    def rollup(self, now: Optional[datetime] = None):
+        """Rolls up the raw records of all the complete days since the last rollup
+
+        The last rolled up day is rolled up again, to include records written late by the audit buffer.
+        """
+
+        today = get_day_start(now or utcnow())
+        rolled_up_until = self.get_rolled_up_until()
+        if rolled_up_until:
+            day = rolled_up_until - timedelta(days=1)
+        else:
+            first_audit_date = self.get_first_audit_date()
+            if not first_audit_date:
+                return
+            day = get_day_start(first_audit_date)
+
+        while day < today:
+            logger.info("Rolling up News API audit of %s", day.date())
+            self.rollup_day(day)
+            day += timedelta(days=1)
+
+    def get_rollup_usage(self, start: datetime, end: datetime, subscribers: Optional[List[str]] = None) -> ApiUsage:
+        """Returns the number of requests per company and endpoint from the rollups of the days in ``[start, end)``"""
+
+        match: Dict[str, Any] = {"date": {"$gte": start, "$lt": end}}
+        if subscribers is not None:
+            match["subscriber"] = {"$in": [str(subscriber) for subscriber in subscribers]}
+
+        usage: ApiUsage = {}
+        for group in app.data.get_mongo_collection(self.datasource).aggregate(
+            [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": {"subscriber": "$subscriber", "endpoint": "$endpoint"},
+                        "count": {"$sum": "$count"},
+                    }
+                },
+            ]
+        ):
+            add_usage(usage, group["_id"]["subscriber"], group["_id"]["endpoint"], group["count"])
+        return usage
+
+    def get_usage(self, date_range: Dict[str, datetime], subscribers: Optional[List[str]] = None) -> ApiUsage:
+        """Returns the number of requests per company and endpoint in the given date range
+
+        The complete days already rolled up are read from the rollups,
+        only the partial days at the edges of the range and the days not rolled up yet use the raw records.
+
+        :param date_range: Range with optional ``gt`` and ``lt`` dates
+        :param subscribers: Only count the requests of these companies
+        """
+
+        start = date_range.get("gt")
+        end = date_range.get("lt")
+        rolled_up_until = self.get_rolled_up_until()
+
+        first_day = None
+        if start:
+            first_day = get_day_start(start)
+            if first_day < start:
+                first_day += timedelta(days=1)
+
+        last_day = rolled_up_until
+        if end and rolled_up_until:
+            last_day = min(get_day_start(end), rolled_up_until)
+
+        if not last_day or (first_day and first_day >= last_day):
+            return self.get_audit_usage(date_range, subscribers)
+
+        usage = self.get_rollup_usage(first_day or datetime.min.replace(tzinfo=utc), last_day, subscribers)
+
+        audit_ranges = []
+        if start and start < first_day:
+            audit_ranges.append({"gt": start, "lt": first_day})
+        if not end or last_day < end:
+            audit_ranges.append({"gte": last_day, "lt": end} if end else {"gte": last_day})
+
+        for audit_range in audit_ranges:
+            for subscriber, endpoints in self.get_audit_usage(audit_range, subscribers).items():
+                for endpoint, count in endpoints.items():
+                    add_usage(usage, subscriber, endpoint, count)
+
+        return usage
+
+
+@celery.task(soft_time_limit=1800)
+def rollup_api_audit():
+    if not app.config.get("NEWS_API_ENABLED"):
+        return
+
+    get_resource_service("api_audit_daily").rollup()
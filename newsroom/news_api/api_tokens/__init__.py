@@ -1,5 +1,4 @@
 import ipaddress
-from datetime import timedelta
 
 from flask import Blueprint
 from flask_babel import gettext
@@ -7,13 +6,16 @@ from flask import g, current_app as app, abort, request
 from eve.auth import TokenAuth
 import superdesk
 from superdesk.utc import utcnow
-from superdesk import get_resource_service
 
 from .resource import NewsApiTokensResource
 from .service import NewsApiTokensService
-
-
-API_TOKENS = "news_api_tokens"
+from .utils import (
+    API_TOKENS,
+    token_auth_cache,
+    use_token_auth_cache,
+    get_token_and_company,
+    increment_rate_limit_requests,
+)
 
 blueprint = Blueprint("news_api_tokens", __name__)
 
@@ -23,7 +25,11 @@ from . import views  # noqa
 class CompanyTokenAuth(TokenAuth):
     def check_auth(self, token_id, allowed_roles, resource, method):
         """Try to find auth token and if valid put subscriber id into ``g.company_id``."""
-        token = app.data.mongo.find_one(API_TOKENS, req=None, _id=token_id)
+        if use_token_auth_cache():
+            token, company = token_auth_cache.get(token_id)
+        else:
+            token, company = get_token_and_company(token_id)
+
         if not token:
             return False
         # Check if the token has expired
@@ -35,7 +41,6 @@ class CompanyTokenAuth(TokenAuth):
             return False
 
         # Make sure that the company is enabled
-        company = app.data.mongo.find_one("companies", req=None, _id=token.get("company"))
         if not company:
             return False
         if not company.get("is_enabled", False):
@@ -55,28 +60,15 @@ class CompanyTokenAuth(TokenAuth):
                 return False
 
         # Check rate_limit
-        updates = {}
-        new_period = False
         if app.config.get("RATE_LIMIT_REQUESTS"):
-            new_period = not token.get("rate_limit_expiry") or token["rate_limit_expiry"] <= now
-            if new_period:
-                updates["rate_limit_requests"] = 1
-            elif token.get("rate_limit_expiry"):
-                if token.get("rate_limit_requests", 0) >= app.config.get("RATE_LIMIT_REQUESTS"):
-                    abort(429, gettext("Rate limit exceeded"))
-                else:
-                    updates["rate_limit_requests"] = token.get("rate_limit_requests", 0) + 1
-
-        if app.config.get("RATE_LIMIT_PERIOD") and new_period:
-            updates["rate_limit_expiry"] = now + timedelta(seconds=app.config.get("RATE_LIMIT_PERIOD"))
-
-        if updates:
-            get_resource_service(API_TOKENS).patch(token_id, updates)
+            rate_limit = increment_rate_limit_requests(token["_id"], now)
+            if rate_limit["rate_limit_requests"] > app.config["RATE_LIMIT_REQUESTS"]:
+                abort(429, gettext("Rate limit exceeded"))
 
             # Set Flask global variables
-            g.rate_limit_requests = updates["rate_limit_requests"]
-            if updates.get("rate_limit_expiry"):
-                g.rate_limit_expiry = updates["rate_limit_expiry"]
+            g.rate_limit_requests = rate_limit["rate_limit_requests"]
+            if rate_limit.get("rate_limit_expiry"):
+                g.rate_limit_expiry = rate_limit["rate_limit_expiry"]
 
         g.company_id = str(token.get("company"))
         return g.company_id
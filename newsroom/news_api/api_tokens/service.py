@@ -2,6 +2,8 @@ from content_api.tokens import CompanyTokenService
 from content_api.errors import BadParameterValueError
 from superdesk.utc import utcnow
 
+from .utils import invalidate_token_auth_cache
+
 
 class NewsApiTokensService(CompanyTokenService):
     def _validate(self, token):
@@ -23,6 +25,18 @@ class NewsApiTokensService(CompanyTokenService):
             self._validate(doc)
         return super().create(docs, **kwargs)
 
+    def on_created(self, docs):
+        super().on_created(docs)
+        invalidate_token_auth_cache()
+
+    def on_updated(self, updates, original):
+        super().on_updated(updates, original)
+        invalidate_token_auth_cache()
+
+    def on_deleted(self, doc):
+        super().on_deleted(doc)
+        invalidate_token_auth_cache()
+
     def on_update(self, updates, original):
         """
         Check that the updates are only for the expiry date and/or the enable flag nad rate limit keys
@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
+
+from flask import current_app as app
+from pymongo import ReturnDocument
+
+API_TOKENS = "news_api_tokens"
+API_TOKENS_AUTH_CACHE_VERSION_KEY = "news_api_tokens_auth_cache_version"
+
+
+class TokenAuthCache:
+    """In-process cache of API tokens and their company, used to authenticate News API requests
+
+    Entries expire after ``NEWS_API_AUTH_CACHE_TIMEOUT`` seconds. The cache is versioned
+    using a key in the app cache, so it is cleared in every process after tokens or companies
+    are updated (see ``invalidate_token_auth_cache``). This requires a cache shared by all the processes
+    (i.e. ``CACHE_TYPE = "redis"``), otherwise a revoked token is still accepted by other processes
+    until its entry expires.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self.entries: Dict[str, Tuple[float, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+
+    def get(self, token_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Returns the token and its company"""
+
+        version = app.cache.get(API_TOKENS_AUTH_CACHE_VERSION_KEY)
+        if version is None:
+            version = invalidate_token_auth_cache()
+        if version != self.version:
+            self.entries = {}
+            self.version = version
+
+        now = time.monotonic()
+        entry = self.entries.get(token_id)
+        if entry is not None and entry[0] > now:
+            return entry[1], entry[2]
+
+        token, company = get_token_and_company(token_id)
+        if len(self.entries) >= self.MAX_ENTRIES:
+            self.entries = {}
+        self.entries[token_id] = (now + app.config["NEWS_API_AUTH_CACHE_TIMEOUT"], token, company)
+        return token, company
+
+
+token_auth_cache = TokenAuthCache()
+
+
+def invalidate_token_auth_cache() -> str:
+    """Bump the version of the token auth cache, so it is cleared on next use"""
+
+    version = uuid4().hex
+    app.cache.set(API_TOKENS_AUTH_CACHE_VERSION_KEY, version, timeout=0)
+    return version
+
+
+def use_token_auth_cache() -> bool:
+    return bool(app.config.get("NEWS_API_AUTH_CACHE_TIMEOUT"))
+
+
+def get_token_and_company(token_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    token = app.data.mongo.find_one(API_TOKENS, req=None, _id=token_id)
+    if not token:
+        return None, None
+
+    company = app.data.mongo.find_one("companies", req=None, _id=token.get("company"))
+    return token, company
+
+
+def increment_rate_limit_requests(token_id: str, now: datetime) -> Dict[str, Any]:
+    """Atomically increment the number of requests made with the token in the current rate limit period
+
+    A new period is started if the current one has expired.
+
+    :return: The token's ``rate_limit_requests`` and ``rate_limit_expiry``
+    """
+
+    collection = app.data.get_mongo_collection(API_TOKENS)
+    projection = {"rate_limit_requests": 1, "rate_limit_expiry": 1}
+
+    def increment():
+        return collection.find_one_and_update(
+            {"_id": token_id, "rate_limit_expiry": {"$gt": now}},
+            {"$inc": {"rate_limit_requests": 1}},
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    token = increment()
+    if token is not None:
+        return token
+
+    updates: Dict[str, Any] = {"rate_limit_requests": 1}
+    if app.config.get("RATE_LIMIT_PERIOD"):
+        updates["rate_limit_expiry"] = now + timedelta(seconds=app.config["RATE_LIMIT_PERIOD"])
+
+    token = collection.find_one_and_update(
+        {
+            "_id": token_id,
+            "$or": [{"rate_limit_expiry": None}, {"rate_limit_expiry": {"$lte": now}}],
+        },
+        {"$set": updates},
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    # Another request started the new period at the same time
+    return token or increment() or updates
@@ -1,3 +1,4 @@
+from typing import Literal
 from urllib.parse import urlparse
 from newsroom.web.default_settings import (  # noqa
     env,
@@ -30,6 +31,7 @@ CORE_APPS = [
     "newsroom.news_api.news.item.item",
     "newsroom.news_api.news.search",
     "newsroom.news_api.news.feed",
+    "newsroom.news_api.news.export",
     "newsroom.products",
     "newsroom.news_api.api_audit",
     "newsroom.news_api.news.assets.assets",
@@ -55,3 +57,123 @@ CONTENTAPI_ELASTICSEARCH_INDEX = env("CONTENTAPI_ELASTICSEARCH_INDEX", MONGO_DBN
 FILTER_AGGREGATIONS = False
 ELASTIC_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
 ELASTICSEARCH_FIX_QUERY = False
+
+#: Number of seconds API tokens and their company are cached in each process (``0`` to disable)
+#:
+#: Enabling it requires an app cache shared by all the processes (i.e. ``CACHE_TYPE = "redis"``),
+#: as the cache is cleared through it when tokens or companies are updated. Otherwise a revoked token
+#: is still accepted by other processes for up to this many seconds.
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_AUTH_CACHE_TIMEOUT = 0
+
+#: Buffer News API audit records, and write them in bulk outside of the request
+#: ``None`` - write audit records during the request
+#: ``"local"`` - write from a background thread of the API process
+#: ``"celery"`` - send each batch of records to a Celery task
+#:
+#: The ``api`` history records of the ``news/item`` endpoint are buffered separately, using ``HISTORY_BUFFER``.
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_AUDIT_BUFFER: Literal[None, "local", "celery"] = None
+
+#: Number of audit records written per batch, when ``NEWS_API_AUDIT_BUFFER`` is enabled
+#: (defaults to ``HISTORY_BUFFER_BATCH_SIZE``)
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_AUDIT_BUFFER_BATCH_SIZE = None
+
+#: Maximum time (in milliseconds) an audit record waits in the buffer
+#: (defaults to ``HISTORY_BUFFER_FLUSH_INTERVAL``)
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_AUDIT_BUFFER_FLUSH_INTERVAL = None
+
+#: Maximum number of audit records waiting in the buffer, before requests write them directly
+#: (defaults to ``HISTORY_BUFFER_MAX_SIZE``)
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_AUDIT_BUFFER_MAX_SIZE = None
+
+#: Number of formatted items (per item version and format) cached in each process
+#: for the ``news/item`` endpoint (``0`` to disable)
+#:
+#: The cached versions of an item are discarded when the item is published again, by the web app.
+#: This requires an app cache shared with it (i.e. ``CACHE_TYPE = "redis"``), the cache is not used otherwise.
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_FORMATTED_ITEMS_CACHE_SIZE = 0
+
+#: Also store formatted items in the app cache (i.e. Redis, see ``CACHE_TYPE``), to share them between processes
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_FORMATTED_ITEMS_SHARED_CACHE = False
+
+#: Number of seconds formatted items are cached
+#:
+#: Items published again are discarded from the cache of other processes only if the app cache
+#: is shared (i.e. ``CACHE_TYPE = "redis"``), otherwise other processes can use outdated items for this long
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT = 60
+
+#: Answer conditional ``news/search`` and ``news/feed`` requests (using ``If-None-Match``
+#: or ``If-Modified-Since``) with ``304 Not Modified`` if the results haven't changed
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_CONDITIONAL_GET = True
+
+#: Number of seconds the ETag/Last-Modified of a request is cached (``0`` to disable)
+#: Updates may be reported as not modified for up to this many seconds
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_CONDITIONAL_GET_CACHE_TIMEOUT = 5
+
+#: Number of items loaded per search when exporting items from ``news/export``
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_EXPORT_BATCH_SIZE = 500
+
+#: Maximum number of items in a single export, larger exports are rejected
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_EXPORT_MAX_ITEMS = 100000
+
+#: Number of seconds the Elasticsearch point in time of an export is kept between batches
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_EXPORT_KEEP_ALIVE = 60
+
+#: Number of seconds clients can cache News API assets (``0`` to disable)
+#: Assets are never updated once stored, so they are marked as ``immutable``
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_ASSETS_CACHE_MAX_AGE = 3600 * 24 * 365
+
+#: Allow shared caches (i.e. a CDN) to store the assets
+#: Only enable this if the cache still authenticates the requests, as assets are only available to subscribers
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_ASSETS_CACHE_PUBLIC = False
+
+#: Internal location of the front-end web server (i.e. nginx) serving the assets, using ``X-Accel-Redirect``
+#: The location must serve the media by its ID, from a local copy of the storage or by proxying to it
+#:
+#: .. versionadded: 2.8
+#:
+NEWS_API_ASSETS_X_ACCEL_REDIRECT = None
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
+
+from flask import current_app as app
+from flask_caching.backends import NullCache, SimpleCache
+
+FORMATTED_ITEM_CACHE_VERSION_KEY = "news_api_formatted_item_version:{}"
+
+
+class FormattedItemsCache:
+    """Cache of items formatted by the News API formatters
+
+    Entries are keyed by item ID, version and formatter name. They are stored in an in-process LRU
+    of ``NEWS_API_FORMATTED_ITEMS_CACHE_SIZE`` entries, and in the app cache as well
+    if ``NEWS_API_FORMATTED_ITEMS_SHARED_CACHE`` is enabled, so they are shared between processes.
+
+    The keys include a version of the item's entries stored in the app cache, so the entries are
+    discarded in every process when the item is published again (see ``invalidate_formatted_item``).
+    This requires a cache shared by all the processes (i.e. ``CACHE_TYPE = "redis"``), otherwise
+    other processes keep using the entries until they expire after ``NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT``.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_key(self, item_id: str, version: Optional[str], formatter_name: str, variant: Optional[str] = None) -> str:
+        version_key = FORMATTED_ITEM_CACHE_VERSION_KEY.format(item_id)
+        cache_version = app.cache.get(version_key)
+        if cache_version is None:
+            cache_version = uuid4().hex
+            if not app.cache.add(
+                version_key, cache_version, timeout=app.config["NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT"]
+            ):
+                # Added by another process in the meantime
+                cache_version = app.cache.get(version_key) or cache_version
+
+        return ":".join(
+            [
+                "news_api_formatted_item",
+                item_id,
+                str(version or "latest"),
+                formatter_name,
+                variant or "",
+                cache_version,
+            ]
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            local_entry = self.entries.get(key)
+            if local_entry is not None:
+                expires, entry = local_entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return entry
+                del self.entries[key]
+
+        entry = None
+        if app.config.get("NEWS_API_FORMATTED_ITEMS_SHARED_CACHE"):
+            entry = app.cache.get(key)
+            if entry is not None:
+                self._set_local(key, entry)
+
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._set_local(key, entry)
+        if app.config.get("NEWS_API_FORMATTED_ITEMS_SHARED_CACHE"):
+            app.cache.set(key, entry, timeout=app.config["NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT"])
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def _set_local(self, key: str, entry: Dict[str, Any]) -> None:
+        expires = time.monotonic() + app.config["NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT"]
+        with self.lock:
+            self.entries[key] = (expires, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > app.config["NEWS_API_FORMATTED_ITEMS_CACHE_SIZE"]:
+                self.entries.popitem(last=False)
+
+
+formatted_items_cache = FormattedItemsCache()
+
+
+def invalidate_formatted_item(item_id: str) -> None:
+    """Discard the cached formatted versions of the item, in every process"""
+
+    app.cache.delete(FORMATTED_ITEM_CACHE_VERSION_KEY.format(item_id))
+
+
+def is_app_cache_shared() -> bool:
+    """Returns ``True`` if the app cache is shared between processes, so invalidations reach every process"""
+
+    return not isinstance(app.cache.cache, (SimpleCache, NullCache))
+
+
+def use_formatted_items_cache() -> bool:
+    # Items are invalidated when published by the web app, which is only seen by the API using a shared cache
+    return bool(app.config.get("NEWS_API_FORMATTED_ITEMS_CACHE_SIZE")) and is_app_cache_shared()
@@ -1,6 +1,6 @@
 from datetime import timedelta
 
-from flask import abort
+from flask import abort, g
 from flask import current_app as app
 from eve.versioning import versioned_id_field
 from superdesk.utils import ListCursor
@@ -11,6 +11,8 @@ from newsroom.wire.formatters import get_all_formatters
 from newsroom.settings import get_setting
 from newsroom import Service
 
+from .cache import formatted_items_cache, use_formatted_items_cache
+
 
 class APIFormattersService(Service):
     """
@@ -29,6 +31,30 @@ class APIFormattersService(Service):
         formatter = self._get_formatter(formatter_name)
         if not formatter:
             abort(404)
+
+        if use_formatted_items_cache():
+            # Formatters with company specific output (i.e. image permissions) are cached per company
+            variant = str(g.get("company_id") or "") if formatter.COMPANY_SPECIFIC else None
+            key = formatted_items_cache.get_key(id, version, formatter_name, variant)
+            formatted = formatted_items_cache.get(key)
+            if formatted is None:
+                formatted = self._format_version(id, version, formatter)
+                formatted_items_cache.set(key, formatted)
+        else:
+            formatted = self._format_version(id, version, formatter)
+
+        # Ensure that the item has not expired
+        if utcnow() - timedelta(days=int(get_setting("news_api_time_limit_days"))) > (
+            formatted["versioncreated"] or utcnow()
+        ):
+            abort(404)
+        return {
+            "formatted_item": formatted["formatted_item"],
+            "mimetype": formatted["mimetype"],
+            "version": formatted["version"],
+        }
+
+    def _format_version(self, id, version, formatter):
         if version:
             item = get_resource_service("items_versions").find_one(req=None, _id_document=id, version=version)
             if not item:
@@ -40,14 +66,9 @@ class APIFormattersService(Service):
             item = get_resource_service("items").find_one(req=None, _id=id)
             if not item:
                 abort(404)
-        # Ensure that the item has not expired
-        if utcnow() - timedelta(days=int(get_setting("news_api_time_limit_days"))) > item.get(
-            "versioncreated", utcnow()
-        ):
-            abort(404)
-        ret = formatter.format_item(item)
         return {
-            "formatted_item": ret,
+            "formatted_item": formatter.format_item(item),
             "mimetype": formatter.MIMETYPE,
             "version": item.get("version"),
+            "versioncreated": item.get("versioncreated"),
         }
@@ -6,7 +6,7 @@ from flask_babel import gettext
 import superdesk
 
 from newsroom.upload import ASSETS_RESOURCE
-from newsroom.news_api.utils import post_api_audit
+from newsroom.news_api.utils import get_api_audit, write_api_audit
 from flask import current_app as app
 
 
@@ -30,12 +30,42 @@ def get_item(asset_id):
     if not media_file:
         flask.abort(404)
 
-    data = wrap_file(flask.request.environ, media_file, buffer_size=1024 * 256)
-    response = flask.current_app.response_class(data, mimetype=media_file.content_type, direct_passthrough=True)
-    response.content_length = media_file.length
-    response.last_modified = media_file.upload_date
-    response.set_etag(media_file.md5)
-    response.make_conditional(flask.request)
+    if app.config.get("NEWS_API_ASSETS_X_ACCEL_REDIRECT"):
+        # Let the front-end web server send the file, so the worker is not kept busy during the download
+        response = flask.current_app.response_class(mimetype=media_file.content_type)
+        response.headers["X-Accel-Redirect"] = (
+            app.config["NEWS_API_ASSETS_X_ACCEL_REDIRECT"].rstrip("/") + "/" + asset_id
+        )
+    else:
+        data = wrap_file(flask.request.environ, media_file, buffer_size=1024 * 256)
+        response = flask.current_app.response_class(data, mimetype=media_file.content_type, direct_passthrough=True)
+        response.content_length = media_file.length
+        response.last_modified = media_file.upload_date
+        response.set_etag(media_file.md5)
+        # Add ``accept_ranges`` & ``complete_length`` so partial downloads and video seeking is supported
+        response.make_conditional(flask.request, accept_ranges=True, complete_length=media_file.length)
+
+    # Assets are never updated once stored, so can be cached by the client for as long as configured
+    if app.config.get("NEWS_API_ASSETS_CACHE_MAX_AGE"):
+        response.cache_control.max_age = app.config["NEWS_API_ASSETS_CACHE_MAX_AGE"]
+        response.cache_control.immutable = True
+        if app.config.get("NEWS_API_ASSETS_CACHE_PUBLIC"):
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+
     response.headers["Content-Disposition"] = "inline"
-    post_api_audit({"_items": [{"_id": asset_id}]})
+
+    # Audit once per download, not for each of the following range requests
+    if response.status_code != 206 or not response.content_range or not response.content_range.start:
+        # Written once the response is sent
+        audit_doc = get_api_audit({"_items": [{"_id": asset_id}]})
+        current_app = app._get_current_object()
+
+        def write_audit():
+            with current_app.app_context():
+                write_api_audit(audit_doc)
+
+        response.call_on_close(write_audit)
+
     return response
@@ -0,0 +1,10 @@
+import superdesk
+
+from .resource import NewsAPIExportResource
+from .service import NewsAPIExportService
+from .views import blueprint
+
+
+def init_app(app):
+    superdesk.register_resource("news/export", NewsAPIExportResource, NewsAPIExportService, _app=app)
+    superdesk.blueprint(blueprint, app)
@@ -0,0 +1,10 @@
+from newsroom import Resource
+
+
+class NewsAPIExportResource(Resource):
+    resource_title = "News Export"
+    datasource = {
+        "search_backend": "elastic",
+        "source": "items",
+    }
+    internal_resource = True
@@ -0,0 +1,142 @@
+import json
+import logging
+from typing import Any, Dict, Iterator, List
+
+from flask import current_app as app
+from superdesk.errors import SuperdeskApiError
+from content_api.errors import BadParameterValueError
+
+from newsroom.news_api.news.search_service import NewsAPINewsService
+from newsroom.products.products import get_products_by_company
+
+logger = logging.getLogger(__name__)
+
+
+class NewsAPIExportService(NewsAPINewsService):
+    """Exports all the items permitted for the company, using the News API search filters"""
+
+    # set of parameters that the API will allow.
+    allowed_params = {
+        "start_date",
+        "end_date",
+        "include_fields",
+        "exclude_fields",
+        "q",
+        "default_operator",
+        "filter",
+        "service",
+        "subject",
+        "genre",
+        "urgency",
+        "priority",
+        "type",
+        "item_source",
+        "timezone",
+        "products",
+    }
+
+    default_sort = [{"versioncreated": "asc"}, {"guid": "asc"}]
+
+    #: Sort used with the point in time, ``_shard_doc`` is a unique tie-breaker without loading any field
+    point_in_time_sort = [{"versioncreated": "asc"}, {"_shard_doc": "asc"}]
+
+    def prefill_search_page(self, search):
+        """Prefill the search page parameters, the items are exported in batches of ``NEWS_API_EXPORT_BATCH_SIZE``
+
+        :param newsroom.search.SearchQuery search: The search query instance
+        """
+
+        search.args["sort"] = self.default_sort
+        search.args["size"] = app.config["NEWS_API_EXPORT_BATCH_SIZE"]
+        search.args["from"] = 0
+
+    def validate_request(self, search):
+        """Validate the request parameters
+
+        :param newsroom.search.SearchQuery search: The search query instance
+        """
+
+        if not search.company:
+            raise SuperdeskApiError.forbiddenError()
+
+    def validate_export_size(self, search) -> int:
+        """Returns the number of items to export
+
+        :raises BadParameterValueError: if there are more than ``NEWS_API_EXPORT_MAX_ITEMS`` items
+        """
+
+        response = self.internal_msearch([{"query": search.query, "size": 0, "track_total_hits": True}])[0]
+        if response.get("error"):
+            raise BadParameterValueError("Invalid search query")
+
+        total = response["hits"]["total"]["value"]
+        if total > app.config["NEWS_API_EXPORT_MAX_ITEMS"]:
+            raise BadParameterValueError(
+                "Export of {total} items exceeds the maximum of {max}, please narrow the date range".format(
+                    total=total, max=app.config["NEWS_API_EXPORT_MAX_ITEMS"]
+                )
+            )
+
+        return total
+
+    def get_export_batches(self, search) -> Iterator[List[Dict[str, Any]]]:
+        """Returns the items in batches, walking a point in time of the index with ``search_after``
+
+        Only one batch is loaded at a time, so memory usage doesn't depend on the number of items.
+
+        :param newsroom.search.SearchQuery search: The search query instance
+        """
+
+        es = app.data.elastic.elastic(self.datasource)
+        keep_alive = "{}s".format(app.config["NEWS_API_EXPORT_KEEP_ALIVE"])
+        pit_id = es.open_point_in_time(index=app.data.elastic._resource_index(self.datasource), keep_alive=keep_alive)[
+            "id"
+        ]
+        projection = json.loads(search.projections) if search.projections else {}
+
+        try:
+            search_after = None
+            while True:
+                source = {
+                    "query": search.query,
+                    "sort": self.point_in_time_sort,
+                    "size": search.args["size"],
+                    "_source": list(projection.keys()) if projection else True,
+                    "track_total_hits": False,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                }
+                if search_after:
+                    source["search_after"] = search_after
+
+                response = es.search(body=source)
+                pit_id = response.get("pit_id") or pit_id
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+
+                yield app.data.elastic._parse_hits(response, self.datasource).docs
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                es.close_point_in_time(body={"id": pit_id})
+            except Exception:
+                logger.exception("Failed to close the export point in time")
+
+    def export_ndjson(self, search, exported_ids: List[str]) -> Iterator[str]:
+        """Returns the items as newline delimited JSON, one chunk per batch
+
+        :param newsroom.search.SearchQuery search: The search query instance
+        :param exported_ids: List where the IDs of the exported items are added, used for the audit record
+        """
+
+        products = get_products_by_company(search.company, product_type="news_api")
+        for docs in self.get_export_batches(search):
+            self.remove_fields(docs, search.args, products)
+            lines = []
+            for doc in docs:
+                doc.pop("_updated", None)
+                doc.pop("_created", None)
+                doc.pop("_etag", None)
+                lines.append(json.dumps(doc, cls=app.data.json_encoder_class) + "\n")
+                exported_ids.append(doc["_id"])
+            yield "".join(lines)
@@ -0,0 +1,61 @@
+import zlib
+
+import flask
+import superdesk
+from eve.utils import ParsedRequest
+from flask import current_app as app, abort
+from flask_babel import gettext
+
+from newsroom.news_api.utils import post_api_audit
+
+blueprint = superdesk.Blueprint("news/export", __name__)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Close the wrapped generator while still in the request context
+        chunks.close()
+
+
+@blueprint.route("/news/export", methods=["GET"])
+def export():
+    """Stream all the items permitted for the company as newline delimited JSON
+
+    Accepts the same filters as ``news/search``, the response is gzip encoded if accepted by the client.
+    """
+
+    auth = app.auth
+    if not auth.authorized([], None, flask.request.method):
+        return abort(401, gettext("Invalid token"))
+
+    service = superdesk.get_resource_service("news/export")
+    req = ParsedRequest()
+    req.args = flask.request.args
+    search = service.get_search_from_request(req)
+    service.validate_export_size(search)
+
+    def generate():
+        exported_ids = []
+        try:
+            for chunk in service.export_ndjson(search, exported_ids):
+                yield chunk.encode("utf-8")
+        finally:
+            # A single audit record for the whole export, including the items sent before a disconnect
+            post_api_audit({"_items": [{"_id": _id} for _id in exported_ids]})
+
+    use_gzip = bool(flask.request.accept_encodings["gzip"])
+    response = app.response_class(
+        flask.stream_with_context(gzip_chunks(generate()) if use_gzip else generate()),
+        mimetype="application/x-ndjson",
+    )
+    response.headers["Vary"] = "Accept-Encoding"
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
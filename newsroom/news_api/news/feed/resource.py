@@ -1,3 +1,5 @@
+from superdesk import get_resource_service
+
 from newsroom import Resource
 
 
@@ -11,3 +13,7 @@ class NewsAPIFeedResource(Resource):
     item_methods = ["GET"]
     resource_methods = ["GET"]
     projection = False
+
+    def pre_request_get(self, request, lookup):
+        if not lookup:
+            get_resource_service(self.endpoint_name).check_not_modified()
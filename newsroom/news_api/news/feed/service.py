@@ -1,4 +1,4 @@
-from flask import request
+from flask import g, request
 
 from content_api.errors import BadParameterValueError
 
@@ -28,6 +28,7 @@ class NewsAPIFeedService(NewsAPINewsService):
         "timezone",
         "products",
         "exclude_ids",
+        "cursor",
     }
 
     default_sort = [{"versioncreated": "asc"}]
@@ -101,10 +102,17 @@ class NewsAPIFeedService(NewsAPINewsService):
             item.pop("_created", None)
             item.pop("_etag", None)
 
+    def _hateoas_set_cursor_links(self, doc):
+        # The link to the next page is set in ``_hateoas_set_next_page_links``
+        pass
+
     def _hateoas_set_next_page_links(self, doc):
         args = request.args.to_dict()
 
-        if doc["_meta"]["total"] > 0:
+        if args.get("cursor"):
+            # Continue after the last item of this page, using ES search_after
+            args["cursor"] = g.news_api_next_cursor
+        elif doc["_meta"]["total"] > 0:
             desc_items = list(reversed(doc.get("_items") or []))
             last_datetime = desc_items[0].get("versioncreated").strftime("%Y-%m-%dT%H:%M:%S")
             exclude_ids = []
@@ -118,20 +126,14 @@ class NewsAPIFeedService(NewsAPINewsService):
             args["exclude_ids"] = ",".join(exclude_ids)
             args["start_date"] = last_datetime
 
-            doc["_links"]["next_page"] = {
-                "title": "News Feed",
-                "href": "{}?{}".format(
-                    # request.path,
-                    "news/feed",
-                    "&".join(["{}={}".format(key, args[key]) for key in sorted(args.keys())]),
-                ),
-            }
-        else:
-            doc["_links"]["next_page"] = doc["_links"]["self"] = {
-                "title": "News Feed",
-                "href": "{}?{}".format(
-                    # request.path,
-                    "news/feed",
-                    "&".join(["{}={}".format(key, args[key]) for key in sorted(args.keys())]),
-                ),
-            }
+        doc["_links"]["next_page"] = {
+            "title": "News Feed",
+            "href": "{}?{}".format(
+                # request.path,
+                "news/feed",
+                "&".join(["{}={}".format(key, args[key]) for key in sorted(args.keys())]),
+            ),
+        }
+
+        if not doc["_meta"]["total"]:
+            doc["_links"]["self"] = doc["_links"]["next_page"]
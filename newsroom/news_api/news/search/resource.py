@@ -1,3 +1,5 @@
+from superdesk import get_resource_service
+
 from newsroom import Resource
 
 
@@ -9,3 +11,7 @@ class NewsAPISearchResource(Resource):
     }
     resource_methods = ["GET"]
     projection = False
+
+    def pre_request_get(self, request, lookup):
+        if not lookup:
+            get_resource_service(self.endpoint_name).check_not_modified()
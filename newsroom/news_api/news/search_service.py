@@ -1,13 +1,17 @@
 import json
+import base64
+import hashlib
 import functools
 import re
 from dateutil import parser
 import pytz
 from datetime import datetime
+from typing import Optional, Tuple
 
 from bson import ObjectId
+from eve.utils import ParsedRequest
 from werkzeug.datastructures import MultiDict
-from flask import current_app as app
+from flask import current_app as app, g, request, abort, after_this_request
 from superdesk import get_resource_service
 from superdesk.utc import utcnow, local_to_utc
 from superdesk.errors import SuperdeskApiError
@@ -23,6 +27,48 @@ from newsroom.news_api.utils import (
 from newsroom.search.service import BaseSearchService, query_string
 from newsroom.products.products import get_products_by_company
 
+#: Value of the ``cursor`` parameter to start walking the results using continuation tokens
+CURSOR_START = "*"
+
+
+ResultsValidator = Tuple[str, Optional[datetime]]
+
+VALIDATOR_AGGS = {"last_modified": {"max": {"field": "versioncreated"}}}
+
+
+def set_validator_headers(response, validator: ResultsValidator):
+    etag, last_modified = validator
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def encode_cursor(sort_values):
+    """Returns the opaque continuation token for the sort values of the last item of a page"""
+
+    return base64.urlsafe_b64encode(json.dumps(sort_values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the ``search_after`` sort values from the continuation token
+
+    :raises BadParameterValueError: if the token is invalid
+    """
+
+    if cursor == CURSOR_START:
+        return None
+
+    try:
+        sort_values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise BadParameterValueError("Invalid cursor")
+
+    if not isinstance(sort_values, list) or len(sort_values) != 2:
+        raise BadParameterValueError("Invalid cursor")
+
+    return sort_values
+
 
 class NewsAPINewsService(BaseSearchService):
     # set of parameters that the API will allow.
@@ -48,6 +94,7 @@ class NewsAPINewsService(BaseSearchService):
         "sort",
         "timezone",
         "products",
+        "cursor",
     }
 
     default_sort = [{"versioncreated": "desc"}]
@@ -109,29 +156,156 @@ class NewsAPINewsService(BaseSearchService):
         resp = super().get(req, lookup)
 
         orig_request_params = getattr(req, "args", MultiDict())
+        company = get_company()
+        products = get_products_by_company(company, product_type="news_api")
+        self.remove_fields(resp.docs, orig_request_params, products)
+
+        if orig_request_params.get("cursor"):
+            # Continue from the sort values of the last item, or from the same cursor if there are no more items
+            hits = (resp.hits.get("hits") or {}).get("hits") or []
+            g.news_api_next_cursor = encode_cursor(hits[-1]["sort"]) if hits else orig_request_params["cursor"]
+
+        request_key = g.pop("news_api_results_validator_key", None)
+        last_modified_agg = ((resp.hits or {}).get("aggregations") or {}).get("last_modified")
+        if request_key and last_modified_agg:
+            g.news_api_results_validator = self.set_results_validator(
+                request_key, resp.hits["hits"]["total"]["value"], last_modified_agg["value"]
+            )
+
+        return resp
+
+    def _hateoas_set_cursor_links(self, doc):
+        """Replace the page links with a link to the next page using the continuation token"""
+
+        doc.setdefault("_links", {})
+        doc["_links"].pop("last", None)
+        doc["_links"].pop("next", None)
+
+        # A partial page is the last one
+        if len(doc.get("_items") or []) >= int(request.args.get("page_size") or 25):
+            args = request.args.to_dict()
+            args["cursor"] = g.news_api_next_cursor
+            doc["_links"]["next"] = {
+                "title": "next page",
+                "href": "{}?{}".format(
+                    "news/search",
+                    "&".join(["{}={}".format(key, args[key]) for key in sorted(args.keys())]),
+                ),
+            }
+
+    def check_not_modified(self):
+        """Respond with 304 Not Modified if the results of a conditional request haven't changed
+
+        Otherwise the ``ETag`` and ``Last-Modified`` headers are added to the response,
+        to be used by clients in the next request.
+        """
+
+        if not app.config.get("NEWS_API_CONDITIONAL_GET"):
+            return
+
+        if request.if_none_match or request.if_modified_since:
+            # Only conditional requests run an extra search, the others get the validator from the results
+            validator = self.get_results_validator()
+            if validator is not None and self.is_not_modified(*validator):
+                abort(set_validator_headers(app.response_class(status=304), validator))
+
+        g.news_api_results_validator_key = self.get_results_validator_key()
+
+        @after_this_request
+        def add_validator_headers(response):
+            validator = g.get("news_api_results_validator")
+            if validator is None or response.status_code != 200:
+                return response
+            return set_validator_headers(response, validator)
+
+    def is_not_modified(self, etag: str, last_modified: Optional[datetime]) -> bool:
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+
+        modified_since = request.if_modified_since
+        if modified_since and modified_since.tzinfo:
+            modified_since = modified_since.astimezone(pytz.utc).replace(tzinfo=None)
+        return bool(last_modified and modified_since and last_modified <= modified_since)
+
+    def get_results_validator_key(self) -> str:
+        request_args = sorted([key, value] for key, values in request.args.lists() for value in values)
+        return hashlib.md5(json.dumps([self.datasource, str(g.get("company_id")), request_args]).encode()).hexdigest()
+
+    def set_results_validator(self, request_key: str, total: int, last_modified: Optional[float]) -> ResultsValidator:
+        """Generate the ETag and last modified date from the number of matching items and their latest ``versioncreated``
+
+        The validator is cached for ``NEWS_API_CONDITIONAL_GET_CACHE_TIMEOUT`` seconds.
+        """
+
+        validator = (
+            hashlib.md5("{}:{}:{}".format(request_key, total, last_modified).encode()).hexdigest(),
+            datetime.utcfromtimestamp(last_modified // 1000) if last_modified else None,
+        )
+        cache_timeout = app.config.get("NEWS_API_CONDITIONAL_GET_CACHE_TIMEOUT")
+        if cache_timeout:
+            app.cache.set("news_api_results_validator:{}".format(request_key), validator, timeout=cache_timeout)
+        return validator
+
+    def get_results_validator(self) -> Optional[ResultsValidator]:
+        """Returns the ETag and last modified date of the results for the current conditional request
+
+        Uses a search without any hits, unless the validator is cached.
+        """
+
+        request_key = self.get_results_validator_key()
+        if app.config.get("NEWS_API_CONDITIONAL_GET_CACHE_TIMEOUT"):
+            validator = app.cache.get("news_api_results_validator:{}".format(request_key))
+            if validator is not None:
+                return validator
+
+        req = ParsedRequest()
+        req.args = request.args
+        search = self.get_search_from_request(req)
+        response = self.internal_msearch(
+            [
+                {
+                    "query": search.query,
+                    "size": 0,
+                    "track_total_hits": True,
+                    "aggs": VALIDATOR_AGGS,
+                }
+            ]
+        )[0]
+        if response.get("error"):
+            # Leave it to the search to handle the error
+            return None
+
+        return self.set_results_validator(
+            request_key,
+            response["hits"]["total"]["value"],
+            response["aggregations"]["last_modified"]["value"],
+        )
+
+    def remove_fields(self, docs, request_params, products):
+        """Remove the excluded fields, and the associations not permitted for the company, from the items
+
+        :param docs: The items to update
+        :param request_params: The request parameters
+        :param products: The News API products of the company
+        """
 
         # Can't get the exclude projection to work do pop the exclude fields here
         exclude_fields = (
-            self.mandatory_exclude_fields.union(set(orig_request_params.get("exclude_fields").split(",")))
-            if orig_request_params.get("exclude_fields")
+            self.mandatory_exclude_fields.union(set(request_params.get("exclude_fields").split(",")))
+            if request_params.get("exclude_fields")
             else self.mandatory_exclude_fields
         )
 
-        company = get_company()
-        products = get_products_by_company(company, product_type="news_api")
-
-        for doc in resp.docs:
+        for doc in docs:
             for field in exclude_fields:
                 doc.pop(field, None)
 
-            if "associations" in orig_request_params.get("include_fields", ""):
+            if "associations" in request_params.get("include_fields", ""):
                 if not check_association_permission(doc, products):
                     doc.pop("associations", None)
                 else:
                     remove_internal_renditions(doc)
 
-        return resp
-
     def prefill_search_query(self, search, req=None, lookup=None):
         """Generate the search query instance
 
@@ -242,6 +416,28 @@ class NewsAPINewsService(BaseSearchService):
             else:
                 raise BadParameterValueError("Unknown sort option ({name})".format(name=search.args["sort"]))
 
+        if search.args.get("cursor"):
+            self.prefill_search_cursor(search)
+
+    def prefill_search_cursor(self, search):
+        """Prefill the ``search_after`` sort values from the continuation token
+
+        The results are sorted by ``versioncreated`` and ``guid``, so the sort values are unique.
+        ``guid`` is a keyword field with doc values, and is the same as the item ``_id``,
+        so the cursors of the previous ``_id`` tie-breaker are still valid.
+
+        :param newsroom.search.SearchQuery search: The search query instance
+        """
+
+        if search.args["page"] > 1:
+            raise BadParameterValueError("Page can not be used with a cursor")
+
+        if len(search.args["sort"]) != 1 or "versioncreated" not in search.args["sort"][0]:
+            raise BadParameterValueError("Cursor requires the results to be sorted by versioncreated")
+
+        search.args["sort"] = search.args["sort"] + [{"guid": search.args["sort"][0]["versioncreated"]}]
+        search.args["search_after"] = decode_cursor(search.args["cursor"])
+
     def validate_request(self, search):
         """Validate the request parameters
 
@@ -405,6 +601,14 @@ class NewsAPINewsService(BaseSearchService):
         search.args["aggs"] = False
         super().gen_source_from_search(search)
 
+        if search.args.get("search_after"):
+            search.source["search_after"] = search.args["search_after"]
+
+        if g.get("news_api_results_validator_key"):
+            # Used to generate the ETag and Last-Modified of the results, see ``check_not_modified``
+            search.source["aggs"] = VALIDATOR_AGGS
+            search.source["track_total_hits"] = True
+
     def get_internal_request(self, search):
         """Creates an eve internal request object
 
@@ -659,4 +863,6 @@ class NewsAPINewsService(BaseSearchService):
         return datetime.strftime(date, app.config["ELASTIC_DATETIME_FORMAT"])
 
     def on_fetched(self, doc):
+        if request.args.get("cursor"):
+            self._hateoas_set_cursor_links(doc)
         post_api_audit(doc)
@@ -1,9 +1,26 @@
+import re
+from typing import Callable, Optional
+
+from lxml import html as lxml_html
 from superdesk import get_resource_service
+from superdesk.etree import to_string
 from superdesk.utc import utcnow
-from flask import request, g, current_app as app
+from flask import request, g, url_for, current_app as app
+
+IMAGE_EMBED_REGEX = re.compile(r" EMBED START Image {id: \"editor_([0-9]+)")
+
+#: Placeholder for the News API asset URL of image embeds, in the body HTML pre-rendered on publish
+NEWS_API_ASSET_PLACEHOLDER = "news-api-asset:"
+NEWS_API_ASSET_PLACEHOLDER_REGEX = re.compile(r"news-api-asset:([^\"'\s>]+)")
 
 
 def post_api_audit(doc):
+    write_api_audit(get_api_audit(doc))
+
+
+def get_api_audit(doc):
+    """Returns the audit record of the current request, for the items in the response"""
+
     audit_doc = {
         "created": utcnow(),
         "items_id": [doc.get("_id")] if doc.get("_id") else [i.get("_id") for i in doc.get("_items", [])],
@@ -16,21 +33,36 @@ def post_api_audit(doc):
     if "company_id" in g:
         audit_doc["subscriber"] = g.company_id
 
+    return audit_doc
+
+
+def write_api_audit(audit_doc):
+    audit_buffer = app.extensions.get("api_audit_buffer")
+    if audit_buffer is not None:
+        # Written in bulk outside of the request
+        audit_buffer.add(audit_doc)
+        return
+
     get_resource_service("api_audit").post([audit_doc])
 
 
-def format_report_results(search_result, unique_endpoints, companies):
-    aggs = (search_result.hits or {}).get("aggregations") or {}
-    buckets = (aggs.get("items") or {}).get("buckets") or []
+def format_report_results(usage, unique_endpoints, companies):
+    """Returns the number of requests per company name and endpoint
+
+    :param usage: Number of requests per company ID and endpoint
+    :param unique_endpoints: List where the endpoints found are added
+    :param companies: Companies by ID
+    """
+
     results = {}
 
-    for b in buckets:
-        company_name = (companies[b["key"]] or {}).get("name")
+    for company_id, endpoints in usage.items():
+        company_name = (companies.get(company_id) or {}).get("name")
         results[company_name] = {}
-        for endpoint_bucket in (b.get("endpoints") or {}).get("buckets") or []:
-            results[company_name][endpoint_bucket["key"]] = endpoint_bucket["doc_count"]
-            if endpoint_bucket["key"] not in unique_endpoints:
-                unique_endpoints.append(endpoint_bucket["key"])
+        for endpoint, count in endpoints.items():
+            results[company_name][endpoint] = count
+            if endpoint not in unique_endpoints:
+                unique_endpoints.append(endpoint)
 
     return results
 
@@ -77,3 +109,56 @@ def check_association_permission(item, products):
         return True if len(set(im_products) & set(sd_products)) else False
     else:
         return True
+
+
+def rewrite_image_embeds(item, get_asset_url: Callable[[str], str]) -> Optional[str]:
+    """Returns the item ``body_html`` with the image embed sources set to an asset URL
+
+    :param item: The content item
+    :param get_asset_url: Function returning the URL for the media ID of the embed's 16-9 rendition
+    :return: The updated HTML, or ``None`` if the body has no image embeds to update
+    """
+
+    body_html = item.get("body_html") or ""
+    if "EMBED START Image" not in body_html:
+        return None
+
+    html_updated = False
+    root_elem = lxml_html.fromstring(body_html)
+    for comment in root_elem.xpath("//comment()"):
+        if "EMBED START Image" not in comment.text:
+            continue
+
+        m = IMAGE_EMBED_REGEX.search(comment.text)
+        # Assumes the sibling of the Embed Image comment is the figure tag containing the image
+        figure_elem = comment.getnext()
+        if not m or figure_elem is None or figure_elem.tag != "figure":
+            continue
+
+        img_elem = figure_elem.find("./img")
+        association = (item.get("associations") or {}).get("editor_" + m.group(1)) or {}
+        src = (association.get("renditions") or {}).get("16-9")
+        if img_elem is not None and src:
+            img_elem.attrib["src"] = get_asset_url(src.get("media"))
+            html_updated = True
+
+    return to_string(root_elem, method="html") if html_updated else None
+
+
+def get_news_api_asset_url(media_id: str) -> str:
+    return url_for("assets.get_item", asset_id=media_id, _external=True, _scheme="https")
+
+
+def get_news_api_body_html(item) -> str:
+    """Returns the item ``body_html`` with image embeds pointing to the News API assets
+
+    Uses the body pre-rendered on publish if available, so the HTML doesn't need to be parsed per request.
+    """
+
+    if item.get("news_api_body_html"):
+        return NEWS_API_ASSET_PLACEHOLDER_REGEX.sub(
+            lambda m: get_news_api_asset_url(m.group(1)),
+            item["news_api_body_html"],
+        )
+
+    return rewrite_image_embeds(item, get_news_api_asset_url) or item.get("body_html") or ""
@@ -1,8 +1,18 @@
-from copy import deepcopy
+from typing import Iterable, Tuple
+
+from bson import ObjectId
+from flask import current_app as app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from superdesk.utc import utcnow
 
 from newsroom import Resource, Service, MongoIndexes
 
 
+DUPLICATE_KEY_ERROR = 11000
+MAX_QUEUE_UPSERT_ATTEMPTS = 3
+
+
 class NotificationQueueResource(Resource):
     resource_methods = ["GET"]
     item_methods = ["GET", "PATCH", "DELETE"]
@@ -28,48 +38,82 @@ class NotificationQueueResource(Resource):
     }
 
     mongo_indexes: MongoIndexes = {
-        "user_id": ([("user", 1)], {}),
+        "user_id": ([("user", 1)], {"unique": True}),
     }
 
 
 class NotificationQueueService(Service):
     def add_item_to_queue(self, user_id, section, topic_id, item):
-        original = self.find_one(req=None, user=user_id)
+        self.add_item_to_queues(item, [(user_id, section, topic_id)])
+
+    def add_item_to_queues(self, item, subscriptions: Iterable[Tuple[ObjectId, str, ObjectId]]):
+        """Add the item to the queue of many users, using a single Mongo bulk write
+
+        Every update is atomic (``$push``/``$set``), so the queues don't need to be read first,
+        and concurrent updates of the same queue don't overwrite each other. The queue is unique per user,
+        if it's created by another process at the same time the remaining updates are retried.
+
+        :param item: The item to add
+        :param subscriptions: List of ``(user_id, section, topic_id)`` the item is to be queued for
+        """
 
-        if not original:
-            # Create a new schedule
-            self.create(
-                [
+        now = utcnow()
+        users_upserted = set()
+        requests = []
+
+        for user_id, section, topic_id in subscriptions:
+            if user_id not in users_upserted:
+                # Create the user's queue if it doesn't exist yet
+                requests.append(
+                    UpdateOne(
+                        {"user": user_id},
+                        {
+                            "$setOnInsert": {"user": user_id, "topics": [], "_created": now},
+                            "$set": {"_updated": now},
+                        },
+                        upsert=True,
+                    )
+                )
+                users_upserted.add(user_id)
+
+            # Add the topic to the queue, unless it's already there
+            requests.append(
+                UpdateOne(
+                    {"user": user_id, "topics.topic_id": {"$ne": topic_id}},
+                    {"$push": {"topics": {"topic_id": topic_id, "section": section, "items": []}}},
+                )
+            )
+
+            # Add the item to the topic queue
+            requests.append(
+                UpdateOne(
+                    {"user": user_id, "topics.topic_id": topic_id},
                     {
-                        "user": user_id,
-                        "topics": [
-                            {
-                                "items": [item["_id"]],
-                                "topic_id": topic_id,
-                                "section": section,
-                                "last_item_arrived": item["versioncreated"],
-                            }
-                        ],
-                    }
-                ]
+                        "$push": {"topics.$.items": item["_id"]},
+                        "$set": {"topics.$.last_item_arrived": item["versioncreated"]},
+                    },
+                )
             )
-        else:
-            # Update an existing schedule
-            updates = {"topics": deepcopy(original.get("topics") or [])}
 
-            topic_queue = next((topic for topic in updates["topics"] if topic.get("topic_id") == topic_id), None)
+        collection = app.data.get_mongo_collection(self.datasource)
+        for _attempt in range(MAX_QUEUE_UPSERT_ATTEMPTS):
+            if not requests:
+                return
 
-            if topic_queue is None:
-                topic_queue = {
-                    "topic_id": topic_id,
-                    "section": section,
-                }
-                updates["topics"].append(topic_queue)
+            try:
+                # Must be ordered, as the updates depend on the queue and topic being created first
+                collection.bulk_write(requests, ordered=True)
+                return
+            except BulkWriteError as error:
+                write_errors = error.details.get("writeErrors") or []
+                if not write_errors or write_errors[0].get("code") != DUPLICATE_KEY_ERROR:
+                    raise
 
-            topic_queue.setdefault("items", []).append(item["_id"])
-            topic_queue["last_item_arrived"] = item["versioncreated"]
+                # The queue was created by another process, the upsert now updates it.
+                # Updates before the failed one were applied, so they are not sent again.
+                requests = requests[write_errors[0]["index"] :]
 
-            self.update(original["_id"], updates, original)
+        collection.bulk_write(requests, ordered=True)
 
     def reset_queue(self, user_id):
         self.delete_action({"user": user_id})
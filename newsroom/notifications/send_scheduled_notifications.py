@@ -19,6 +19,9 @@ from newsroom.gettext import get_session_timezone, set_session_timezone
 
 logger = logging.getLogger(__name__)
 
+#: Maximum number of the latest queued items searched for each topic
+MAX_QUEUE_ITEMS_SEARCHED = 1000
+
 
 class NotificationEmailTopicEntry(TypedDict):
     topic: Topic
@@ -55,28 +58,104 @@ class SendScheduledNotificationEmails(Command):
             logger.error("Failed to retrieve data to run schedules")
             return
 
+        batch_size = app.config.get("SCHEDULED_NOTIFICATIONS_BATCH_SIZE") or 0
+        if batch_size > 0:
+            self.dispatch_schedules(schedules, users, now_utc, force, batch_size)
+            return
+
         for schedule in schedules:
-            user_id = schedule.get("user")
-            try:
-                user = users.get(str(user_id))
+            self.run_schedule(schedule, users, companies, user_topic_map, now_utc, force)
+
+    def dispatch_schedules(
+        self,
+        schedules: List[NotificationQueue],
+        users: Dict[str, User],
+        now_utc: datetime,
+        force: bool,
+        batch_size: int,
+    ):
+        """Send the users due a notification to Celery subtasks in batches, to be processed in parallel"""
 
-                if not user:
-                    # User not found, this account might be disabled
-                    # Reset the queue for this user, so it does not get checked on future runs
-                    get_resource_service("notification_queue").reset_queue(schedule["user"])
+        user_ids: List[ObjectId] = []
+        for schedule in schedules:
+            user = users.get(str(schedule.get("user")))
+            if user:
+                self._set_default_notification_schedule(user)
+                now_local = utc_to_local(user["notification_schedule"]["timezone"], now_utc)
+                if not self._is_scheduled_to_run_for_user(user["notification_schedule"], now_local, force):
                     continue
 
-                if not user.get("notification_schedule"):
-                    user["notification_schedule"] = {}
+            # Users not found are included as well, so their queue is reset by the subtask
+            user_ids.append(schedule["user"])
+
+        for index in range(0, len(user_ids), batch_size):
+            send_scheduled_notifications_for_users.delay(user_ids[index : index + batch_size], now_utc, force)
+
+        logger.info(
+            f"{self.log_msg} Sent scheduled notifications to subtasks",
+            extra=dict(users=len(user_ids), batch_size=batch_size),
+        )
 
-                user["notification_schedule"].setdefault("timezone", get_session_timezone())
-                user["notification_schedule"].setdefault("times", app.config["DEFAULT_SCHEDULED_NOTIFICATION_TIMES"])
+    def run_schedules_for_users(self, user_ids: List[ObjectId], now_utc: datetime, force: bool):
+        """Process the schedules of the provided users, as part of a parallel run"""
 
-                company = companies.get(str(user.get("company", "")))
-                self.process_schedule(schedule, user, company, now_utc, user_topic_map.get(user["_id"]) or {}, force)
-            except Exception as e:
-                logger.exception(e)
-                logger.error("Failed to run schedule for user %s", user_id)
+        try:
+            companies = get_company_dict(False)
+            users = get_user_dict(False, user_ids=user_ids)
+            user_topic_map = get_user_id_to_topic_for_subscribers(TopicNotificationType.SCHEDULED.value)
+
+            schedules: List[NotificationQueue] = get_resource_service("notification_queue").get(
+                req=None, lookup={"user": {"$in": user_ids}}
+            )
+        except Exception as e:
+            logger.exception(e)
+            logger.error("Failed to retrieve data to run schedules")
+            return
+
+        for schedule in schedules:
+            # Lock the user, so a schedule still being processed isn't picked up again by the next run
+            lock_name = get_lock_id("newsroom", "send_scheduled_notifications", str(schedule.get("user")))
+            if not lock(lock_name, expire=610):
+                logger.warning("Scheduled notifications for user %s already running", schedule.get("user"))
+                continue
+
+            try:
+                self.run_schedule(schedule, users, companies, user_topic_map, now_utc, force)
+            finally:
+                unlock(lock_name)
+
+    def run_schedule(
+        self,
+        schedule: NotificationQueue,
+        users: Dict[str, User],
+        companies: Dict[str, Company],
+        user_topic_map: Dict[ObjectId, Dict[ObjectId, Topic]],
+        now_utc: datetime,
+        force: bool,
+    ):
+        user_id = schedule.get("user")
+        try:
+            user = users.get(str(user_id))
+
+            if not user:
+                # User not found, this account might be disabled
+                # Reset the queue for this user, so it does not get checked on future runs
+                get_resource_service("notification_queue").reset_queue(schedule["user"])
+                return
+
+            self._set_default_notification_schedule(user)
+            company = companies.get(str(user.get("company", "")))
+            self.process_schedule(schedule, user, company, now_utc, user_topic_map.get(user["_id"]) or {}, force)
+        except Exception as e:
+            logger.exception(e)
+            logger.error("Failed to run schedule for user %s", user_id)
+
+    def _set_default_notification_schedule(self, user: User):
+        if not user.get("notification_schedule"):
+            user["notification_schedule"] = {}
+
+        user["notification_schedule"].setdefault("timezone", get_session_timezone())
+        user["notification_schedule"].setdefault("times", app.config["DEFAULT_SCHEDULED_NOTIFICATION_TIMES"])
 
     def process_schedule(
         self,
@@ -164,6 +243,50 @@ class SendScheduledNotificationEmails(Command):
             reverse=True,
         )
 
+    def _get_topic_queue_items(
+        self,
+        section: str,
+        topic_queues: List[Tuple[NotificationQueueTopic, Topic]],
+        user: User,
+        company: Optional[Company],
+        size: Optional[int] = None,
+    ) -> List[Optional[Dict[str, Dict[str, Any]]]]:
+        """Get the items the user has access to for all the topic queues, using a single multi-search request
+
+        Only the latest items are loaded for each topic, sorted by ``versioncreated``.
+        As one item is shown per topic, and an item is not shown twice, the number of topics is enough by default.
+        Only the last ``MAX_QUEUE_ITEMS_SEARCHED`` items of each queue are searched.
+
+        :param size: Number of items loaded per topic queue, defaults to the number of topic queues
+        :return: For each topic queue, the latest items found by their ID, or ``None`` if the user can't access the topic
+        """
+
+        search_service = get_resource_service("wire_search" if section == "wire" else "agenda")
+        topic_queue_items: List[Optional[Dict[str, Dict[str, Any]]]] = [None] * len(topic_queues)
+        searches = []
+        search_indexes = []
+
+        for index, (topic_queue, topic) in enumerate(topic_queues):
+            item_ids = list(dict.fromkeys(reversed(topic_queue.get("items") or [])))[:MAX_QUEUE_ITEMS_SEARCHED]
+            query = search_service.get_topic_query(
+                topic,
+                user,
+                company,
+                args={"es_highlight": 1, "ids": item_ids, "size": min(len(item_ids), size or len(topic_queues))},
+            )
+
+            if not query:  # user might not have access to section anymore
+                continue
+
+            query.args["sort"] = "versioncreated:desc"
+            searches.append(query)
+            search_indexes.append(index)
+
+        for index, items in zip(search_indexes, search_service.get_items_by_queries(searches)):
+            topic_queue_items[index] = {item["_id"]: item for item in items}
+
+        return topic_queue_items
+
     def _get_latest_item_from_topic_queue(
         self,
         topic_queue: NotificationQueueTopic,
@@ -171,21 +294,20 @@ class SendScheduledNotificationEmails(Command):
         user: User,
         company: Optional[Company],
         exclude_items: Set[str],
+        items: Optional[Dict[str, Dict[str, Any]]] = None,
     ) -> Optional[Dict[str, Any]]:
-        for item_id in reversed(topic_queue["items"]):
-            if item_id in exclude_items:
-                continue
-            search_service = get_resource_service("wire_search" if topic["topic_type"] == "wire" else "agenda")
+        if items is None:
+            items = self._get_topic_queue_items(
+                topic["topic_type"], [(topic_queue, topic)], user, company, size=len(exclude_items) + 1
+            )[0]
 
-            query = search_service.get_topic_query(topic, user, company, args={"es_highlight": 1, "ids": [item_id]})
-
-            if not query:  # user might not have access to section anymore
+            if items is None:
                 return None
 
-            items = search_service.get_items_by_query(query, size=1)
-
-            if items.count():
-                return items[0]
+        # Items are sorted by ``versioncreated``, latest first
+        for item_id, item in items.items():
+            if item_id not in exclude_items:
+                return item
 
         return None
 
@@ -207,7 +329,7 @@ class SendScheduledNotificationEmails(Command):
             return topic_entries, topic_match_table
 
         for section in ["wire", "agenda"]:
-            items_in_entries: Set[str] = set()
+            topic_queues: List[Tuple[NotificationQueueTopic, Topic]] = []
             for topic_queue in self._get_queue_entries_for_section(schedule, section):
                 if not len(topic_queue.get("items") or []):
                     # This Topic Queue didn't match any items during this period
@@ -221,9 +343,19 @@ class SendScheduledNotificationEmails(Command):
 
                 topic_match_table[section].append((topic["label"], len(topic_queue["items"])))
                 topics_matched.append(topic["_id"])
+                topic_queues.append((topic_queue, topic))
+
+            if not topic_queues:
+                continue
+
+            items_in_entries: Set[str] = set()
+            topic_queue_items = self._get_topic_queue_items(section, topic_queues, user, company)
+            for (topic_queue, topic), items in zip(topic_queues, topic_queue_items):
+                if items is None:
+                    continue
 
                 latest_item = self._get_latest_item_from_topic_queue(
-                    topic_queue, topic, user, company, items_in_entries
+                    topic_queue, topic, user, company, items_in_entries, items
                 )
 
                 if latest_item is None:
@@ -248,3 +380,10 @@ class SendScheduledNotificationEmails(Command):
 @celery.task(soft_time_limit=600)
 def send_scheduled_notifications():
     SendScheduledNotificationEmails().run()
+
+
+@celery.task(soft_time_limit=600)
+def send_scheduled_notifications_for_users(user_ids: List[ObjectId], now_utc: datetime, force: bool = False):
+    command = SendScheduledNotificationEmails()
+    command.log_msg = "Scheduled Notifications: {}".format(now_utc)
+    command.run_schedules_for_users(user_ids, now_utc, force)
@@ -1,7 +1,12 @@
+import time
 import warnings
 
-from typing import List, Optional, Union
+from copy import deepcopy
+
+from typing import Dict, List, Optional, Tuple, Union
+from uuid import uuid4
 from bson import ObjectId
+from flask import current_app as app
 
 import newsroom
 import superdesk
@@ -49,7 +54,17 @@ class ProductsResource(newsroom.Resource):
 class ProductsService(CacheableService):
     cache_lookup = {"is_enabled": True}
 
+    def on_created(self, docs):
+        super().on_created(docs)
+        invalidate_products_permission_index()
+
+    def on_updated(self, updates, original):
+        super().on_updated(updates, original)
+        invalidate_products_permission_index()
+
     def on_deleted(self, doc: Product) -> None:
+        super().on_deleted(doc)
+        invalidate_products_permission_index()
         lookup = {"products._id": doc["_id"]}
         for resource in ("users", "companies"):
             items = superdesk.get_resource_service(resource).get(req=None, lookup=lookup)
@@ -82,6 +97,92 @@ class ProductsService(CacheableService):
 
 products_service = ProductsService()
 
+PRODUCTS_PERMISSION_INDEX_VERSION_KEY = "products_permission_index_version"
+
+
+class ProductsPermissionIndex:
+    """In-process index of products, and the products resolved for companies and users
+
+    Resolving the products for a company or user is a dict lookup, instead of a query to Mongo.
+    The index is versioned using a key in the app cache, so it is reloaded in every process
+    after products, companies or users are updated (see ``invalidate_products_permission_index``).
+    This requires a cache shared by all the processes (i.e. ``CACHE_TYPE = "redis"``), with the default
+    in-memory cache other processes only reload it after ``PRODUCTS_PERMISSION_INDEX_MAX_AGE`` seconds.
+    """
+
+    MAX_RESOLVED_ENTRIES = 10000
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self.loaded_at = 0.0
+        self.products_by_id: Dict[Union[str, ObjectId], Product] = {}
+        self.resolved: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[Product]] = {}
+
+    def refresh(self) -> None:
+        """Reload the products if the index version has changed, or the index is older than its max age"""
+
+        version = app.cache.get(PRODUCTS_PERMISSION_INDEX_VERSION_KEY)
+        if version is None:
+            version = invalidate_products_permission_index()
+        elif version == self.version and time.monotonic() - self.loaded_at < app.config.get(
+            "PRODUCTS_PERMISSION_INDEX_MAX_AGE", 60
+        ):
+            return
+
+        # Include disabled products, same as when querying Mongo by product ids
+        products = sorted(products_service.get_from_mongo(req=None, lookup={}), key=lambda p: p.get("name") or "")
+        self.products_by_id = {product["_id"]: product for product in products}
+        self.resolved = {}
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def get_products(self, product_ids: IdsList, navigation_ids: Optional[IdsList] = None) -> List[Product]:
+        """Returns the products for the provided ids, optionally filtered by navigations
+
+        :param product_ids: List of Product IDs
+        :param navigation_ids: List of Navigation IDs
+        """
+
+        self.refresh()
+        key = (
+            tuple(sorted(str(product_id) for product_id in product_ids)),
+            tuple(sorted(str(navigation_id) for navigation_id in navigation_ids or [])),
+        )
+        if key not in self.resolved:
+            if len(self.resolved) >= self.MAX_RESOLVED_ENTRIES:
+                self.resolved = {}
+
+            products = [
+                product
+                for product in self.products_by_id.values()
+                if product["_id"] in product_ids
+                and (
+                    not navigation_ids
+                    or any_objectid_in_list(
+                        navigation_ids, [parse_objectid(n) for n in product.get("navigations") or []]
+                    )
+                )
+            ]
+            self.resolved[key] = products
+
+        # Copies, so the indexed products can't be modified by the caller
+        return deepcopy(self.resolved[key])
+
+
+products_permission_index = ProductsPermissionIndex()
+
+
+def invalidate_products_permission_index() -> str:
+    """Bump the version of the products permission index, so it is reloaded on next use"""
+
+    version = uuid4().hex
+    app.cache.set(PRODUCTS_PERMISSION_INDEX_VERSION_KEY, version, timeout=0)
+    return version
+
+
+def use_products_permission_index() -> bool:
+    return bool(app.config.get("PRODUCTS_PERMISSION_INDEX_ENABLED"))
+
 
 def get_products_by_navigation(navigation_ids: NavigationIds, product_type: Optional[str] = None) -> List[Product]:
     return [
@@ -134,6 +235,9 @@ def get_products_by_company(
     ]
 
     if company_product_ids:
+        if use_products_permission_index():
+            return products_permission_index.get_products(company_product_ids, navigation_ids)
+
         lookup = get_products_lookup(company_product_ids, navigation_ids)
         return list(products_service.get_from_mongo(req=None, lookup=lookup))
 
@@ -144,6 +248,9 @@ def get_products_by_user(user: User, section: str, navigation_ids: Optional[Navi
     if user.get("products"):
         ids = [parse_objectid(p["_id"]) for p in user["products"] if p["section"] == section]
         if ids:
+            if use_products_permission_index():
+                return products_permission_index.get_products(ids, navigation_ids)
+
             lookup = get_products_lookup(ids, navigation_ids)
             return list(products_service.get_from_mongo(req=None, lookup=lookup))
 
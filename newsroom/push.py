@@ -7,7 +7,7 @@ import newsroom.signals as signals
 
 from copy import copy, deepcopy
 from datetime import datetime, timedelta
-from typing import Optional, Set
+from typing import List, Optional, Set, Tuple
 from contextlib import contextmanager
 
 from flask import current_app as app
@@ -32,6 +32,7 @@ from newsroom.topics.topics import (
 )
 from newsroom.utils import parse_dates, get_user_dict, get_company_dict, parse_date_str
 from newsroom.email import (
+    EmailFanout,
     send_new_item_notification_email,
     send_history_match_notification_email,
     send_item_killed_notification_email,
@@ -46,6 +47,8 @@ from newsroom.agenda.utils import (
     push_agenda_item_notification,
 )
 from newsroom.users import users_service
+from newsroom.news_api.utils import rewrite_image_embeds, NEWS_API_ASSET_PLACEHOLDER
+from newsroom.news_api.formatters.cache import invalidate_formatted_item
 
 
 logger = logging.getLogger(__name__)
@@ -188,6 +191,11 @@ def publish_item(doc, original):
     if app.generate_embed_renditions:
         app.generate_embed_renditions(doc)
 
+    # Pre-render the image embeds for the News API, so the Atom feed doesn't have to parse the HTML per request
+    news_api_body_html = rewrite_image_embeds(doc, lambda media_id: NEWS_API_ASSET_PLACEHOLDER + media_id)
+    if news_api_body_html:
+        doc["news_api_body_html"] = news_api_body_html
+
     try:
         if doc.get("coverage_id"):
             agenda_items = superdesk.get_resource_service("agenda").set_delivery(doc)
@@ -210,6 +218,9 @@ def publish_item(doc, original):
         service.patch(_id, updates={"associations": None})
     if "evolvedfrom" in doc and parent_item:
         service.system_update(parent_item["_id"], {"nextversion": _id}, parent_item)
+        invalidate_formatted_item(parent_item["_id"])
+    # Discard the formatted versions cached by the News API, i.e. if the item was killed
+    invalidate_formatted_item(_id)
     return _id
 
 
@@ -915,13 +926,22 @@ def notify_user_matches(item, users_dict, companies_dict, user_ids, company_ids,
 
 
 def send_user_notification_emails(item, user_matches, users, section):
+    fanout = get_notification_email_fanout()
     for user_id in user_matches:
         user = users.get(str(user_id))
         if is_canceled(item):
-            send_item_killed_notification_email(user, item=item)
+            send_item_killed_notification_email(user, item=item, fanout=fanout)
         else:
             if user.get("receive_email"):
-                send_history_match_notification_email(user, item=item, section=section)
+                send_history_match_notification_email(user, item=item, section=section, fanout=fanout)
+
+    if fanout is not None:
+        fanout.send()
+
+
+def get_notification_email_fanout() -> Optional[EmailFanout]:
+    """Returns the email fan-out used to render notification emails once per variant, if enabled"""
+    return EmailFanout() if app.config.get("EMAIL_NOTIFICATION_FANOUT") else None
 
 
 def notify_wire_topic_matches(item, users_dict, companies_dict) -> Set[ObjectId]:
@@ -962,6 +982,8 @@ def notify_agenda_topic_matches(item, users_dict, companies_dict) -> Set[ObjectI
 def send_topic_notification_emails(item, topics, topic_matches, users, companies) -> Set[ObjectId]:
     users_processed: Set[ObjectId] = set()
     users_with_realtime_subscription: Set[ObjectId] = set()
+    scheduled_subscriptions: List[Tuple[ObjectId, str, ObjectId]] = []
+    fanout = get_notification_email_fanout()
 
     for topic in topics:
         if topic["_id"] not in topic_matches:
@@ -994,9 +1016,7 @@ def send_topic_notification_emails(item, topics, topic_matches, users, companies
             if not user.get("receive_email"):
                 continue
             elif subscriber.get("notification_type") == "scheduled":
-                superdesk.get_resource_service("notification_queue").add_item_to_queue(
-                    user["_id"], section, topic["_id"], item
-                )
+                scheduled_subscriptions.append((user["_id"], section, topic["_id"]))
             elif user["_id"] in users_with_realtime_subscription:
                 # This user has already received a realtime notification email about this item
                 # No need to send another
@@ -1020,8 +1040,16 @@ def send_topic_notification_emails(item, topics, topic_matches, users, companies
                     topic["label"],
                     item=highlighted_item,
                     section=section,
+                    fanout=fanout,
+                    topic_id=topic["_id"],
                 )
 
+    if fanout is not None:
+        fanout.send()
+
+    if scheduled_subscriptions:
+        superdesk.get_resource_service("notification_queue").add_item_to_queues(item, scheduled_subscriptions)
+
     return users_with_realtime_subscription
 
 
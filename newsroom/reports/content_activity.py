@@ -1,6 +1,8 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from copy import deepcopy
+from typing import Any, Dict, List, Optional, Tuple
 
-from flask import abort, request
+from flask import abort, request, current_app as app
 from flask_babel import gettext
 
 from superdesk import get_resource_service
@@ -19,6 +21,9 @@ def get_items(args):
 
     For performance reasons, returns an iterator that yields an array of CHUNK_SIZE
     So that aggregations can be queried while the next iteration is retrieved
+
+    Pages through the items using ``search_after``, so the number of items isn't limited by the ES result window.
+    Items are sorted by ``guid`` after ``versioncreated``, as sorting on ``_id`` has no doc values and uses fielddata
     """
 
     if not args.get("section"):
@@ -27,8 +32,7 @@ def get_items(args):
     source = {
         "query": items_query(True),
         "size": CHUNK_SIZE,
-        "from": 0,
-        "sort": [{"versioncreated": "asc"}],
+        "sort": [{"versioncreated": "asc"}, {"guid": "asc"}],
         "_source": [
             "_resource",
             "headline",
@@ -57,17 +61,21 @@ def get_items(args):
     section = args["section"]
     get_resource_service("section_filters").apply_section_filter(source["query"], section)
 
+    search_service = get_resource_service(section if section == "agenda" else f"{section}_search")
     while True:
-        results = get_resource_service(section if section == "agenda" else f"{section}_search").search(source)
+        results = search_service.search(source)
         items = list(results)
 
         if not len(items):
             break
 
-        source["from"] += CHUNK_SIZE
-
         yield items
 
+        if len(items) < CHUNK_SIZE:
+            break
+
+        source["search_after"] = results.hits["hits"]["hits"][-1]["sort"]
+
 
 def get_aggregations(args, ids):
     """Get action and company aggregations for the items provided"""
@@ -114,6 +122,41 @@ def get_aggregations(args, ids):
     }
 
 
+def get_items_with_aggregations(args):
+    """Yields the news items for the report, with their history aggregations
+
+    The aggregations for a chunk of items are retrieved in a background thread,
+    while the next chunk of items is being retrieved
+    """
+
+    flask_app = app._get_current_object()
+
+    def _get_aggregations(item_ids: List[str]) -> Dict[str, Any]:
+        with flask_app.app_context():
+            return get_aggregations(args, item_ids)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending: Optional[Tuple[List[Dict[str, Any]], Future]] = None
+
+        for items in get_items(args):
+            future = executor.submit(_get_aggregations, [item.get("_id") for item in items])
+
+            if pending is not None:
+                yield from _add_aggregations(*pending)
+
+            pending = (items, future)
+
+        if pending is not None:
+            yield from _add_aggregations(*pending)
+
+
+def _add_aggregations(items: List[Dict[str, Any]], future: Future):
+    aggs = future.result()
+    for item in items:
+        item["aggs"] = aggs.get(item["_id"]) or {"total": 0, "actions": {}, "companies": []}
+        yield item
+
+
 def get_facets(args):
     """Get aggregations for genre and companies using the date range and section
 
@@ -178,22 +221,23 @@ def get_facets(args):
 
 
 def export_csv(args, results):
-    """Generate 2-dimensional array for generating the CSV output"""
+    """Generate the rows for the CSV output
+
+    The rows are yielded as the items are retrieved, so the CSV can be streamed in the response
+    """
 
     companies = {str(company["_id"]): company for company in query_resource("companies")}
 
-    rows = [
-        [
-            gettext("Published"),
-            gettext("Headline"),
-            gettext("Take Key"),
-            gettext("Place"),
-            gettext("Category"),
-            gettext("Subject"),
-            gettext("Source"),
-            gettext("Companies"),
-            gettext("Actions"),
-        ]
+    header = [
+        gettext("Published"),
+        gettext("Headline"),
+        gettext("Take Key"),
+        gettext("Place"),
+        gettext("Category"),
+        gettext("Subject"),
+        gettext("Source"),
+        gettext("Companies"),
+        gettext("Actions"),
     ]
 
     actions = args.get("action") or [
@@ -208,28 +252,30 @@ def export_csv(args, results):
     ]
 
     if "download" in actions:
-        rows[0].append(gettext("Download"))
+        header.append(gettext("Download"))
 
     if "copy" in actions:
-        rows[0].append(gettext("Copy"))
+        header.append(gettext("Copy"))
 
     if "share" in actions:
-        rows[0].append(gettext("Share"))
+        header.append(gettext("Share"))
 
     if "print" in actions:
-        rows[0].append(gettext("Print"))
+        header.append(gettext("Print"))
 
     if "open" in actions:
-        rows[0].append(gettext("Open"))
+        header.append(gettext("Open"))
 
     if "preview" in actions:
-        rows[0].append(gettext("Preview"))
+        header.append(gettext("Preview"))
 
     if "clipboard" in actions:
-        rows[0].append(gettext("Clipboard"))
+        header.append(gettext("Clipboard"))
 
     if "api" in actions:
-        rows[0].append(gettext("API retrieval"))
+        header.append(gettext("API retrieval"))
+
+    yield header
 
     for item in results:
         aggs = item.get("aggs") or {}
@@ -258,9 +304,23 @@ def export_csv(args, results):
             if action_name in actions:
                 row.append((aggs.get("actions") or {}).get(action_name, 0))
 
-        rows.append(row)
+        yield row
+
 
-    return rows
+def validate_args(args):
+    """Validate the report arguments before any item is retrieved
+
+    The CSV export is streamed, so errors must be raised before the response is started
+    """
+
+    section = args["section"]
+    if section != "agenda" and section not in [s["_id"] for s in app.sections]:
+        abort(400, gettext("Unknown section {}".format(section)))
+
+    try:
+        get_date_filters({**args, "date_to": args.get("date_from")})
+    except (ValueError, TypeError):
+        abort(400, gettext("Invalid date"))
 
 
 def get_content_activity_report():
@@ -282,20 +342,9 @@ def get_content_activity_report():
         # for genre and companies
         return get_facets(args)
 
-    response = {"results": [], "name": gettext("Content activity")}
-
-    for items in get_items(args):
-        item_ids = [item.get("_id") for item in items]
-        aggs = get_aggregations(args, item_ids)
-
-        for item in items:
-            item_id = item["_id"]
-
-            if aggs.get(item_id):
-                item["aggs"] = aggs[item_id]
-            else:
-                item["aggs"] = {"total": 0, "actions": {}, "companies": []}
+    validate_args(args)
 
-            response["results"].append(item)
+    if args.get("export"):
+        return export_csv(args, get_items_with_aggregations(args))
 
-    return export_csv(args, response["results"]) if args.get("export") else response
+    return {"results": list(get_items_with_aggregations(args)), "name": gettext("Content activity")}
@@ -6,8 +6,7 @@ from copy import deepcopy
 from bson import ObjectId
 from flask import abort
 from flask_babel import gettext
-from flask import request, send_file, current_app as newsroom_app, json
-from eve.utils import ParsedRequest
+from flask import request, send_file, current_app as newsroom_app
 from werkzeug.utils import secure_filename
 import superdesk
 from superdesk.utc import utcnow
@@ -26,6 +25,8 @@ from newsroom.news_api.utils import format_report_results
 from newsroom.companies.utils import get_companies_id_by_product
 from .content_activity import get_content_activity_report  # noqa
 
+PRODUCT_STORIES_REPORT_CACHE_KEY = "product-stories-report"
+
 
 def get_company_saved_searches():
     """Returns number of saved searches by company"""
@@ -143,24 +144,34 @@ def get_company_products():
 def get_product_stories():
     """Returns the story count per product for today, this week, this month ..."""
 
+    cache_timeout = newsroom_app.config.get("PRODUCT_STORIES_REPORT_CACHE_TIMEOUT")
+    if cache_timeout:
+        cached = newsroom_app.cache.get(PRODUCT_STORIES_REPORT_CACHE_KEY)
+        if cached:
+            return cached
+
     results = []
-    products = query_resource("products")
+    products = list(query_resource("products"))
     section_filters = superdesk.get_resource_service("section_filters").get_section_filters_dict()
 
-    for product in products:
+    # The counts of all the products are loaded using a single multi-search request
+    products_counts = superdesk.get_resource_service("wire_search").get_products_item_report(products, section_filters)
+    for product, counts in zip(products, products_counts):
         product_stories = {
             "_id": product["_id"],
             "name": product.get("name"),
             "is_enabled": product.get("is_enabled"),
         }
-        counts = superdesk.get_resource_service("wire_search").get_product_item_report(product, section_filters)
-        for key, value in counts.hits["aggregations"].items():
+        for key, value in counts.items():
             product_stories[key] = value["buckets"][0]["doc_count"]
 
         results.append(product_stories)
 
     sorted_results = sorted(results, key=lambda k: k["name"])
-    return {"results": sorted_results, "name": gettext("Stories per product")}
+    report = {"results": sorted_results, "name": gettext("Stories per product")}
+    if cache_timeout:
+        newsroom_app.cache.set(PRODUCT_STORIES_REPORT_CACHE_KEY, report, timeout=cache_timeout)
+    return report
 
 
 def get_company_report():
@@ -323,31 +334,17 @@ def get_company_api_usage():
     if not date_range.get("gt") and date_range.get("lt"):
         abort(400, "No date range specified.")
 
-    source = {}
-    must_terms = [{"range": {"created": date_range}}]
-    source["query"] = {"bool": {"filter": must_terms}}
-    source["sort"] = [{"created": "desc"}]
-    source["size"] = 200
-    source["from"] = int(args.get("from", 0))
-    source["aggs"] = {
-        "items": {
-            "aggs": {"endpoints": {"terms": {"size": 0, "field": "endpoint"}}},
-            "terms": {"size": 0, "field": "subscriber"},
-        }
-    }
-    company_ids = [t["company"] for t in query_resource(API_TOKENS)]
-    source["query"]["bool"]["filter"].append({"terms": {"subscriber": company_ids}})
-    companies = get_entity_dict(query_resource("companies", lookup={"_id": {"$in": company_ids}}), str_id=True)
-    req = ParsedRequest()
-    req.args = {"source": json.dumps(source)}
-
-    if source["from"] >= 1000:
+    if int(args.get("from", 0)) >= 1000:
         # https://www.elastic.co/guide/en/elasticsearch/guide/current/pagination.html#pagination
         return abort(400)
 
+    company_ids = [t["company"] for t in query_resource(API_TOKENS)]
+    companies = get_entity_dict(query_resource("companies", lookup={"_id": {"$in": company_ids}}), str_id=True)
+
+    # Complete days are read from the daily rollups, only the rest from the raw audit records
+    usage = superdesk.get_resource_service("api_audit_daily").get_usage(date_range, company_ids)
     unique_endpoints = []
-    search_result = superdesk.get_resource_service("api_audit").get(req, None)
-    results = format_report_results(search_result, unique_endpoints, companies)
+    results = format_report_results(usage, unique_endpoints, companies)
 
     results = {
         "results": results,
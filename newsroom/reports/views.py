@@ -1,7 +1,8 @@
 from io import StringIO
 import csv
+import itertools
 
-from flask import session, jsonify, render_template, abort, current_app as newsroom_app
+from flask import session, jsonify, render_template, abort, stream_with_context, current_app as newsroom_app
 from flask_babel import gettext, current_app as app
 
 from newsroom.decorator import account_manager_or_company_admin_only
@@ -10,6 +11,8 @@ from newsroom.utils import query_resource
 
 from .utils import get_current_user_reports
 
+CSV_STREAM_CHUNK_SIZE = 64 * 1024
+
 
 @blueprint.route("/reports/print/<report>", methods=["GET"])
 @account_manager_or_company_admin_only
@@ -59,18 +62,29 @@ def export_reports(report):
     if not func:
         abort(400, gettext("Unknown report {}".format(report)))
 
-    rows = func()
-    data = StringIO()
-    writer = csv.writer(data, dialect="excel")
+    # Get the header and first row before the response is started,
+    # so invalid requests and search errors are returned with an error status
+    rows = iter(func())
+    rows = itertools.chain(list(itertools.islice(rows, 2)), rows)
+
+    def generate_csv():
+        data = StringIO()
+        writer = csv.writer(data, dialect="excel")
 
-    for row in rows:
-        writer.writerow(row)
+        for row in rows:
+            writer.writerow(row)
+            if data.tell() >= CSV_STREAM_CHUNK_SIZE:
+                yield data.getvalue().encode("utf-8")
+                data.seek(0)
+                data.truncate()
 
-    csv_file = data.getvalue().encode("utf-8")
+        yield data.getvalue().encode("utf-8")
 
-    response = newsroom_app.response_class(response=csv_file, status=200, mimetype="text/csv", direct_passthrough=True)
+    # Stream the CSV, so large reports are sent as the rows are generated
+    response = newsroom_app.response_class(
+        stream_with_context(generate_csv()), status=200, mimetype="text/csv", direct_passthrough=True
+    )
 
-    response.content_length = len(csv_file)
     response.headers["Content-Type"] = "text/csv"
     response.headers["Content-Disposition"] = 'attachment; filename="report-export.csv"'
 
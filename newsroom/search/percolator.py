@@ -0,0 +1,196 @@
+"""Percolator index of subscribed topic queries
+
+Instead of running a search per user for every published item, all subscribed
+topic queries are stored in a percolator index (one per section), so the topics
+matching an item can be resolved with a single percolate request.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+import elasticsearch
+from flask import current_app as app, json
+from superdesk import get_resource_service
+
+from newsroom.types import Topic
+
+logger = logging.getLogger(__name__)
+
+PERCOLATOR_QUERY_FIELD = "topic_query"
+PERCOLATOR_INDEX_SUFFIX = "topics_percolator"
+
+#: Max number of topics percolated per request, must not exceed ``index.max_result_window``
+PERCOLATE_BATCH_SIZE = 1000
+
+
+def is_topics_percolator_enabled() -> bool:
+    return bool(app.config.get("TOPICS_PERCOLATOR_ENABLED"))
+
+
+def get_topic_search_service(topic_type: Optional[str]):
+    return get_resource_service("agenda" if topic_type == "agenda" else "wire_search")
+
+
+def get_percolator_index(search_service) -> str:
+    return "{}_{}".format(app.data.elastic._resource_index(search_service.datasource), PERCOLATOR_INDEX_SUFFIX)
+
+
+def init_percolator_index(search_service) -> None:
+    """Create the percolator index for the given search service, if it doesn't exist
+
+    The mapping and analysis settings are copied from the content index, so the stored
+    topic queries are parsed against the same fields as the content they are matched against.
+    """
+
+    es = app.data.elastic.elastic(search_service.datasource)
+    index = get_percolator_index(search_service)
+
+    if es.indices.exists(index=index):
+        return
+
+    mappings = app.data.elastic.get_mapping(search_service.datasource).get("mappings") or {}
+    properties = dict(mappings.get("properties") or {})
+    properties[PERCOLATOR_QUERY_FIELD] = {"type": "percolator"}
+    properties["topic_type"] = {"type": "keyword"}
+
+    settings = app.data.elastic.get_settings(search_service.datasource).get("settings") or {}
+    analysis = (settings.get("index") or {}).get("analysis")
+
+    es.indices.create(
+        index=index,
+        body={
+            "settings": {"analysis": analysis} if analysis else {},
+            "mappings": {"properties": properties},
+        },
+    )
+    logger.info("Created topics percolator index %s", index)
+
+
+def get_topic_percolator_query(topic: Topic) -> Optional[Dict[str, Any]]:
+    """Returns the ES query for the topic (without user permissions), or ``None`` if it can't be generated"""
+
+    if not topic.get("subscribers"):
+        return None
+
+    search = get_topic_search_service(topic.get("topic_type")).get_topic_query(topic, None, None)
+    if not search:
+        return None
+
+    # Serialise using the app JSON encoder, so dates etc are stored the same as with a normal search
+    return json.loads(json.dumps(search.query))
+
+
+def index_topic(topic: Topic) -> bool:
+    """Add, update or remove the topic query in the percolator index
+
+    :return: ``True`` if the topic query was added to the index
+    """
+
+    if not is_topics_percolator_enabled():
+        return False
+
+    search_service = get_topic_search_service(topic.get("topic_type"))
+    es = app.data.elastic.elastic(search_service.datasource)
+    index = get_percolator_index(search_service)
+
+    try:
+        query = get_topic_percolator_query(topic)
+        if query is None:
+            es.delete(index=index, id=str(topic["_id"]), ignore=[404])
+            return False
+
+        init_percolator_index(search_service)
+        es.index(
+            index=index,
+            id=str(topic["_id"]),
+            body={
+                PERCOLATOR_QUERY_FIELD: query,
+                "topic_type": topic.get("topic_type"),
+            },
+        )
+        return True
+    except elasticsearch.exceptions.ElasticsearchException:
+        logger.exception("Failed to update topic in percolator index", extra=dict(topic=topic.get("_id")))
+        return False
+
+
+def remove_topic(topic: Topic) -> None:
+    if not is_topics_percolator_enabled():
+        return
+
+    search_service = get_topic_search_service(topic.get("topic_type"))
+    try:
+        app.data.elastic.elastic(search_service.datasource).delete(
+            index=get_percolator_index(search_service),
+            id=str(topic["_id"]),
+            ignore=[404],
+        )
+    except elasticsearch.exceptions.ElasticsearchException:
+        logger.exception("Failed to remove topic from percolator index", extra=dict(topic=topic.get("_id")))
+
+
+def rebuild_percolator_index(topics: Iterable[Topic]) -> int:
+    """Drop and re-create the percolator indexes, indexing all provided topics
+
+    :return: The number of topics indexed
+    """
+
+    for topic_type in ["wire", "agenda"]:
+        search_service = get_topic_search_service(topic_type)
+        app.data.elastic.elastic(search_service.datasource).indices.delete(
+            index=get_percolator_index(search_service),
+            ignore=[404],
+        )
+        init_percolator_index(search_service)
+
+    return len([topic for topic in topics if index_topic(topic)])
+
+
+def percolate_item(search_service, item_id: str, topic_ids: Iterable[str]) -> Set[str]:
+    """Returns the IDs of the provided topics whose query matches the stored content item
+
+    The item is referenced by its ID, so ES loads its source from the content index.
+    The percolate request is filtered to the topic IDs, in batches of ``PERCOLATE_BATCH_SIZE``,
+    so the number of matches never exceeds the size of the request (or ``index.max_result_window``).
+
+    :param search_service: The search service for the item's section
+    :param item_id: ID of the content item
+    :param topic_ids: IDs of the candidate topics
+    :raises ValueError: If not all the matching topics were returned
+    """
+
+    es = app.data.elastic.elastic(search_service.datasource)
+    topic_ids = list(topic_ids)
+    matching_topic_ids: Set[str] = set()
+
+    for start in range(0, len(topic_ids), PERCOLATE_BATCH_SIZE):
+        batch = topic_ids[start : start + PERCOLATE_BATCH_SIZE]
+        response = es.search(
+            index=get_percolator_index(search_service),
+            body={
+                "query": {
+                    "bool": {
+                        "must": {
+                            "percolate": {
+                                "field": PERCOLATOR_QUERY_FIELD,
+                                "index": app.data.elastic._resource_index(search_service.datasource),
+                                "id": item_id,
+                            },
+                        },
+                        "filter": {"ids": {"values": batch}},
+                    },
+                },
+                "_source": False,
+                "size": len(batch),
+                "track_total_hits": True,
+            },
+        )
+
+        hits = response["hits"]["hits"]
+        total = response["hits"]["total"]["value"]
+        if total != len(hits):
+            raise ValueError("Percolate returned {} of {} matching topics".format(len(hits), total))
+
+        matching_topic_ids.update(hit["_id"] for hit in hits)
+
+    return matching_topic_ids
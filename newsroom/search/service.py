@@ -1,10 +1,12 @@
+import hashlib
 import logging
-from typing import List, Literal, Optional, Union, Dict, Any, TypedDict
+from typing import List, Literal, Optional, Tuple, Union, Dict, Any, TypedDict
 from copy import deepcopy
 
 from flask import current_app as app, json, abort
 from flask_babel import gettext
 from eve.utils import ParsedRequest
+from eve_elastic.elastic import ElasticCursor
 from werkzeug.exceptions import Forbidden
 
 from newsroom.types import Company, Section, SectionFilter, Topic, User
@@ -15,6 +17,7 @@ from content_api.errors import BadParameterValueError
 from newsroom import Service
 from newsroom.auth.utils import user_has_section_allowed
 from newsroom.search import BoolQuery, BoolQueryParams, QueryStringQuery
+from newsroom.search.percolator import is_topics_percolator_enabled, percolate_item
 from newsroom.search.config import (
     SearchGroupNestedConfig,
     get_nested_config,
@@ -119,6 +122,12 @@ class SearchArgs(TypedDict, total=False):
     filter: Union[Dict[str, str], str]
 
 
+class TopicPermissionGroup(TypedDict):
+    query: BoolQuery
+    users: List[Tuple[ObjectId, List[Tuple[Topic, BoolQuery]]]]
+    topics: List[Tuple[Topic, BoolQuery]]
+
+
 class SearchQuery(object):
     """Class for storing the search parameters for validation and query generation"""
 
@@ -176,6 +185,21 @@ class BaseSearchService(Service):
 
         return response
 
+    def get_search_from_request(self, req) -> SearchQuery:
+        """Generate the search query for the request, with all the filters applied
+
+        Used to run the search for multiple requests with :meth:`get_items_by_queries`
+
+        :param ParsedRequest req: The parsed in request instance
+        """
+
+        search = SearchQuery()
+        self.prefill_search_args(search, req)
+        self.prefill_search_query(search, req)
+        self.validate_request(search)
+        self.apply_filters(search)
+        return search
+
     def on_fetched(self, docs):
         """Add IDs of the versions that matched the search to the HATEOAS response
 
@@ -271,6 +295,24 @@ class BaseSearchService(Service):
     def internal_get(self, req, lookup):
         return super().get(req, lookup)
 
+    def internal_msearch(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run multiple searches against this service's index in a single request
+
+        :param sources: List of search request bodies
+        :return: The list of raw ES responses, in the same order as ``sources``
+        """
+
+        if not sources:
+            return []
+
+        index = app.data.elastic._resource_index(self.datasource)
+        body: List[Dict[str, Any]] = []
+        for source in sources:
+            body.append({"index": index})
+            body.append(json.loads(json.dumps(source)))
+
+        return app.data.elastic.elastic(self.datasource).msearch(body=body)["responses"]
+
     # Overridable internal methods
     def prefill_search_query(self, search, req=None, lookup=None):
         """Generate the search query instance
@@ -870,9 +912,19 @@ class BaseSearchService(Service):
             response.docs = embargoed_response.docs + response.docs
             response.hits["hits"]["total"] = response.count() + embargoed_response.count()
 
-    def get_matching_topics_for_item(self, topics, users, companies, query):
-        topic_matches = []
+    def get_matching_topics_for_item(self, topics, users, companies, query, item_id=None):
+        if item_id and is_topics_percolator_enabled():
+            try:
+                return self.get_percolated_topics_for_item(item_id, topics, users, companies, query)
+            except Exception:
+                logger.exception(
+                    "Error in get_percolated_topics_for_item, falling back to per user search",
+                    extra=dict(item=item_id),
+                )
+
         topics_checked = set()
+        permission_groups: Dict[str, TopicPermissionGroup] = {}
+        users_queried = 0
 
         for user in users.values():
             if not user_has_section_allowed(user, self.section):
@@ -881,7 +933,6 @@ class BaseSearchService(Service):
             if users_service.user_has_paused_notifications(user):
                 continue
 
-            aggs = {"topics": {"filters": {"filters": {}}}}
             company = companies.get(str(user.get("company", "")))
             # there will be one base search for a user with aggs for user topics
             search = self.get_topic_query(None, user, company, query=query)
@@ -900,34 +951,141 @@ class BaseSearchService(Service):
                 if not topic_query:
                     continue
 
-                aggs["topics"]["filters"]["filters"][str(topic["_id"])] = topic_query.query
-                queried_topics.append(topic)
+                queried_topics.append((topic, topic_query.query))
             if not queried_topics:
                 continue
-            source = {"query": search.query}
-            source["aggs"] = aggs if aggs["topics"]["filters"]["filters"] else {}
-            source["size"] = 0
 
-            req = ParsedRequest()
-            req.args = {"source": json.dumps(source)}
+            # Users with the same permission query share a single search
+            users_queried += 1
+            group_key = hashlib.sha1(json.dumps(search.query, sort_keys=True).encode()).hexdigest()
+            group = permission_groups.setdefault(
+                group_key,
+                TopicPermissionGroup(query=search.query, users=[], topics=[]),
+            )
+            group["users"].append((user["_id"], queried_topics))
+            group["topics"].extend(queried_topics)
 
+        topic_matches = []
+        es_calls = 0
+        for group in permission_groups.values():
+            es_calls += 1
             try:
-                search_results = self.internal_get(req, None)
+                topic_matches.extend(self._get_matching_topics_for_query(group["query"], group["topics"]))
+                continue
+            except Exception:
+                if len(group["users"]) == 1:
+                    logger.exception(
+                        "Error in get_matching_topics",
+                        extra=dict(query=group["query"], user=group["users"][0][0]),
+                    )
+                    continue
 
-                for topic in queried_topics:
-                    if search_results.hits["aggregations"]["topics"]["buckets"][str(topic["_id"])]["doc_count"] > 0:
-                        topic_matches.append(topic["_id"])
+            # One of the topics failed, query each user separately so other users still get their matches
+            for user_id, user_topics in group["users"]:
+                es_calls += 1
+                try:
+                    topic_matches.extend(self._get_matching_topics_for_query(group["query"], user_topics))
+                except Exception:
+                    logger.exception(
+                        "Error in get_matching_topics",
+                        extra=dict(query=group["query"], user=user_id),
+                    )
 
-            except Exception:
-                logger.exception(
-                    "Error in get_matching_topics",
-                    extra=dict(
-                        query=source,
-                        user=user["_id"],
-                    ),
+        logger.info(
+            "Matched topics for item",
+            extra=dict(
+                section=self.section,
+                users=users_queried,
+                permission_groups=len(permission_groups),
+                es_calls=es_calls,
+                es_calls_saved=users_queried - es_calls,
+            ),
+        )
+
+        return topic_matches
+
+    def _get_matching_topics_for_query(self, query, topics_and_queries) -> List[str]:
+        """Returns the ids of the topics matching the query, using a single filters aggregation"""
+
+        source = {
+            "query": query,
+            "aggs": {
+                "topics": {
+                    "filters": {
+                        "filters": {str(topic["_id"]): topic_query for topic, topic_query in topics_and_queries},
+                    },
+                },
+            },
+            "size": 0,
+        }
+
+        req = ParsedRequest()
+        req.args = {"source": json.dumps(source)}
+        search_results = self.internal_get(req, None)
+
+        return [
+            topic["_id"]
+            for topic, _topic_query in topics_and_queries
+            if search_results.hits["aggregations"]["topics"]["buckets"][str(topic["_id"])]["doc_count"] > 0
+        ]
+
+    def get_percolated_topics_for_item(self, item_id, topics, users, companies, query):
+        """Returns the list of topic ids matching the item, using the topics percolator index
+
+        The topic queries are resolved with a single percolate request. The user permissions
+        are then checked for the subscribers of the matching topics only, using a single msearch request.
+        """
+
+        topics_by_id = {str(topic["_id"]): topic for topic in topics}
+        if not topics_by_id:
+            return []
+
+        percolated_topic_ids = percolate_item(self, item_id, topics_by_id.keys())
+
+        user_topics: Dict[str, List[Topic]] = {}
+        for topic_id in percolated_topic_ids:
+            topic = topics_by_id.get(topic_id)
+            if not topic:
+                continue
+
+            user_ids = {str(subscriber["user_id"]) for subscriber in topic.get("subscribers") or []}
+            if topic.get("user"):
+                user_ids.add(str(topic["user"]))
+            for user_id in user_ids:
+                user_topics.setdefault(user_id, []).append(topic)
+
+        sources = []
+        source_user_ids = []
+        for user_id in user_topics.keys():
+            user = users.get(user_id)
+            if not user or not user_has_section_allowed(user, self.section):
+                continue
+
+            if users_service.user_has_paused_notifications(user):
+                continue
+
+            company = companies.get(str(user.get("company", "")))
+            search = self.get_topic_query(None, user, company, query=query)
+            if not search:
+                continue
+
+            sources.append({"query": search.query, "size": 0})
+            source_user_ids.append(user_id)
+
+        topic_matches = []
+        for user_id, response in zip(source_user_ids, self.internal_msearch(sources)):
+            if response.get("error"):
+                logger.error(
+                    "Error in get_percolated_topics_for_item",
+                    extra=dict(error=response["error"], user=user_id),
                 )
                 continue
 
+            if response["hits"]["total"]["value"] > 0:
+                for topic in user_topics[user_id]:
+                    if topic["_id"] not in topic_matches:
+                        topic_matches.append(topic["_id"])
+
         return topic_matches
 
     def apply_topic_args(self, topic, args=None) -> SearchArgs:
@@ -1013,6 +1171,29 @@ class BaseSearchService(Service):
         internal_req = self.get_internal_request(search)
         return self.internal_get(internal_req, search.lookup)
 
+    def get_items_by_queries(self, searches: List[SearchQuery]) -> List[ElasticCursor]:
+        """Run multiple search queries in a single multi-search request
+
+        The number of items returned for each query is taken from its ``size`` arg.
+
+        :param searches: List of search query instances
+        :return: The results for each query, in the same order as ``searches``
+        """
+
+        sources = []
+        for search in searches:
+            search.args["aggs"] = "false"
+            self.gen_source_from_search(search)
+            sources.append(search.source)
+
+        results = []
+        for response in self.internal_msearch(sources):
+            if response.get("error"):
+                raise RuntimeError("Failed to run multi-search query: {}".format(response["error"]))
+            results.append(app.data.elastic._parse_hits(response, self.datasource))
+
+        return results
+
     def query_string(self, query, default_operator="AND") -> QueryStringQuery:
         fields_config_key = "WIRE_SEARCH_FIELDS" if self.section == "wire" else "AGENDA_SEARCH_FIELDS"
         fields = app.config.get(fields_config_key, ["*"])
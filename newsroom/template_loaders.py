@@ -1,9 +1,11 @@
+import threading
+import weakref
 from contextlib import contextmanager
 
 import flask
 import jinja2
 
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from flask_babel import get_locale, get_timezone, _get_current_context, Locale, force_locale
 import pytz
 
@@ -52,6 +54,19 @@ def template_locale(locale: Optional[str] = None, timezone: Optional[str] = None
 
 
 class LocaleTemplateLoader(jinja2.FileSystemLoader):
+    """Template loader using the ``<name>.<locale>.<extension>`` template if it exists for the template locale
+
+    Every ``(template, locale)`` pair is compiled only once and kept in a cache of the loader,
+    so rendering templates for users with different locales doesn't recompile them.
+    The number of compilations is available in :attr:`compilations`, for monitoring.
+    """
+
+    def __init__(self, searchpath, encoding: str = "utf-8", followlinks: bool = False):
+        super().__init__(searchpath, encoding=encoding, followlinks=followlinks)
+        self.compilations = 0
+        self._lock = threading.Lock()
+        self._templates: Dict[Tuple[Any, str, Optional[str]], jinja2.Template] = {}
+
     def get_source(self, environment: jinja2.Environment, template: str):
         source = None
         filename = None
@@ -77,3 +92,26 @@ class LocaleTemplateLoader(jinja2.FileSystemLoader):
             return template_locale == get_template_locale() and file_uptodate()
 
         return source, filename, uptodate
+
+    def load(self, environment: jinja2.Environment, name: str, globals=None) -> jinja2.Template:
+        """Returns the compiled template for the template locale, compiling it only if it's not cached
+
+        The environment cache only keeps one locale of a template, when the locale changes
+        the template is reloaded from here instead of being compiled again.
+        """
+
+        key = (weakref.ref(environment), name, get_template_locale())
+        template = self._templates.get(key)
+        if template is not None and template.is_up_to_date:
+            if globals:
+                template.globals.update(globals)
+            return template
+
+        source, filename, uptodate = self.get_source(environment, name)
+        code = environment.compile(source, name, filename)
+        with self._lock:
+            self.compilations += 1
+
+        template = environment.template_class.from_code(environment, code, environment.make_globals(globals), uptodate)
+        self._templates[key] = template
+        return template
@@ -10,6 +10,7 @@ from newsroom.types import Topic, User
 from newsroom.user_roles import UserRole
 from newsroom.utils import set_original_creator, set_version_creator
 from newsroom.signals import user_deleted
+from newsroom.search.percolator import index_topic, remove_topic
 
 
 class TopicNotificationType(enum.Enum):
@@ -80,6 +81,11 @@ class TopicsService(newsroom.Service):
             if doc.get("folder"):
                 doc["folder"] = ObjectId(doc["folder"])
 
+    def on_created(self, docs):
+        super().on_created(docs)
+        for doc in docs:
+            index_topic(doc)
+
     def on_update(self, updates, original):
         super().on_update(updates, original)
         set_version_creator(updates)
@@ -108,6 +114,10 @@ class TopicsService(newsroom.Service):
         if current_user:
             auto_enable_user_emails(updates, original, current_user)
 
+        topic = original.copy()
+        topic.update(updates)
+        index_topic(topic)
+
     def get_items(self, item_ids):
         return self.get(req=None, lookup={"_id": {"$in": item_ids}})
 
@@ -121,6 +131,10 @@ class TopicsService(newsroom.Service):
                 dashboard["topic_ids"] = [topic_id for topic_id in dashboard["topic_ids"] if topic_id != doc["_id"]]
             superdesk.get_resource_service("users").system_update(user["_id"], updates, user)
 
+    def on_deleted(self, doc):
+        super().on_deleted(doc)
+        remove_topic(doc)
+
     def on_user_deleted(self, sender, user, **kwargs):
         # delete user private topics
         self.delete_action({"is_global": False, "user": user["_id"]})
@@ -136,6 +150,8 @@ class TopicsService(newsroom.Service):
                 topic["user"] = None
 
             self.system_update(topic["_id"], updates, topic)
+            topic.update(updates)
+            index_topic(topic)
 
         # remove user as a topic creator for the rest
         user_topics = self.get(req=None, lookup={"user": user["_id"]})
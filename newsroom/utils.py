@@ -317,11 +317,18 @@ def is_account_enabled(user):
     return True
 
 
-def get_user_dict(use_globals: bool = True) -> Dict[str, User]:
-    """Get all active users indexed by _id."""
+def get_user_dict(use_globals: bool = True, user_ids: Optional[List[ObjectId]] = None) -> Dict[str, User]:
+    """Get all active users indexed by _id.
+
+    :param use_globals: Store the users in the request globals
+    :param user_ids: Only get the users with these IDs (this bypasses the request globals)
+    """
 
     def _get_users() -> Dict[str, User]:
-        all_users = superdesk.get_resource_service("users").find(where={"is_enabled": True})
+        lookup: Dict[str, Any] = {"is_enabled": True}
+        if user_ids is not None:
+            lookup["_id"] = {"$in": user_ids}
+        all_users = superdesk.get_resource_service("users").find(where=lookup)
 
         companies = get_company_dict(use_globals)
 
@@ -334,7 +341,7 @@ def get_user_dict(use_globals: bool = True) -> Dict[str, User]:
             )
         }
 
-    if not use_globals:
+    if not use_globals or user_ids is not None:
         return _get_users()
     elif "user_dict" not in g or app.testing:
         user_dict = _get_users()
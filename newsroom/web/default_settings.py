@@ -177,6 +177,7 @@ CORE_APPS = [
     "newsroom.company_admin",
     "newsroom.search",
     "newsroom.notifications.send_scheduled_notifications",
+    "newsroom.email",
 ]
 
 SITE_NAME = "Newshub"
@@ -304,6 +305,12 @@ COVERAGE_TYPES = {
 LANGUAGES = ["en", "fi", "fr_CA"]
 DEFAULT_LANGUAGE = "en"
 
+#: Maximum number of compiled email subject templates kept in memory
+#:
+#: .. versionadded:: 2.8
+#:
+EMAIL_SUBJECTS_CACHE_SIZE = 500
+
 CLIENT_LOCALE_FORMATS = {
     "en": {  # defaults
         "TIME_FORMAT": "HH:mm",
@@ -464,6 +471,14 @@ CELERY_BEAT_SCHEDULE = {
         "task": "newsroom.commands.async_remove_expired_agenda",
         "schedule": crontab(hour=local_to_utc_hour(3), minute=0),  # Runs every day at 3am
     },
+    "newsroom:remove_expired_email_attachments": {
+        "task": "newsroom.email_attachments.remove_expired_email_attachments",
+        "schedule": crontab(minute=30),  # Runs every hour
+    },
+    "newsroom:rollup_api_audit": {
+        "task": "newsroom.news_api.api_audit.daily.rollup_api_audit",
+        "schedule": crontab(minute=15),  # Runs every hour, rolls up the days completed since the last run
+    },
     "newsroom:send_scheduled_notifications": {
         "task": "newsroom.notifications.send_scheduled_notifications.send_scheduled_notifications",
         "schedule": crontab(minute="*/5"),
@@ -562,6 +577,12 @@ ALLOW_EXPIRED_COMPANY_LOGINS = False
 #:
 DASHBOARD_CACHE_TIMEOUT = 300
 
+#: The timeout used on the cache for the Stories per product report, set to 0 to disable the cache
+#:
+#: .. versionadded:: 2.8
+#:
+PRODUCT_STORIES_REPORT_CACHE_TIMEOUT = 300
+
 #: If True, deletes all Dashboard item caches when new items are pushed
 #:
 #: .. versionadded:: 2.1.0
@@ -792,6 +813,58 @@ EMBARGO_QUERY_ROUNDING = "/m"
 EMAIL_DEFAULT_SENDER_NAME = None
 EMAIL_SENDER_NAME_LANGUAGE_MAP = {}
 
+#: Render the item notification emails once for all the recipients sharing the same language, timezone and content,
+#: only the recipient name is substituted for each email
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_NOTIFICATION_FANOUT = False
+
+#: Buffer the emails sent by the web process, and send each batch of emails using a single Celery task
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_BUFFER = False
+
+#: Number of emails sent per batch, when ``EMAIL_BUFFER`` is enabled
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_BUFFER_BATCH_SIZE = 100
+
+#: Maximum time (in milliseconds) an email waits in the buffer
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_BUFFER_FLUSH_INTERVAL = 500
+
+#: Maximum number of emails waiting in the buffer, before they are sent by the request
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_BUFFER_MAX_SIZE = 10000
+
+#: Number of monitoring profiles rendered and sent concurrently by the monitoring email alerts,
+#: each profile is processed in its own app context
+#:
+#: .. versionadded: 2.8
+#:
+MONITORING_ALERTS_MAX_WORKERS = 1
+
+#: Emails are sent using a persistent SMTP connection per process,
+#: checked with ``NOOP`` before use if it was idle for this number of seconds
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_CONNECTION_MAX_IDLE = 30
+
+#: Email attachments are stored once in media storage and referenced by id in the email tasks,
+#: they are removed after this number of hours
+#:
+#: .. versionadded: 2.8
+#:
+EMAIL_ATTACHMENTS_EXPIRY_HOURS = 24
+
 #: Set the card type for personal dashboard
 #:
 #: .. versionadded: 2.7
@@ -851,3 +924,61 @@ AGENDA_TIME_FILTERS = [
         "query": "now/M",
     },
 ]
+
+#: Use a percolator index of subscribed topic queries when matching new items against topics
+#: Run ``python manage.py index_topics_percolator`` after enabling, and after changing products or navigations
+#:
+#: .. versionadded: 2.8
+#:
+TOPICS_PERCOLATOR_ENABLED = False
+
+#: Resolve company and user products using an in-process index, instead of querying Mongo on every search
+#:
+#: Changes are propagated to other processes using the app cache, so a shared ``CACHE_TYPE``
+#: (i.e. ``redis``) is required for them to be applied immediately.
+#:
+#: .. versionadded: 2.8
+#:
+PRODUCTS_PERMISSION_INDEX_ENABLED = False
+
+#: Max number of seconds the products permission index is used before it's reloaded,
+#: bounds how long other processes use outdated products if the cache is not shared
+#:
+#: .. versionadded: 2.8
+#:
+PRODUCTS_PERMISSION_INDEX_MAX_AGE = 60
+
+#: Buffer history records written by user actions (open, download, copy etc), and write them in bulk
+#: ``None`` - write history records during the request
+#: ``"local"`` - write from a background thread of the web process
+#: ``"celery"`` - send each batch of records to a Celery task
+#:
+#: .. versionadded: 2.8
+#:
+HISTORY_BUFFER: Literal[None, "local", "celery"] = None
+
+#: Number of history records written per batch, when ``HISTORY_BUFFER`` is enabled
+#:
+#: .. versionadded: 2.8
+#:
+HISTORY_BUFFER_BATCH_SIZE = 100
+
+#: Maximum time (in milliseconds) a history record waits in the buffer
+#:
+#: .. versionadded: 2.8
+#:
+HISTORY_BUFFER_FLUSH_INTERVAL = 500
+
+#: Maximum number of history records waiting in the buffer, before requests write them directly
+#:
+#: .. versionadded: 2.8
+#:
+HISTORY_BUFFER_MAX_SIZE = 10000
+
+#: Number of users per Celery subtask when sending scheduled notifications
+#: If set, the users due a notification are processed in parallel by Celery subtasks,
+#: otherwise they're processed serially by the scheduled task
+#:
+#: .. versionadded: 2.8
+#:
+SCHEDULED_NOTIFICATIONS_BATCH_SIZE = 0
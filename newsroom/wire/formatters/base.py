@@ -14,6 +14,8 @@ class BaseFormatter(metaclass=FormatterRegistry):
     FILE_EXTENSION = None
     MEDIATYPE = "text"
     MULTI = False
+    #: Output depends on the company of the request (so it can't be shared between companies)
+    COMPANY_SPECIFIC = False
 
     def format_filename(self, item):
         assert self.FILE_EXTENSION
@@ -12,6 +12,8 @@ class NINJSFormatter2(NINJSFormatter):
     Overload the NINJSFormatter and add the associations as a field to copy
     """
 
+    COMPANY_SPECIFIC = True
+
     def __init__(self):
         self.direct_copy_properties += ("associations",)
 
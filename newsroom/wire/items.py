@@ -26,6 +26,7 @@ class ItemsResource(BaseItemsResource):
     schema["priority"] = {**metadata_schema["priority"], "mapping": {"type": "keyword"}}
 
     schema["expiry"] = {"type": "datetime"}
+    schema["news_api_body_html"] = {"type": "string", "mapping": {"type": "text", "index": False}}
 
     mongo_indexes = deepcopy(BaseItemsResource.mongo_indexes) or {}
     mongo_indexes.update(
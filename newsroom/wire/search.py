@@ -13,7 +13,7 @@ from newsroom.settings import get_setting
 from newsroom.user_roles import UserRole
 from newsroom.utils import get_local_date, get_end_date
 from newsroom.search.service import BaseSearchService, SearchQuery
-from typing import TypedDict, List, Optional
+from typing import Any, Dict, TypedDict, List, Optional
 import pytz
 
 logger = logging.getLogger(__name__)
@@ -283,6 +283,7 @@ class WireSearchService(BaseSearchService):
                     "should": [],
                 },
             },
+            item_id=item_id,
         )
 
     def has_permissions(self, item, ignore_latest=False):
@@ -349,11 +350,34 @@ class WireSearchService(BaseSearchService):
             search.query["bool"]["must"].append({"range": {"versioncreated": date_range_query}})
 
     def get_product_item_report(self, product, section_filters=None):
-        query = items_query()
-
         if not product:
             return
 
+        internal_req = ParsedRequest()
+        internal_req.args = {"source": json.dumps(self.get_product_item_report_source(product, section_filters))}
+        return self.internal_get(internal_req, None)
+
+    def get_products_item_report(self, products, section_filters=None) -> List[Dict[str, Any]]:
+        """Returns the item report aggregations of many products, using a single multi-search request
+
+        :param products: List of products
+        :param section_filters: Section filters by section, loaded if not provided
+        :return: The aggregations for each product, in the same order as ``products``
+        """
+
+        if section_filters is None:
+            section_filters = get_resource_service("section_filters").get_section_filters_dict()
+
+        sources = [self.get_product_item_report_source(product, section_filters) for product in products]
+        aggregations = []
+        for response in self.internal_msearch(sources):
+            if response.get("error"):
+                raise RuntimeError("Failed to run product item report query: {}".format(response["error"]))
+            aggregations.append(response["aggregations"])
+        return aggregations
+
+    def get_product_item_report_source(self, product, section_filters=None) -> Dict[str, Any]:
+        query = items_query()
         query["bool"]["should"] = []
         get_resource_service("section_filters").apply_section_filter(
             query, product.get("product_type"), section_filters
@@ -422,9 +446,7 @@ class WireSearchService(BaseSearchService):
             },
         }
 
-        internal_req = ParsedRequest()
-        internal_req.args = {"source": json.dumps(source)}
-        return self.internal_get(internal_req, None)
+        return source
 
     def get_matching_bookmarks(self, item_ids, active_users, active_companies):
         """Returns a list of user ids bookmarked any of the given items
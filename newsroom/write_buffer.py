@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+from typing import Any, Callable, List, Optional
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Write-behind buffer, flushing queued records in bulk from a background thread
+
+    Records are flushed every ``batch_size`` records, and at least every ``flush_interval`` milliseconds.
+    If ``max_size`` records are waiting (i.e. the flush can't keep up),
+    the caller flushes a batch itself, so the buffer applies back-pressure instead of growing unbounded.
+    Remaining records are flushed when the process exits.
+
+    :param app: Flask app, used to provide the app context when flushing
+    :param name: Name of the buffer, used for logging and the thread name
+    :param flush: Function that writes a list of records
+    :param batch_size: Number of records to write per flush
+    :param flush_interval: Maximum time in milliseconds a record waits in the buffer
+    :param max_size: Maximum number of records waiting in the buffer
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        name: str,
+        flush: Callable[[List[Any]], None],
+        batch_size: int = 100,
+        flush_interval: int = 500,
+        max_size: int = 10000,
+    ):
+        self.app = app
+        self.name = name
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval / 1000
+        self.max_size = max(max_size, batch_size)
+
+        self.records: List[Any] = []
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+        self.closed = False
+        atexit.register(self.close)
+
+    def add(self, record: Any) -> None:
+        """Add a record to the buffer"""
+
+        batch = None
+        with self.condition:
+            if self.closed:
+                batch = [record]
+            else:
+                self.records.append(record)
+                if len(self.records) >= self.max_size:
+                    logger.warning("Write buffer %s is full, flushing in the calling thread", self.name)
+                    batch = self._take_batch()
+                elif len(self.records) >= self.batch_size:
+                    self.condition.notify()
+                self._start()
+
+        if batch:
+            self._flush(batch)
+
+    def drain(self) -> None:
+        """Flush all the records currently in the buffer"""
+
+        while True:
+            with self.condition:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._flush(batch)
+
+    def close(self) -> None:
+        """Stop the background thread, and flush all remaining records"""
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.flush_interval * 10)
+        self.drain()
+
+    def _start(self) -> None:
+        # Started on first use, so each forked worker process gets its own thread
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name=f"write-buffer-{self.name}", daemon=True)
+            self.thread.start()
+
+    def _take_batch(self) -> List[Any]:
+        batch = self.records[: self.batch_size]
+        self.records = self.records[self.batch_size :]
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                if not self.closed and len(self.records) < self.batch_size:
+                    self.condition.wait(timeout=self.flush_interval)
+                if self.closed:
+                    return
+                batch = self._take_batch()
+
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[Any]) -> None:
+        try:
+            with self.app.app_context():
+                self.flush(batch)
+        except Exception:
+            logger.exception("Failed to flush write buffer %s", self.name, extra=dict(records=len(batch)))
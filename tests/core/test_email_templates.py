@@ -158,3 +158,41 @@ def test_get_from_mongo_returns_working_cursor(app):
     items = service.get_from_mongo(None, {})
     assert 1 == items.count()
     assert 1 == len(list(items))
+
+
+def test_subject_templates_are_compiled_once(app, mocker):
+    service = get_resource_service(RESOURCE)
+    service.post(
+        [
+            {
+                "_id": "validate_account_email",
+                "subject": {
+                    "default": "{{ app_name }} account created",
+                    "translations": {"fi": "{{ app_name }} Finnish account created"},
+                },
+            }
+        ]
+    )
+    from_string = mocker.spy(app.jinja_env, "from_string")
+
+    for app_name in ("Foo", "Bar"):
+        assert service.get_translated_subject("validate_account_email", app_name=app_name) == (
+            f"{app_name} account created"
+        )
+        assert service.get_translated_subject("validate_account_email", "fi", app_name=app_name) == (
+            f"{app_name} Finnish account created"
+        )
+    assert 2 == from_string.call_count
+
+    original = service.find_one(req=None, _id="validate_account_email")
+    service.patch(
+        "validate_account_email",
+        {
+            "subject": {
+                "default": "{{ app_name }} account is ready",
+                "translations": original["subject"]["translations"],
+            }
+        },
+    )
+    assert service.get_translated_subject("validate_account_email", app_name="Foo") == "Foo account is ready"
+    assert 3 == from_string.call_count
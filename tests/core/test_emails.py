@@ -3,7 +3,10 @@ import pathlib
 from flask import render_template_string, json, url_for
 from jinja2 import TemplateNotFound
 
+import newsroom.email as newsroom_email
 from newsroom.email import (
+    EmailFanout,
+    RECIPIENT_NAME_PLACEHOLDER,
     send_item_killed_notification_email,
     send_new_item_notification_email,
     map_email_recipients_by_language,
@@ -15,6 +18,7 @@ from unittest import mock
 from datetime import datetime
 
 from newsroom.types import User
+from newsroom.email_attachments import store_email_attachment, remove_expired_email_attachments
 from newsroom.email import send_user_email
 from tests.fixtures import agenda_items
 
@@ -297,3 +301,110 @@ def test_send_user_email_on_locale_changed():
         send_user_email(user, "test_template", template_kwargs=template_kwargs)
         assert "Event status : Planned" in send_email_mock.call_args[1]["text_body"]
         assert "Coverage status: Planned" in send_email_mock.call_args[1]["text_body"]
+
+
+def test_email_fanout(app, mocker):
+    users = [
+        User(email="foo@example.com", first_name="Foo", receive_email=True, user_type="user"),
+        User(email="bar@example.com", first_name="<Bar>", receive_email=True, user_type="user"),
+        User(email="baz@example.com", receive_email=True, user_type="user"),
+        User(email="fr@example.com", first_name="Fr", locale="fr_CA", receive_email=True, user_type="user"),
+    ]
+    item = {
+        "_id": "foo",
+        "guid": "foo",
+        "versioncreated": datetime(2018, 7, 2, 9, 15, 48),
+        "headline": "Fanout headline",
+        "body_html": "<p>HTML Body</p>",
+        "type": "text",
+    }
+    render = mocker.spy(newsroom_email, "_render_localized_email")
+
+    fanout = EmailFanout()
+    with app.test_request_context():
+        for user in users:
+            send_new_item_notification_email(user, "Topic", item, fanout=fanout)
+            send_user_email(
+                user,
+                "validate_account_email",
+                template_kwargs=dict(app_name="Newshub", name=user.get("first_name"), expires=24, url="foo"),
+                fanout=fanout,
+            )
+
+        # en with name, en without name and fr_CA, for both templates
+        assert 6 == render.call_count
+
+        with app.mail.record_messages() as outbox:
+            fanout.send()
+
+    assert 8 == len(outbox)
+    assert 4 == len([message for message in outbox if "Fanout headline" in message.body])
+    messages = {message.recipients[0]: message for message in outbox if "Newshub account" in message.body}
+    assert "Foo," in messages["foo@example.com"].body
+    assert "Hi Foo," in messages["foo@example.com"].html
+    assert "<Bar>," in messages["bar@example.com"].body
+    assert "Hi &lt;Bar&gt;," in messages["bar@example.com"].html
+    assert "Hi " not in messages["baz@example.com"].html
+    assert "Hi Fr," in messages["fr@example.com"].html
+    assert RECIPIENT_NAME_PLACEHOLDER not in "".join(message.html for message in outbox)
+
+
+def test_email_attachments_stored_once(app, mocker):
+    attachment = store_email_attachment(b"%PDF report", "report.pdf", "application/pdf", "Monitoring Report")
+    assert "file" not in attachment
+    read = mocker.spy(newsroom_email, "get_email_attachment_content")
+
+    emails = [
+        dict(to=[email], subject="Report", text_body="Report", attachments_info=[attachment])
+        for email in ("foo@example.com", "bar@example.com")
+    ]
+    with app.mail.record_messages() as outbox:
+        newsroom_email._send_emails(emails)
+
+    assert 2 == len(outbox)
+    assert 1 == read.call_count
+    for message in outbox:
+        assert "report.pdf" == message.attachments[0].filename
+        assert b"%PDF report" == message.attachments[0].data
+
+    app.config["EMAIL_ATTACHMENTS_EXPIRY_HOURS"] = -1
+    remove_expired_email_attachments()
+    assert app.media.get(attachment["media"], "email_attachments") is None
+    assert 0 == app.data.get_mongo_collection("email_attachments").count_documents({})
+
+
+def test_email_fanout_send_path(app, mocker):
+    user = User(email="foo@example.com", first_name="Foo", receive_email=True, user_type="user")
+    item = {"_id": "foo", "guid": "foo", "version": "1", "headline": "Fanout headline", "type": "text"}
+    render = mocker.spy(newsroom_email, "_render_localized_email")
+    email_buffer = mock.Mock()
+    app.extensions["email_buffer"] = email_buffer
+
+    fanout = EmailFanout()
+    with app.test_request_context():
+        send_new_item_notification_email(user, "Topic", item, fanout=fanout)
+        send_new_item_notification_email(dict(user, email="bar@example.com"), "Topic", item, fanout=fanout)
+        send_new_item_notification_email(user, "Topic", dict(item, version="2"), fanout=fanout)
+        assert 2 == render.call_count
+
+        fanout.send()
+
+    # sent using the email buffer, same as ``send_email``
+    assert 3 == email_buffer.add.call_count
+    assert ["bar@example.com"] == email_buffer.add.call_args_list[1][0][0]["to"]
+
+
+def test_email_fanout_key_per_topic_and_highlights(app, mocker):
+    user = User(email="foo@example.com", first_name="Foo", receive_email=True, user_type="user")
+    item = {"_id": "foo", "guid": "foo", "version": "1", "headline": "Fanout headline", "type": "text"}
+    render = mocker.spy(newsroom_email, "_render_localized_email")
+
+    fanout = EmailFanout()
+    with app.test_request_context():
+        send_new_item_notification_email(user, "Topic", item, fanout=fanout, topic_id="a")
+        send_new_item_notification_email(user, "Topic", item, fanout=fanout, topic_id="b")
+        assert 2 == render.call_count
+
+        highlighted = dict(item, es_highlight={"headline": ['<span class="es-highlight">Fanout</span> headline']})
+        send_new_item_notification_email(user, "Topic", highlighted, fanout=fanout, topic_id="a")
+        assert 3 == render.call_count
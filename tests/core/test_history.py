@@ -0,0 +1,82 @@
+from superdesk import get_resource_service
+
+from newsroom.history import flush_history_records, get_history_users
+from newsroom.tests.fixtures import PUBLIC_USER_ID, TEST_USER_ID, COMPANY_1_ID
+from newsroom.tests.users import ADMIN_USER_ID
+from newsroom.write_buffer import WriteBuffer
+
+
+def test_create_history_records_in_bulk(app):
+    user = {"_id": PUBLIC_USER_ID, "company": COMPANY_1_ID}
+    items = [{"_id": f"item-{i}", "version": 1} for i in range(10)]
+
+    ids = get_resource_service("history").create(items, "download", user, "wire")
+    assert 10 == len(ids)
+
+    assert 10 == app.data.get_mongo_collection("history").count_documents({"action": "download"})
+    history, count = app.data.find("history", None, None)
+    assert 10 == count
+    assert {f"item-{i}" for i in range(10)} == {record["item"] for record in history}
+    assert all(str(record["company"]) == str(COMPANY_1_ID) for record in history)
+
+
+def test_write_buffer_flushes_in_batches(app):
+    batches = []
+    buffer = WriteBuffer(app, "test", batches.append, batch_size=2, flush_interval=10000)
+
+    for i in range(5):
+        buffer.add(i)
+
+    buffer.close()
+    assert [0, 1, 2, 3, 4] == [record for batch in batches for record in batch]
+    assert all(len(batch) <= 2 for batch in batches)
+
+
+def test_write_buffer_applies_back_pressure(app):
+    batches = []
+    buffer = WriteBuffer(app, "test", batches.append, batch_size=2, flush_interval=10000, max_size=2)
+
+    # the buffer is full, so the records are written in the calling thread
+    buffer.add(1)
+    buffer.add(2)
+    assert [[1, 2]] == batches
+    buffer.close()
+
+
+def test_buffered_history_records(app):
+    app.extensions["history_buffer"] = WriteBuffer(app, "history", flush_history_records, flush_interval=10000)
+    user = {"_id": PUBLIC_USER_ID, "company": COMPANY_1_ID}
+
+    try:
+        get_resource_service("history").create_history_record(
+            [{"_id": "item-1", "version": 1}, {"_id": "item-2", "version": 1}], "open", user, "wire"
+        )
+        assert 0 == app.data.get_mongo_collection("history").count_documents({})
+
+        app.extensions["history_buffer"].drain()
+        assert 2 == app.data.get_mongo_collection("history").count_documents({"action": "open"})
+    finally:
+        app.extensions.pop("history_buffer").close()
+
+
+def test_get_history_users(app):
+    service = get_resource_service("history")
+    public_user = {"_id": PUBLIC_USER_ID, "company": COMPANY_1_ID}
+
+    # more records than can be paged through using ``from``
+    service.create([{"_id": "item-1", "version": i} for i in range(1100)], "download", public_user, "wire")
+    service.create(
+        [{"_id": "item-2", "version": 1}], "download", {"_id": TEST_USER_ID, "company": COMPANY_1_ID}, "wire"
+    )
+    service.create([{"_id": "item-2", "version": 1}], "download", {"_id": ADMIN_USER_ID}, "wire")
+    service.create([{"_id": "item-3", "version": 1}], "download", public_user, "wire")
+
+    users = get_history_users(["item-1", "item-2"], [PUBLIC_USER_ID, TEST_USER_ID], [COMPANY_1_ID], "wire", "download")
+    assert sorted([str(PUBLIC_USER_ID), str(TEST_USER_ID)]) == sorted(users)
+
+    assert [] == get_history_users(["item-3"], [TEST_USER_ID], [COMPANY_1_ID], "wire", "download")
+    assert [] == get_history_users(["item-1"], [PUBLIC_USER_ID], [COMPANY_1_ID], "agenda", "download")
+
+    # user buckets are paged using the composite aggregation ``after_key``
+    query = {"bool": {"filter": [{"term": {"action": "download"}}]}}
+    assert 3 == len(service.fetch_history_users(query, page_size=1))
@@ -0,0 +1,43 @@
+import smtplib
+from unittest import mock
+
+from flask_mail import Message
+
+from newsroom.mail_connection import get_mail_connection, send_messages
+
+
+def get_messages(count):
+    return [
+        Message(subject="Test", sender="newsroom@localhost", recipients=[f"foo{i}@example.com"], body="Test")
+        for i in range(count)
+    ]
+
+
+def test_pooled_mail_connection(app):
+    app.extensions["mail"].suppress = False
+
+    with mock.patch("flask_mail.smtplib.SMTP") as smtp:
+        host = smtp.return_value
+        assert 3 == send_messages(get_messages(3))
+        assert 1 == smtp.call_count
+        assert 3 == host.sendmail.call_count
+
+        # the connection was lost, the message is sent using a new connection
+        host.sendmail.side_effect = [smtplib.SMTPServerDisconnected(), None]
+        assert 1 == send_messages(get_messages(1))
+        assert 2 == smtp.call_count
+        assert 5 == host.sendmail.call_count
+
+        # a failed message doesn't stop the others
+        host.sendmail.side_effect = [smtplib.SMTPRecipientsRefused({}), None]
+        assert 1 == send_messages(get_messages(2))
+        assert 2 == smtp.call_count
+
+        stats = get_mail_connection().stats
+        assert 5 == stats["sent"]
+        assert 1 == stats["failed"]
+        assert 2 == stats["connections"]
+        assert 1 == stats["reconnects"]
+
+        get_mail_connection().close()
+        assert host.quit.called
@@ -278,6 +278,103 @@ def test_send_immediate_alerts(client, app):
         assert "monitoring-export.pdf" in outbox[0].attachments[0]
 
 
+@mock.patch("newsroom.monitoring.email_alerts.utcnow", mock_utcnow)
+@mock.patch("newsroom.email.send_email", mock_send_email)
+def test_send_immediate_alerts_with_single_search(client, app, mocker):
+    app.data.insert(
+        "monitoring",
+        [
+            {
+                "_id": ObjectId("5db11ec55f627d8aa0b545fc"),
+                "is_enabled": True,
+                "users": [ObjectId("5c53afa45f627d8333220f15")],
+                "company": ObjectId(company_id),
+                "subject": "Monitoring Subject 2",
+                "name": "W2",
+                "alert_type": "full_text",
+                "query": "headline: (immediate)",
+                "format_type": "monitoring_pdf",
+                "schedule": {"interval": "immediate"},
+            }
+        ],
+    )
+    app.data.insert(
+        "items",
+        [
+            {
+                "_id": "foo",
+                "headline": "product immediate",
+                "products": [{"code": "12345"}],
+                "versioncreated": utcnow(),
+            }
+        ],
+    )
+    msearch = mocker.spy(get_resource_service("monitoring_search"), "internal_msearch")
+
+    with app.mail.record_messages() as outbox, app.test_request_context():
+        MonitoringEmailAlerts().run(immediate=True)
+        assert_recipients(
+            outbox,
+            [
+                "foo_user2@bar.com",
+                "foo_user@bar.com",
+                "foo_user@bar.com",
+            ],
+        )
+
+    assert msearch.call_count == 1
+    assert len(msearch.call_args.args[0]) == 2
+
+
+@mock.patch("newsroom.monitoring.email_alerts.utcnow", mock_utcnow)
+@mock.patch("newsroom.email.send_email", mock_send_email)
+def test_send_immediate_alerts_concurrently(client, app):
+    app.config["MONITORING_ALERTS_MAX_WORKERS"] = 4
+    app.data.insert(
+        "monitoring",
+        [
+            {
+                "_id": ObjectId("5db11ec55f627d8aa0b545fc"),
+                "is_enabled": True,
+                "users": [ObjectId("5c53afa45f627d8333220f15")],
+                "company": ObjectId(company_id),
+                "subject": "Monitoring Subject 2",
+                "name": "W2",
+                "alert_type": "full_text",
+                "query": "headline: (immediate)",
+                "format_type": "monitoring_pdf",
+                "schedule": {"interval": "immediate"},
+            }
+        ],
+    )
+    app.data.insert(
+        "items",
+        [
+            {
+                "_id": "foo",
+                "headline": "product immediate",
+                "products": [{"code": "12345"}],
+                "versioncreated": utcnow(),
+            }
+        ],
+    )
+
+    with app.mail.record_messages() as outbox, app.test_request_context():
+        MonitoringEmailAlerts().run(immediate=True)
+        assert_recipients(
+            outbox,
+            [
+                "foo_user2@bar.com",
+                "foo_user@bar.com",
+                "foo_user@bar.com",
+            ],
+        )
+        assert {message.subject for message in outbox} == {"Monitoring Subject", "Monitoring Subject 2"}
+
+    for profile in app.data.find_all("monitoring"):
+        assert profile.get("last_run_time") is not None
+
+
 def assert_recipients(outbox, recipients: List[str]):
     assert len(outbox) == len(recipients)
     outbox_recipients = []
@@ -1,9 +1,13 @@
+from unittest import mock
+
+import pytest
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from superdesk import get_resource_service
 from superdesk.utc import utcnow
 
-from tests.fixtures import PUBLIC_USER_ID
+from tests.fixtures import PUBLIC_USER_ID, TEST_USER_ID
 
 
 def test_adding_and_clearing_notification_queue():
@@ -45,3 +49,65 @@ def test_adding_and_clearing_notification_queue():
 
     service.reset_queue(PUBLIC_USER_ID)
     assert service.find_one(req=None, user=PUBLIC_USER_ID) is None
+
+
+def test_adding_item_to_many_notification_queues():
+    service = get_resource_service("notification_queue")
+
+    now = utcnow()
+    topic1_id = ObjectId("54d9a786f87bc2ff88d04028")
+    topic2_id = ObjectId("54d9a786f87bc2ff88d04029")
+    item1 = {"_id": "item1", "versioncreated": now}
+    item2 = {"_id": "item2", "versioncreated": now}
+
+    service.add_item_to_queues(
+        item1,
+        [
+            (PUBLIC_USER_ID, "wire", topic1_id),
+            (PUBLIC_USER_ID, "agenda", topic2_id),
+            (TEST_USER_ID, "wire", topic1_id),
+        ],
+    )
+    service.add_item_to_queues(item2, [(PUBLIC_USER_ID, "wire", topic1_id)])
+
+    queue = service.find_one(req=None, user=PUBLIC_USER_ID)
+    assert len(queue["topics"]) == 2
+    assert queue["topics"][0]["topic_id"] == topic1_id
+    assert queue["topics"][0]["items"] == ["item1", "item2"]
+    assert queue["topics"][1]["topic_id"] == topic2_id
+    assert queue["topics"][1]["section"] == "agenda"
+    assert queue["topics"][1]["items"] == ["item1"]
+
+    queue = service.find_one(req=None, user=TEST_USER_ID)
+    assert len(queue["topics"]) == 1
+    assert queue["topics"][0]["items"] == ["item1"]
+    assert len(list(service.get(req=None, lookup={}))) == 2
+
+
+def test_adding_item_to_queue_created_concurrently(app):
+    service = get_resource_service("notification_queue")
+    collection = app.data.get_mongo_collection("notification_queue")
+    topic_id = ObjectId("54d9a786f87bc2ff88d04028")
+    item = {"_id": "item1", "versioncreated": utcnow()}
+
+    with pytest.raises(DuplicateKeyError):
+        collection.insert_many([{"user": PUBLIC_USER_ID, "topics": []}, {"user": PUBLIC_USER_ID, "topics": []}])
+
+    bulk_write = collection.bulk_write
+    calls = []
+
+    def concurrent_bulk_write(requests, ordered=True):
+        calls.append(requests)
+        if len(calls) == 1:
+            # the queue was created by another process after it wasn't found by the upsert
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]})
+        return bulk_write(requests, ordered=ordered)
+
+    with mock.patch.object(app.data, "get_mongo_collection", return_value=mock.Mock(bulk_write=concurrent_bulk_write)):
+        service.add_item_to_queues(item, [(PUBLIC_USER_ID, "wire", topic_id)])
+
+    assert 2 == len(calls)
+    assert calls[0] == calls[1]
+    queues = list(collection.find({"user": PUBLIC_USER_ID}))
+    assert 1 == len(queues)
+    assert ["item1"] == queues[0]["topics"][0]["items"]
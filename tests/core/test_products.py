@@ -3,7 +3,13 @@ import importlib
 from bson import ObjectId
 from flask import json
 from pytest import fixture
+from superdesk import get_resource_service
 
+from newsroom.products.products import (
+    ProductsPermissionIndex,
+    get_products_by_company,
+    invalidate_products_permission_index,
+)
 from newsroom.tests.users import test_login_succeeds_for_admin
 from datetime import datetime
 
@@ -264,3 +270,42 @@ def assign_product_to_user(client, product, user):
     products = user.get("products") or []
     products.append({"_id": product["_id"], "section": product.get("product_type", "wire")})
     utils.patch_json(client, f"/api/_users/{user['_id']}", {"products": products, "sections": {"wire": True}})
+
+
+def test_products_permission_index(app, product):
+    index = ProductsPermissionIndex()
+    navigation_id = ObjectId()
+
+    assert [product["_id"]] == [p["_id"] for p in index.get_products([product["_id"]])]
+    assert [] == index.get_products([product["_id"]], [str(navigation_id)])
+
+    # products added directly to the data layer are only available after invalidating the index
+    news_product = {"_id": ObjectId(), "name": "News", "is_enabled": True, "product_type": "wire"}
+    app.data.insert("products", [news_product])
+    assert [] == index.get_products([news_product["_id"]])
+    invalidate_products_permission_index()
+    assert [news_product["_id"]] == [p["_id"] for p in index.get_products([news_product["_id"]])]
+
+    # updating a product using the service invalidates the index
+    get_resource_service("products").patch(product["_id"], {"navigations": [navigation_id]})
+    assert [product["_id"]] == [p["_id"] for p in index.get_products([product["_id"]], [str(navigation_id)])]
+
+    # returned products are copies
+    index.get_products([product["_id"]])[0]["name"] = "Changed"
+    assert "Changed" != index.get_products([product["_id"]])[0]["name"]
+
+    # reloaded after max age, even if the version key wasn't updated (i.e. cache not shared by processes)
+    app.data.update("products", product["_id"], {"name": "Renamed"}, product)
+    app.config["PRODUCTS_PERMISSION_INDEX_MAX_AGE"] = 0
+    assert "Renamed" == index.get_products([product["_id"]])[0]["name"]
+
+
+def test_get_products_by_company_using_permission_index(app, product):
+    app.config["PRODUCTS_PERMISSION_INDEX_ENABLED"] = True
+    company = {"_id": ObjectId(), "products": [{"_id": product["_id"], "section": "wire", "seats": 0}]}
+
+    assert [product["_id"]] == [p["_id"] for p in get_products_by_company(company)]
+    assert [] == get_products_by_company(company, product_type="agenda")
+
+    get_resource_service("products").delete_action({"_id": product["_id"]})
+    assert [] == get_products_by_company(company)
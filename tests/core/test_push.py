@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from superdesk import get_resource_service
 from newsroom.tests.fixtures import TEST_USER_ID  # noqa - Fix cyclic import when running single test file
 from newsroom.utils import get_company_dict, get_entity_or_404, get_user_dict
+from newsroom.topics.topics import get_topics_with_subscribers
 from tests.core.utils import add_company_products
 from ..fixtures import COMPANY_1_ID, PUBLIC_USER_ID
 from ..utils import mock_send_email
@@ -746,6 +747,51 @@ def test_send_notification_emails(client, app):
     assert "http://localhost:5050/wire?item=foo" in outbox[0].body
 
 
+def test_notification_emails_fanout_same_topic_label(client, app):
+    app.config["EMAIL_NOTIFICATION_FANOUT"] = True
+    user_ids = app.data.insert(
+        "users",
+        [
+            {
+                "email": email,
+                "first_name": "Foo",
+                "is_enabled": True,
+                "receive_email": True,
+                "user_type": "administrator",
+            }
+            for email in ("foo@bar.com", "bar@bar.com")
+        ],
+    )
+
+    # same label, different queries so the item is highlighted differently for each user
+    app.data.insert(
+        "topics",
+        [
+            {
+                "label": "Topic",
+                "query": query,
+                "user": user_id,
+                "subscribers": [{"user_id": user_id, "notification_type": "real-time"}],
+                "is_global": False,
+                "topic_type": "wire",
+            }
+            for user_id, query in zip(user_ids, ("test", "headline"))
+        ],
+    )
+
+    with app.mail.record_messages() as outbox:
+        data = json.dumps({"guid": "foo", "type": "text", "headline": "this is a test headline"})
+        resp = client.post("/push", data=data, content_type="application/json")
+        assert 200 == resp.status_code
+
+    assert 2 == len(outbox)
+    messages = {message.recipients[0]: message for message in outbox}
+    assert '<span class="es-highlight">test</span>' in messages["foo@bar.com"].html
+    assert '<span class="es-highlight">headline</span>' not in messages["foo@bar.com"].html
+    assert '<span class="es-highlight">headline</span>' in messages["bar@bar.com"].html
+    assert '<span class="es-highlight">test</span>' not in messages["bar@bar.com"].html
+
+
 def test_matching_topics(client, app):
     app.config["WIRE_AGGS"]["genre"] = {"terms": {"field": "genre.name", "size": 50}}
     client.post("/push", data=json.dumps(item), content_type="application/json")
@@ -888,6 +934,26 @@ def test_push_custom_expiry(client, app):
     assert now + timedelta(days=49) < expiry < now + timedelta(days=51)
 
 
+def test_push_prerenders_news_api_image_embeds(client, app):
+    updated = item.copy()
+    updated["body_html"] = (
+        "<p>foo</p>"
+        '<!-- EMBED START Image {id: "editor_1"} -->'
+        '<figure><img src="/assets/embed" alt="alt"><figcaption>bar</figcaption></figure>'
+        '<!-- EMBED END Image {id: "editor_1"} -->'
+    )
+    updated["associations"] = {
+        "editor_1": {"renditions": {"16-9": {"href": "http://example.com/embed", "media": "embed"}}},
+    }
+    client.post("/push", data=json.dumps(updated), content_type="application/json")
+    parsed = get_entity_or_404(item["guid"], "items")
+    assert 'src="news-api-asset:embed"' in parsed["news_api_body_html"]
+    assert 'src="/assets/embed"' in parsed["body_html"]
+
+    client.post("/push", data=json.dumps(dict(item, guid="bar")), content_type="application/json")
+    assert "news_api_body_html" not in get_entity_or_404("bar", "items")
+
+
 def test_matching_topics_with_mallformed_query(client, app):
     add_company_products(
         app,
@@ -979,3 +1045,97 @@ def test_global_topic_after_deleting_user(client, app):
     with app.test_request_context():
         matching = search.get_matching_topics(item["guid"], topics, users, companies)
         assert matching
+
+
+def test_matching_topics_using_percolator(client, app):
+    app.config["TOPICS_PERCOLATOR_ENABLED"] = True
+    app.config["WIRE_AGGS"]["genre"] = {"terms": {"field": "genre.name", "size": 50}}
+    add_company_products(
+        app,
+        COMPANY_1_ID,
+        [
+            {
+                "name": "Sport",
+                "description": "Top level sport product",
+                "sd_product_id": "p-1",
+                "is_enabled": True,
+                "product_type": "wire",
+            }
+        ],
+    )
+
+    item["products"] = [{"code": "p-1"}]
+    client.post("/push", json=item)
+    search = get_resource_service("wire_search")
+
+    subscribers = [{"user_id": PUBLIC_USER_ID, "notification_type": "real-time"}]
+    topic_ids = get_resource_service("topics").post(
+        [
+            {
+                "label": label,
+                "topic_type": "wire",
+                "user": PUBLIC_USER_ID,
+                "company": COMPANY_1_ID,
+                "subscribers": subscribers,
+                **topic,
+            }
+            for label, topic in [
+                ("created_to_old", {"created": {"to": "2017-01-01"}}),
+                ("filter", {"filter": {"genre": ["other"]}}),
+                ("query", {"query": "Foo"}),
+                ("other_query", {"query": "Bar"}),
+            ]
+        ]
+    )
+
+    users = get_user_dict(use_globals=False)
+    companies = get_company_dict(use_globals=False)
+    topics = get_topics_with_subscribers("wire")
+    assert len(topics) == 4
+
+    with app.test_request_context():
+        matching = search.get_matching_topics(item["guid"], topics, users, companies)
+        assert [topic_ids[2]] == matching
+
+        # topics are percolated in batches
+        with mock.patch("newsroom.search.percolator.PERCOLATE_BATCH_SIZE", 1):
+            assert [topic_ids[2]] == search.get_matching_topics(item["guid"], topics, users, companies)
+
+        # after removing the subscriber the topic is no longer matched
+        get_resource_service("topics").patch(topic_ids[2], {"subscribers": []})
+        matching = search.get_matching_topics(item["guid"], topics, users, companies)
+        assert [] == matching
+
+
+def test_matching_topics_grouped_by_user_permissions(client, app):
+    add_company_products(
+        app,
+        COMPANY_1_ID,
+        [
+            {
+                "name": "Sport",
+                "description": "Top level sport product",
+                "sd_product_id": "p-1",
+                "is_enabled": True,
+                "product_type": "wire",
+            }
+        ],
+    )
+
+    item["products"] = [{"code": "p-1"}]
+    client.post("/push", json=item)
+    search = get_resource_service("wire_search")
+
+    users = get_user_dict(use_globals=False)
+    companies = get_company_dict(use_globals=False)
+    topics = [
+        {"_id": "public_query", "query": "Foo", "user": PUBLIC_USER_ID},
+        {"_id": "public_other", "query": "Bar", "user": PUBLIC_USER_ID},
+        {"_id": "test_query", "query": "Foo", "user": TEST_USER_ID},
+    ]
+
+    # both users share the same permissions, so they are checked with a single search
+    with app.test_request_context(), mock.patch.object(search, "internal_get", wraps=search.internal_get) as get:
+        matching = search.get_matching_topics(item["guid"], topics, users, companies)
+        assert ["public_query", "test_query"] == matching
+        assert get.call_count == 1
@@ -1,7 +1,12 @@
+import csv
+from io import StringIO
+
 from flask import json
 from pytest import fixture
 from bson import ObjectId
 from datetime import datetime, timedelta
+from superdesk import get_resource_service
+from superdesk.utc import utc
 from newsroom.tests.fixtures import COMPANY_1_ID
 
 
@@ -190,3 +195,115 @@ def test_content_activity_csv(client):
     values = lines[1].split(",")
     assert "Amazon Is Opening More Bookstores" == values[1]
     assert "0" == values[-1]
+
+
+def test_content_activity_csv_invalid_args(client):
+    today = datetime.now().date().isoformat()
+    resp = client.get("reports/export/content-activity?export=true&date_from=foo&date_to=foo")
+    assert 400 == resp.status_code
+    assert "text/csv" != resp.mimetype
+
+    resp = client.get(
+        "reports/export/content-activity?export=true&section=foo&date_from={}&date_to={}".format(today, today)
+    )
+    assert 400 == resp.status_code
+
+
+def test_content_activity_in_chunks(client, app, monkeypatch):
+    today = datetime.now().date()
+    url = "reports/content-activity?date_from={}&date_to={}".format(today.isoformat(), today.isoformat())
+    expected = json.loads(client.get(url).get_data())["results"]
+    assert len(expected) > 1
+
+    app.data.insert(
+        "history",
+        [
+            {"item": expected[0]["_id"], "action": "download", "section": "wire", "company": COMPANY_1_ID},
+            {"item": expected[-1]["_id"], "action": "open", "section": "wire", "company": COMPANY_1_ID},
+        ],
+    )
+
+    # page through the items one at a time using ``search_after``
+    monkeypatch.setattr("newsroom.reports.content_activity.CHUNK_SIZE", 1)
+    results = json.loads(client.get(url).get_data())["results"]
+    assert [item["_id"] for item in expected] == [item["_id"] for item in results]
+    assert {"download": 1} == results[0]["aggs"]["actions"]
+    assert {"open": 1} == results[-1]["aggs"]["actions"]
+
+    resp = client.get("reports/export/content-activity?export=true&date_from={}&date_to={}".format(today, today))
+    assert 200 == resp.status_code
+    rows = list(csv.reader(StringIO(resp.get_data(as_text=True))))
+    assert len(expected) + 1 == len(rows)
+
+
+def test_content_activity_in_chunks_with_same_versioncreated(client, app, monkeypatch):
+    versioncreated = datetime.now().replace(microsecond=0)
+    app.data.insert(
+        "items",
+        [
+            {"_id": guid, "guid": guid, "headline": guid, "type": "text", "versioncreated": versioncreated}
+            for guid in ["urn:same:1", "urn:same:2", "urn:same:3"]
+        ],
+    )
+
+    today = datetime.now().date()
+    url = "reports/content-activity?date_from={}&date_to={}".format(today.isoformat(), today.isoformat())
+    expected = json.loads(client.get(url).get_data())["results"]
+
+    # items with the same ``versioncreated`` are paged by their ``guid``
+    monkeypatch.setattr("newsroom.reports.content_activity.CHUNK_SIZE", 1)
+    results = json.loads(client.get(url).get_data())["results"]
+    assert [item["_id"] for item in expected] == [item["_id"] for item in results]
+    assert ["urn:same:1", "urn:same:2", "urn:same:3"] == [
+        item["_id"] for item in results if item["_id"].startswith("urn:same:")
+    ]
+
+
+def test_company_news_api_usage(client, app):
+    app.data.insert("news_api_tokens", [{"company": COMPANY_1_ID, "enabled": True}])
+    now = datetime.utcnow().replace(tzinfo=utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    subscriber = str(COMPANY_1_ID)
+    app.data.insert(
+        "api_audit",
+        [
+            {"subscriber": subscriber, "endpoint": "news/search", "created": today - timedelta(hours=36)},
+            {"subscriber": subscriber, "endpoint": "news/search", "created": today - timedelta(hours=30)},
+            {"subscriber": subscriber, "endpoint": "news/item", "created": today - timedelta(hours=12)},
+            {"subscriber": subscriber, "endpoint": "news/search", "created": now},
+        ],
+    )
+
+    service = get_resource_service("api_audit_daily")
+    service.rollup()
+    rollups = list(service.find({}))
+    assert 2 == len(rollups)
+    service.rollup()
+    assert 2 == len(list(service.find({})))
+
+    # Complete days are read from the rollups only
+    get_resource_service("api_audit").delete_action({"created": {"$lt": today}})
+
+    url = "reports/company-news-api-usage?date_from={}&date_to={}".format(
+        (today - timedelta(days=2)).date().isoformat(), today.date().isoformat()
+    )
+    report = json.loads(client.get(url).get_data())
+    assert report["name"] == "Company News API Usage"
+    assert {"news/search": 3, "news/item": 1} == report["results"]["Press Co."]
+    assert {"news/search", "news/item"} == set(report["result_headers"])
+
+
+def test_product_stories(client, app, mocker):
+    app.config["PRODUCT_STORIES_REPORT_CACHE_TIMEOUT"] = 60
+    msearch = mocker.spy(get_resource_service("wire_search"), "internal_msearch")
+
+    resp = client.get("reports/product-stories")
+    report = json.loads(resp.get_data())
+    assert report["name"] == "Stories per product"
+    assert len(report["results"]) == len(list(get_resource_service("products").find({})))
+    assert "today" in report["results"][0]
+    assert "last_6_months" in report["results"][0]
+    assert 1 == msearch.call_count
+
+    assert report == json.loads(client.get("reports/product-stories").get_data())
+    assert 1 == msearch.call_count
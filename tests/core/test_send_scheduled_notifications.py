@@ -1,13 +1,19 @@
 from typing import Dict, List
+from unittest import mock
 import flask
 
 from datetime import datetime, timedelta
 from bson import ObjectId
 
+from superdesk import get_resource_service
 from superdesk.utc import utcnow, utc_to_local
 from newsroom.types import Topic, NotificationQueueTopic, NotificationSchedule, NotificationQueue
-from newsroom.notifications.send_scheduled_notifications import SendScheduledNotificationEmails
+from newsroom.notifications.send_scheduled_notifications import (
+    SendScheduledNotificationEmails,
+    MAX_QUEUE_ITEMS_SEARCHED,
+)
 
+from newsroom.tests.fixtures import PUBLIC_USER_ID, TEST_USER_ID
 from newsroom.tests.users import ADMIN_USER_ID
 
 
@@ -187,6 +193,95 @@ def test_get_topic_entries_and_match_table(app):
     assert topic_match_table["wire"][1] == ("Onions", 1)
 
 
+def test_get_latest_item_from_topic_queue_skips_inaccessible_items(app):
+    user = app.data.find_one("users", req=None, _id=ADMIN_USER_ID)
+    topic_id = app.data.insert("topics", [{"label": "Cheesy Stuff", "query": "cheese", "topic_type": "wire"}])[0]
+    topic: Topic = app.data.find_one("topics", req=None, _id=topic_id)
+    now = datetime.utcnow()
+    app.data.insert(
+        "items",
+        [
+            {"_id": "cheese1", "headline": "Cheese story", "versioncreated": now - timedelta(minutes=2)},
+            {"_id": "cheese2", "headline": "Another cheese story", "versioncreated": now - timedelta(minutes=1)},
+            {"_id": "onion1", "headline": "Onion story", "versioncreated": now},
+        ],
+    )
+    topic_queue: NotificationQueueTopic = {
+        "topic_id": topic_id,
+        "items": ["cheese1", "cheese2", "onion1"],
+        "section": "wire",
+        "last_item_arrived": utcnow(),
+    }
+
+    command = SendScheduledNotificationEmails()
+    assert command._get_latest_item_from_topic_queue(topic_queue, topic, user, None, set())["_id"] == "cheese2"
+    assert command._get_latest_item_from_topic_queue(topic_queue, topic, user, None, {"cheese2"})["_id"] == "cheese1"
+    assert command._get_latest_item_from_topic_queue(topic_queue, topic, user, None, {"cheese1", "cheese2"}) is None
+
+
+def test_get_topic_queue_items_with_large_queue(app):
+    user = app.data.find_one("users", req=None, _id=ADMIN_USER_ID)
+    topic_id = app.data.insert("topics", [{"label": "Cheesy Stuff", "query": "cheese", "topic_type": "wire"}])[0]
+    topic: Topic = app.data.find_one("topics", req=None, _id=topic_id)
+    now = datetime.utcnow()
+    app.data.insert(
+        "items",
+        [
+            {"_id": "cheese_old", "headline": "Old cheese story", "versioncreated": now - timedelta(hours=1)},
+            {"_id": "cheese_new", "headline": "New cheese story", "versioncreated": now},
+        ],
+    )
+    topic_queue: NotificationQueueTopic = {
+        "topic_id": topic_id,
+        "items": ["cheese_new"] + ["missing{}".format(index) for index in range(20000)] + ["cheese_old"],
+        "section": "wire",
+        "last_item_arrived": utcnow(),
+    }
+
+    command = SendScheduledNotificationEmails()
+    with mock.patch("newsroom.notifications.send_scheduled_notifications.get_resource_service") as get_service:
+        search_service = get_service.return_value
+        search_service.get_items_by_queries.return_value = []
+        command._get_topic_queue_items("wire", [(topic_queue, topic)], user, None)
+
+    args = search_service.get_topic_query.call_args[1]["args"]
+    assert len(args["ids"]) == MAX_QUEUE_ITEMS_SEARCHED
+    assert args["ids"][0] == "cheese_old"
+    assert args["size"] == 1
+
+    # only the latest item is loaded, even if it was queued first
+    items = command._get_topic_queue_items("wire", [(topic_queue, topic)], user, None)[0]
+    assert list(items.keys()) == ["cheese_old"]
+
+    topic_queue["items"] = topic_queue["items"][-MAX_QUEUE_ITEMS_SEARCHED:] + ["cheese_new"]
+    items = command._get_topic_queue_items("wire", [(topic_queue, topic)], user, None)[0]
+    assert list(items.keys()) == ["cheese_new"]
+
+
+def test_run_schedules_in_batches(app, mocker):
+    delay = mocker.patch(
+        "newsroom.notifications.send_scheduled_notifications.send_scheduled_notifications_for_users.delay"
+    )
+    app.config["SCHEDULED_NOTIFICATIONS_BATCH_SIZE"] = 2
+
+    service = get_resource_service("notification_queue")
+    for user_id in [ADMIN_USER_ID, PUBLIC_USER_ID, TEST_USER_ID]:
+        service.add_item_to_queue(ObjectId(user_id), "wire", ObjectId(), {"_id": "item1", "versioncreated": utcnow()})
+
+    command = SendScheduledNotificationEmails()
+    command.log_msg = "test"
+    command.run_schedules(True)
+
+    assert delay.call_count == 2
+    batches = [call.args[0] for call in delay.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert {str(user_id) for batch in batches for user_id in batch} == {
+        str(ADMIN_USER_ID),
+        str(PUBLIC_USER_ID),
+        str(TEST_USER_ID),
+    }
+
+
 def test_is_scheduled_to_run_for_user():
     command = SendScheduledNotificationEmails()
     timezone = "Australia/Sydney"
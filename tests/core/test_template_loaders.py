@@ -56,3 +56,28 @@ def test_load_template_with_locale():
 
         with pytest.raises(jinja2.TemplateNotFound):
             env.get_template("missing.html").render()
+
+
+def test_compile_template_once_per_locale():
+    template_data = {
+        "test.html": "default template",
+        "test.fr.html": "fr template",
+        "with_layout.html": "{% extends 'test.html' %}",
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for filename, data in template_data.items():
+            with open(pathlib.Path(tmpdir).joinpath(filename), "wt") as template:
+                template.write(data)
+
+        loader = LocaleTemplateLoader(tmpdir)
+        env = jinja2.Environment(loader=loader, auto_reload=True)
+
+        for _ in range(3):
+            for locale, expected in (("fr", "fr template"), ("en", "default template"), (None, "default template")):
+                set_template_locale(locale)
+                assert expected == env.get_template("with_layout.html").render()
+                assert expected == env.get_template("test.html").render()
+
+        # with_layout.html and test.html for each of the 3 locales
+        assert 6 == loader.compilations
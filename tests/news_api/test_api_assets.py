@@ -24,8 +24,36 @@ def test_get_asset(client, app):
     id = setup_image(app)
     response = client.get("api/v1/assets/{}".format(id), headers={"Authorization": token.get("token")})
     assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    # the audit record is written once the response is sent
+    response.close()
     audit_check(str(id))
 
+    response = client.get(
+        "api/v1/assets/{}".format(id),
+        headers={"Authorization": token.get("token"), "Range": "bytes=10-19"},
+    )
+    assert response.status_code == 206
+    assert 10 == len(response.get_data())
+    response.close()
+    audit_check(str(id))
+
+
+def test_get_asset_x_accel_redirect(client, app):
+    app.config["NEWS_API_ASSETS_X_ACCEL_REDIRECT"] = "/protected/assets/"
+    app.data.insert(
+        "companies",
+        [{"_id": "company_123", "name": "Test Company", "is_enabled": True}],
+    )
+    app.data.insert("news_api_tokens", [{"company": "company_123", "enabled": True}])
+    token = app.data.find_one("news_api_tokens", req=None, company="company_123")
+
+    id = setup_image(app)
+    response = client.get("api/v1/assets/{}".format(id), headers={"Authorization": token.get("token")})
+    assert response.status_code == 200
+    assert "/protected/assets/{}".format(id) == response.headers["X-Accel-Redirect"]
+    assert b"" == response.get_data()
+
 
 def test_authorization_get_asset(client, app):
     response = client.get("api/v1/assets/{}".format(id), headers={"Authorization": "xxxxxxxx"})
@@ -3,7 +3,9 @@ from eve.methods.get import get_internal, getitem_internal
 from superdesk import get_resource_service
 from flask import g
 from bson import ObjectId
+from newsroom.news_api.api_audit import flush_api_audit_records, get_audit_buffer_setting
 from newsroom.tests.fixtures import COMPANY_1_ID, COMPANY_2_ID
+from newsroom.write_buffer import WriteBuffer
 
 company_id = "5c3eb6975f627db90c84093c"
 
@@ -88,3 +90,32 @@ def test_search_audit_creation(client, app):
         response = get_internal("news/search")
         assert len(response[0]["_items"]) == 1
         audit_check("5ab03a87bdd78169bb6d0785")
+
+
+def test_buffered_audit_creation(client, app):
+    app.extensions["api_audit_buffer"] = WriteBuffer(app, "api_audit", flush_api_audit_records, flush_interval=10000)
+
+    try:
+        with app.test_request_context(path="/account/products/"):
+            g.company_id = COMPANY_2_ID
+            get_internal("account/products")
+            getitem_internal("account/products", _id="5ab03a87bdd78169bb6d0783")
+
+        assert 0 == len(list(get_resource_service("api_audit").find(where={})))
+
+        app.extensions["api_audit_buffer"].drain()
+        audits = list(get_resource_service("api_audit").find(where={}))
+        assert 2 == len(audits)
+        assert all(str(audit["items_id"][0]) == "5ab03a87bdd78169bb6d0783" for audit in audits)
+        assert all(str(audit["subscriber"]) == str(COMPANY_2_ID) for audit in audits)
+    finally:
+        app.extensions.pop("api_audit_buffer").close()
+
+
+def test_audit_buffer_settings(app):
+    app.config["HISTORY_BUFFER_BATCH_SIZE"] = 50
+    app.config["NEWS_API_AUDIT_BUFFER_BATCH_SIZE"] = None
+    assert 50 == get_audit_buffer_setting(app, "BATCH_SIZE", 100)
+
+    app.config["NEWS_API_AUDIT_BUFFER_BATCH_SIZE"] = 10
+    assert 10 == get_audit_buffer_setting(app, "BATCH_SIZE", 100)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from bson import ObjectId
+from pytest import fixture
+from superdesk import get_resource_service
+from superdesk.utc import utcnow
+
+import newsroom.news_api.api_tokens.utils as api_tokens_utils
+
+from newsroom.news_api.api_tokens.utils import (
+    TokenAuthCache,
+    increment_rate_limit_requests,
+    invalidate_token_auth_cache,
+)
+
+company_id = ObjectId("5c3eb6975f627db90c84093c")
+
+
+@fixture
+def token_id(app):
+    app.data.insert("companies", [{"_id": company_id, "name": "Test Company", "is_enabled": True}])
+    return app.data.insert("news_api_tokens", [{"company": company_id, "enabled": True}])[0]
+
+
+def test_token_auth_cache(app, token_id):
+    app.config["NEWS_API_AUTH_CACHE_TIMEOUT"] = 60
+    cache = TokenAuthCache()
+
+    token, company = cache.get(token_id)
+    assert token["enabled"] is True
+    assert company["is_enabled"] is True
+
+    app.data.get_mongo_collection("companies").update_one({"_id": company_id}, {"$set": {"is_enabled": False}})
+    token, company = cache.get(token_id)
+    assert company["is_enabled"] is True
+
+    invalidate_token_auth_cache()
+    token, company = cache.get(token_id)
+    assert company["is_enabled"] is False
+
+    assert (None, None) == cache.get("unknown")
+
+
+def test_token_revocation(client, app, token_id, mocker):
+    app.config["NEWS_API_AUTH_CACHE_TIMEOUT"] = 60
+    app.data.insert(
+        "products",
+        [{"name": "Fish", "companies": [company_id], "query": "fish", "product_type": "news_api", "is_enabled": True}],
+    )
+    headers = {"Authorization": token_id}
+    get_token_and_company = mocker.spy(api_tokens_utils, "get_token_and_company")
+
+    assert 200 == client.get("api/v1/news/search", headers=headers).status_code
+    assert 200 == client.get("api/v1/news/search", headers=headers).status_code
+    assert 1 == get_token_and_company.call_count
+
+    get_resource_service("news_api_tokens").patch(token_id, {"enabled": False})
+    assert 401 == client.get("api/v1/news/search", headers=headers).status_code
+
+
+def test_increment_rate_limit_requests(app, token_id):
+    app.config["RATE_LIMIT_PERIOD"] = 300
+    now = utcnow()
+
+    assert 1 == increment_rate_limit_requests(token_id, now)["rate_limit_requests"]
+    assert 2 == increment_rate_limit_requests(token_id, now)["rate_limit_requests"]
+    rate_limit = increment_rate_limit_requests(token_id, now)
+    assert 3 == rate_limit["rate_limit_requests"]
+    assert rate_limit["rate_limit_expiry"] > now
+
+    # a new period is started once the current one expires
+    rate_limit = increment_rate_limit_requests(token_id, now + timedelta(seconds=301))
+    assert 1 == rate_limit["rate_limit_requests"]
+    assert rate_limit["rate_limit_expiry"] > now + timedelta(seconds=301)
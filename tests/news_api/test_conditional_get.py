@@ -0,0 +1,69 @@
+from bson import ObjectId
+from pytest import fixture
+from superdesk import get_resource_service
+from superdesk.utc import utcnow
+
+company_id = ObjectId("5c3eb6975f627db90c84093c")
+
+
+@fixture
+def headers(app):
+    app.config["NEWS_API_CONDITIONAL_GET_CACHE_TIMEOUT"] = 0
+    app.data.insert("companies", [{"_id": company_id, "name": "Test Company", "is_enabled": True}])
+    app.data.insert(
+        "products",
+        [
+            {
+                "name": "A fishy Product",
+                "companies": [company_id],
+                "query": "fish",
+                "product_type": "news_api",
+                "is_enabled": True,
+            }
+        ],
+    )
+    app.data.insert("items", [{"_id": "foo", "body_html": "fish", "versioncreated": utcnow()}])
+    app.data.insert("news_api_tokens", [{"company": company_id, "enabled": True}])
+    token = app.data.find_one("news_api_tokens", req=None, company=company_id)
+    return {"Authorization": token.get("token")}
+
+
+def test_conditional_get(client, app, headers):
+    for url in ["api/v1/news/search", "api/v1/news/feed"]:
+        response = client.get(url, headers=headers)
+        assert 200 == response.status_code
+        etag = response.headers["ETag"]
+        assert etag
+        assert response.headers["Last-Modified"]
+
+        response = client.get(url, headers={"If-None-Match": etag, **headers})
+        assert 304 == response.status_code
+        assert etag == response.headers["ETag"]
+
+        response = client.get(url, headers={"If-Modified-Since": response.headers["Last-Modified"], **headers})
+        assert 304 == response.status_code
+
+        response = client.get(url + "?q=foo", headers={"If-None-Match": etag, **headers})
+        assert 200 == response.status_code
+
+    audits = list(get_resource_service("api_audit").find(where={}))
+    assert 4 == len(audits)
+
+    app.data.insert("items", [{"_id": "bar", "body_html": "more fish", "versioncreated": utcnow()}])
+    response = client.get("api/v1/news/feed", headers={"If-None-Match": etag, **headers})
+    assert 200 == response.status_code
+    assert etag != response.headers["ETag"]
+
+
+def test_unconditional_get_single_search(client, app, headers, mocker):
+    msearch = mocker.spy(get_resource_service("news/search"), "internal_msearch")
+    response = client.get("api/v1/news/search", headers=headers)
+    assert 200 == response.status_code
+    assert response.headers["ETag"]
+    assert 0 == msearch.call_count
+
+    # the validator from the search results matches the one of a conditional request
+    app.cache.clear()
+    response = client.get("api/v1/news/search", headers={"If-None-Match": response.headers["ETag"], **headers})
+    assert 304 == response.status_code
+    assert 1 == msearch.call_count
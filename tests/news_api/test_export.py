@@ -0,0 +1,89 @@
+import gzip
+from datetime import timedelta
+
+from bson import ObjectId
+from flask import json
+from pytest import fixture
+from superdesk import get_resource_service
+from superdesk.utc import utcnow
+
+company_id = ObjectId("5c3eb6975f627db90c84093c")
+
+
+@fixture
+def headers(app):
+    app.data.insert("companies", [{"_id": company_id, "name": "Test Company", "is_enabled": True}])
+    app.data.insert(
+        "products",
+        [
+            {
+                "name": "A fishy Product",
+                "companies": [company_id],
+                "query": "fish",
+                "product_type": "news_api",
+                "is_enabled": True,
+            }
+        ],
+    )
+    now = utcnow()
+    app.data.insert(
+        "items",
+        [
+            {"_id": "foo", "body_html": "fish", "headline": "Foo", "versioncreated": now - timedelta(hours=2)},
+            {"_id": "bar", "body_html": "more fish", "headline": "Bar", "versioncreated": now - timedelta(hours=1)},
+            {"_id": "baz", "body_html": "aardvark", "headline": "Baz", "versioncreated": now},
+        ],
+    )
+    app.data.insert("news_api_tokens", [{"company": company_id, "enabled": True}])
+    token = app.data.find_one("news_api_tokens", req=None, company=company_id)
+    return {"Authorization": token.get("token")}
+
+
+def test_export_ndjson(client, app, headers):
+    app.config["NEWS_API_EXPORT_BATCH_SIZE"] = 1
+
+    response = client.get("api/v1/news/export?start_date=now-1d", headers=headers)
+    assert 200 == response.status_code
+    assert "application/x-ndjson" == response.mimetype
+    items = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert ["foo", "bar"] == [item["_id"] for item in items]
+    assert "Foo" == items[0]["headline"]
+    assert "body_html" not in items[0]
+
+    audits = list(get_resource_service("api_audit").find(where={}))
+    assert 1 == len(audits)
+    assert ["foo", "bar"] == audits[0]["items_id"]
+
+    response = client.get(
+        "api/v1/news/export?start_date=now-1d&include_fields=body_html",
+        headers={"Accept-Encoding": "gzip", **headers},
+    )
+    assert 200 == response.status_code
+    assert "gzip" == response.headers["Content-Encoding"]
+    items = [json.loads(line) for line in gzip.decompress(response.get_data()).decode("utf-8").splitlines()]
+    assert ["fish", "more fish"] == [item["body_html"] for item in items]
+
+
+def test_export_ndjson_with_same_versioncreated(client, app, headers):
+    app.config["NEWS_API_EXPORT_BATCH_SIZE"] = 1
+    versioncreated = utcnow() - timedelta(minutes=30)
+    app.data.insert(
+        "items",
+        [
+            {"_id": guid, "guid": guid, "body_html": "fish", "versioncreated": versioncreated}
+            for guid in ["same1", "same2", "same3"]
+        ],
+    )
+
+    response = client.get("api/v1/news/export?start_date=now-1d", headers=headers)
+    assert 200 == response.status_code
+    items = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # items with the same ``versioncreated`` are each exported once, using the ``_shard_doc`` tie-breaker
+    assert ["foo", "bar"] == [item["_id"] for item in items[:2]]
+    assert ["same1", "same2", "same3"] == sorted(item["_id"] for item in items[2:])
+
+
+def test_export_validation(client, app, headers):
+    app.config["NEWS_API_EXPORT_MAX_ITEMS"] = 1
+    assert 400 == client.get("api/v1/news/export?start_date=now-1d", headers=headers).status_code
+    assert 400 == client.get("api/v1/news/export?page=2", headers=headers).status_code
@@ -0,0 +1,76 @@
+from flask import Config, json
+from superdesk import get_resource_service
+from superdesk.utc import utcnow
+
+from newsroom.news_api.factory import NewsroomNewsAPI
+from newsroom.news_api.formatters.cache import (
+    formatted_items_cache,
+    invalidate_formatted_item,
+    use_formatted_items_cache,
+)
+from newsroom.tests.conftest import update_config
+
+
+def use_shared_cache(app, cache_dir):
+    app.cache.init_app(app, config={"CACHE_TYPE": "FileSystemCache", "CACHE_DIR": str(cache_dir)})
+
+
+def test_formatted_items_cache_requires_shared_cache(app, tmp_path):
+    app.config["NEWS_API_FORMATTED_ITEMS_CACHE_SIZE"] = 10
+    assert not use_formatted_items_cache()
+
+    use_shared_cache(app, tmp_path)
+    assert use_formatted_items_cache()
+
+
+def test_formatted_items_cache(app, mocker, tmp_path):
+    app.config["NEWS_API_FORMATTED_ITEMS_CACHE_SIZE"] = 10
+    use_shared_cache(app, tmp_path)
+    app.data.insert("items", [{"_id": "foo", "headline": "Foo", "version": "1", "versioncreated": utcnow()}])
+
+    service = get_resource_service("formatters")
+    format_version = mocker.spy(service, "_format_version")
+
+    formatted = service.get_version("foo", None, "NINJSFormatter")
+    assert "Foo" == json.loads(formatted["formatted_item"])["headline"]
+    assert "1" == formatted["version"]
+    assert formatted == service.get_version("foo", None, "NINJSFormatter")
+    assert 1 == format_version.call_count
+
+    service.get_version("foo", None, "TextFormatter")
+    assert 2 == format_version.call_count
+
+    app.data.update("items", "foo", {"headline": "Bar", "version": "2"}, {})
+    invalidate_formatted_item("foo")
+    formatted = service.get_version("foo", None, "NINJSFormatter")
+    assert "Bar" == json.loads(formatted["formatted_item"])["headline"]
+    assert "2" == formatted["version"]
+    assert 3 == format_version.call_count
+
+    # entries expire, even if the item version wasn't invalidated in this process
+    app.data.update("items", "foo", {"headline": "Baz", "version": "3"}, {})
+    app.config["NEWS_API_FORMATTED_ITEMS_CACHE_TIMEOUT"] = 0
+    formatted_items_cache.set(formatted_items_cache.get_key("foo", None, "NINJSFormatter"), formatted)
+    formatted = service.get_version("foo", None, "NINJSFormatter")
+    assert "Baz" == json.loads(formatted["formatted_item"])["headline"]
+
+
+def test_formatted_items_cache_invalidated_by_other_app(app, tmp_path):
+    app.config["NEWS_API_FORMATTED_ITEMS_CACHE_SIZE"] = 10
+    use_shared_cache(app, tmp_path)
+    app.data.insert("items", [{"_id": "foo", "headline": "Foo", "version": "1", "versioncreated": utcnow()}])
+
+    service = get_resource_service("formatters")
+    assert "Foo" == json.loads(service.get_version("foo", None, "NINJSFormatter")["formatted_item"])["headline"]
+
+    # the item is published again by another app, i.e. the web app handling ``push``
+    cfg = Config(app.root_path)
+    cfg.from_object("newsroom.news_api.default_settings")
+    update_config(cfg)
+    other_app = NewsroomNewsAPI(config=cfg, testing=True)
+    use_shared_cache(other_app, tmp_path)
+    with other_app.app_context():
+        other_app.data.update("items", "foo", {"headline": "Bar", "version": "2"}, {})
+        invalidate_formatted_item("foo")
+
+    assert "Bar" == json.loads(service.get_version("foo", None, "NINJSFormatter")["formatted_item"])["headline"]